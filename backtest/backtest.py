@@ -0,0 +1,390 @@
+"""Offline backtest van de scalper-, hodl- en trader-strategieën.
+
+Speelt historische candles of ticks (CSV of Parquet) af door de
+beslislogica van de bots, zonder netwerk en met een gesimuleerde klok in
+plaats van ``time.sleep``. Rapporteert trades, handelskosten en winst/verlies.
+
+Gebruik:
+    python backtest/backtest.py scalper SOL-EUR-1m.csv --config bitvavo-scalper/config/scalper.json
+    python backtest/backtest.py hodl SOL-EUR-1d.parquet --config hodl.json
+    python backtest/backtest.py trader SOL-EUR-1m.csv --config trader.json --trades trades.csv
+
+Het invoerbestand heeft een kolom ``timestamp`` (epoch in seconden of
+milliseconden, of een datum/tijd-tekst) en een kolom ``close`` (candles) of
+``price`` (ticks). Een ``.db``-bestand wordt gelezen als candle-cache
+(``candle_store.py``) voor de markt uit de configuratie en ``--interval``:
+    python backtest/backtest.py hodl data/candles.db --config hodl.json --interval 1d
+
+Een map wordt gelezen als opname van de tick-recorder (``tick_recorder.py``):
+de ticker-prijzen die de bot of de hub voor die markt werkelijk zag:
+    python backtest/backtest.py scalper data/ticks --config scalper.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+for bot_dir in ("bitvavo-scalper", "bitvavo-hodl", "bitvavo-trader"):
+    sys.path.insert(0, os.path.join(ROOT, bot_dir))
+
+# Handelskosten zonder instelling in de config: dezelfde standaard als de bot zelf
+# (MarketScalper, de OrderExecutor van hodl en trader.py)
+DEFAULT_FEE_PERCENTAGES = {"scalper": 0.5, "hodl": 0.25, "trader": 0.25}
+
+
+def load_prices(path, market=None, interval="1m"):
+    """Lees tijdstempels (seconden) en prijzen uit een CSV-, Parquet-, candle-cache- of tickopname."""
+    if os.path.isdir(path):
+        from tick_recorder import load_range
+
+        records = load_range(path, market, "ticker")
+        if not len(records):
+            raise SystemExit(f"Geen opgenomen ticks voor {market} in {path}")
+        order = np.argsort(records["timestamp"], kind="stable")
+        return records["timestamp"][order] / 1000.0, np.asarray(records["price"], dtype=np.float64)[order]
+    if path.endswith(".db"):
+        from candle_store import CLOSE, TIMESTAMP, CandleStore
+
+        store = CandleStore(path)
+        candles = store.load(market, interval)
+        store.close()
+        if not len(candles):
+            raise SystemExit(f"Geen {interval}-candles voor {market} in {path}")
+        return candles[:, TIMESTAMP] / 1000.0, candles[:, CLOSE]
+
+    import pandas as pd
+
+    if path.endswith(".parquet"):
+        frame = pd.read_parquet(path)
+    else:
+        frame = pd.read_csv(path)
+    price_column = "close" if "close" in frame.columns else "price"
+    prices = frame[price_column].to_numpy(dtype=np.float64)
+
+    stamps = frame["timestamp"]
+    if pd.api.types.is_numeric_dtype(stamps):
+        timestamps = stamps.to_numpy(dtype=np.float64)
+        if len(timestamps) and timestamps.max() > 1e11:  # Bitvavo levert milliseconden
+            timestamps = timestamps / 1000.0
+    else:
+        timestamps = pd.to_datetime(stamps, utc=True).astype("int64").to_numpy() / 1e9
+
+    order = np.argsort(timestamps, kind="stable")
+    return timestamps[order], prices[order]
+
+
+def resample_closes(timestamps, prices, interval_seconds):
+    """Laatste prijs per interval (bijv. dagcandles uit minuutcandles)."""
+    buckets = np.floor(timestamps / interval_seconds)
+    last = np.flatnonzero(np.diff(buckets, append=np.inf))
+    return buckets[last] * interval_seconds, prices[last]
+
+
+class SimulatedClock:
+    """Klok die door de backtest wordt vooruitgezet in plaats van te slapen."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class Ledger:
+    """Houdt gesimuleerde trades, handelskosten en winst/verlies bij (gemiddelde kostprijs)."""
+
+    def __init__(self, fee_percentage):
+        self.fee_rate = fee_percentage / 100
+        self.trades = []
+        self.position = 0.0
+        self.cost_basis = 0.0  # Inclusief aankoopkosten
+        self.fees = 0.0
+        self.realized = 0.0
+        self.skipped = 0  # Verkoopsignalen zonder open positie
+
+    def buy(self, timestamp, amount, price):
+        fee = amount * price * self.fee_rate
+        self.position += amount
+        self.cost_basis += amount * price + fee
+        self.fees += fee
+        self.trades.append((timestamp, "buy", amount, price, fee, 0.0))
+
+    def sell(self, timestamp, amount, price):
+        amount = min(amount, self.position)
+        if amount <= 0:
+            self.skipped += 1
+            return
+        fee = amount * price * self.fee_rate
+        cost = self.cost_basis * amount / self.position
+        pnl = amount * price - fee - cost
+        self.position -= amount
+        self.cost_basis -= cost
+        self.fees += fee
+        self.realized += pnl
+        self.trades.append((timestamp, "sell", amount, price, fee, pnl))
+
+    def summary(self, last_price):
+        unrealized = self.position * last_price - self.cost_basis
+        sells = [t for t in self.trades if t[1] == "sell"]
+        return {
+            "trades": len(self.trades),
+            "buys": len(self.trades) - len(sells),
+            "sells": len(sells),
+            "winning_sells": sum(1 for t in sells if t[5] > 0),
+            "skipped_sells": self.skipped,
+            "fees": self.fees,
+            "realized_pnl": self.realized,
+            "open_position": self.position,
+            "unrealized_pnl": unrealized,
+            "total_pnl": self.realized + unrealized,
+        }
+
+    def write_csv(self, path):
+        with open(path, "w") as f:
+            f.write("timestamp,side,amount,price,fee,pnl\n")
+            for trade in self.trades:
+                f.write("{:.3f},{},{:.8f},{:.8f},{:.8f},{:.8f}\n".format(*trade))
+
+
+def run_scalper(timestamps, prices, strategy_config, ledger):
+    """Speel elke prijs als tick af door ``MarketScalper.on_price``."""
+    from scalper import MarketScalper
+
+    clock = SimulatedClock()
+    bot = MarketScalper(strategy_config, data_dir=None, clock=clock, verbose=False)
+    for timestamp, price in zip(timestamps.tolist(), prices.tolist()):
+        clock.now = timestamp
+        signal = bot.on_price(price)
+        if signal is None:
+            continue
+        side = signal[0]
+        if side == "buy":
+            ledger.buy(timestamp, bot.trade_amount, price)
+        else:
+            ledger.sell(timestamp, bot.trade_amount, price)
+        bot.apply_trade(side, price)
+
+
+def run_hodl(timestamps, prices, strategy_config, ledger):
+    """Speel dagelijkse slotkoersen af door ``hodl.evaluate_signal``.
+
+    Na een trade wordt ``CHECK_INTERVAL_DAYS`` dagen niet gehandeld, zoals de
+    live bot dat bedoelt.
+    """
+    from hodl import evaluate_signal
+
+    sma_window = strategy_config["SMA_WINDOW"]
+    ai_window = strategy_config["AI_PREDICTION_WINDOW"]
+    oversold = strategy_config["RSI_OVERSOLD"]
+    overbought = strategy_config["RSI_OVERBOUGHT"]
+    amount = strategy_config["TRADE_AMOUNT"]
+    pause = strategy_config.get("CHECK_INTERVAL_DAYS", 0) * 86400
+
+    days, closes = resample_closes(timestamps, prices, 86400)
+    history = sma_window + ai_window
+    next_allowed = -np.inf
+    for i in range(history, len(closes) + 1):
+        day = float(days[i - 1])
+        if day < next_allowed:
+            continue
+        signal, info = evaluate_signal(closes[i - history:i], sma_window, ai_window, oversold, overbought)
+        if signal == "buy":
+            ledger.buy(day, amount, info["price"])
+        elif signal == "sell":
+            ledger.sell(day, amount, info["price"])
+        if signal is not None:
+            next_allowed = day + pause
+
+
+def rolling_predictions(features, target, weights, rows, alpha=0.0, min_samples=None):
+    """Voorspel per tick met een lineaire regressie over de voorgaande ``rows`` rijen.
+
+    Voor tick t wordt getraind op rijen t-rows..t-1 (rijen met gewicht 0
+    tellen niet mee) en voorspeld met de kenmerken van rij t; met ``alpha``
+    > 0 als ridge-regressie. Aan het begin van de reeks zijn er minder dan
+    ``rows`` voorgaande rijen; dan wordt, net als live, op de rijen getraind
+    die er zijn. Met minder dan ``min_samples`` (standaard het aantal
+    kenmerken + 1) geldige rijen is de voorspelling NaN. Dit is de
+    gevectoriseerde tegenhanger van het rollende model van de trader.
+    """
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    n, k = features.shape
+    if min_samples is None:
+        min_samples = k + 1
+    predictions = np.full(n, np.nan)
+    # ``rows`` lege rijen vooraan, zodat ook de eerste ticks een (korter) venster hebben
+    pad = np.zeros(rows)
+    clean_x = np.concatenate((np.zeros((rows, k)), np.where(weights[:, None] > 0, features, 0.0)))
+    clean_y = np.concatenate((pad, np.where(weights > 0, target, 0.0)))
+    weights = np.concatenate((pad, weights))
+    x_windows = sliding_window_view(clean_x, rows, axis=0)  # (n+1, k, rows)
+    y_windows = sliding_window_view(clean_y, rows)
+    w_windows = sliding_window_view(weights, rows)
+
+    chunk = 20000
+    for start in range(0, n, chunk):
+        stop = min(start + chunk, n)
+        xw = x_windows[start:stop]
+        yw = y_windows[start:stop]
+        ww = w_windows[start:stop]
+        count = ww.sum(axis=1)
+        safe = np.maximum(count, 1)
+        x_mean = np.einsum("tkr,tr->tk", xw, ww) / safe[:, None]
+        y_mean = np.einsum("tr,tr->t", yw, ww) / safe
+        xc = (xw - x_mean[:, :, None]) * ww[:, None, :]
+        yc = (yw - y_mean[:, None]) * ww
+        sxx = np.einsum("tkr,tjr->tkj", xc, xc)
+        sxy = np.einsum("tkr,tr->tk", xc, yc)
+        if alpha:
+            sxx += alpha * np.eye(k)
+        coef = np.einsum("tkj,tj->tk", np.linalg.pinv(sxx, hermitian=True), sxy)
+        x_now = features[start:stop]
+        pred = y_mean + np.einsum("tk,tk->t", x_now - x_mean, coef)
+        pred[count < min_samples] = np.nan
+        predictions[start:stop] = pred
+    return predictions
+
+
+def trader_signals(prices, strategy_config, rows=None):
+    """Bereken per tick (voorspelling, RSI) van de trader in één gevectoriseerde pass.
+
+    De indicatoren komen uit ``trader.calculate_indicators`` over de hele
+    reeks; dat zijn dezelfde waarden die ``TraderIndicators`` live prijs voor
+    prijs bijwerkt, en het model traint op evenveel rijen als de live bot
+    (of op ``rows`` rijen). Zoals ``trader.live_signal`` is de voorspelling
+    NaN tot er ``PRICE_WINDOW`` prijzen zijn.
+    """
+    from trader import FEATURES, MIN_SAMPLES, PRICE_WINDOW, calculate_indicators, training_rows
+
+    indicators = calculate_indicators(prices, strategy_config)
+    features = np.column_stack([indicators[name] for name in FEATURES])
+    target = np.append(indicators["price_change"][1:], np.nan)
+    valid = np.isfinite(features).all(axis=1) & np.isfinite(target) & np.isfinite(indicators["sma"])
+    predictions = rolling_predictions(features, target, valid.astype(np.float64), rows or training_rows(strategy_config),
+                                      strategy_config.get("ridge_alpha", 0.0), MIN_SAMPLES)
+    predictions[:PRICE_WINDOW - 1] = np.nan
+    return predictions, indicators["rsi"]
+
+
+def run_trader(timestamps, prices, strategy_config, ledger):
+    """Speel de trader af: kopen bij negatieve voorspelling en lage RSI, verkopen op doelwinst of stop-loss.
+
+    De live bot stopt na de eerste verkoop; de backtest gaat daarna verder
+    alsof de bot opnieuw is gestart.
+    """
+    budget = strategy_config["initial_budget"]
+    target_profit = strategy_config["target_profit_percent"]
+    stop_loss = strategy_config["stop_loss_percent"]
+    rsi_buy = strategy_config["rsi_threshold_buy"]
+    prediction_buy = strategy_config["prediction_threshold_buy"]
+
+    predictions, rsi = trader_signals(prices, strategy_config)
+    bought = False
+    amount = 0.0
+    for timestamp, price, prediction, rsi_value in zip(
+            timestamps.tolist(), prices.tolist(), predictions.tolist(), rsi.tolist()):
+        if prediction != prediction:  # NaN: nog geen model
+            continue
+        if not bought and prediction <= prediction_buy and rsi_value < rsi_buy:
+            amount = budget / price
+            ledger.buy(timestamp, amount, price)
+            bought = True
+        if bought:
+            profit_percent = ((amount * price - budget) / budget) * 100
+            if profit_percent >= target_profit or profit_percent <= stop_loss:
+                ledger.sell(timestamp, amount, price)
+                bought = False
+
+
+STRATEGIES = {
+    "scalper": run_scalper,
+    "hodl": run_hodl,
+    "trader": run_trader,
+}
+
+# Instellingen die de backtest per strategie leest; sweep.py weigert andere grid-sleutels
+# die ook niet in de basisconfiguratie staan (meestal een typfout of de sleutel van een andere bot).
+# Met de hand bijgehouden: MarketScalper slaat ook sleutels op die on_price nooit gebruikt (THRESHOLD_BUY).
+STRATEGY_SETTINGS = {
+    "scalper": {"THRESHOLD_SELL", "STOP_LOSS", "TRADE_AMOUNT", "WINDOW_SIZE", "TRADE_FEE_PERCENTAGE",
+                "MIN_DIRECTION_ACCURACY", "MIN_PREDICTIONS"},
+    "hodl": {"SMA_WINDOW", "AI_PREDICTION_WINDOW", "RSI_OVERSOLD", "RSI_OVERBOUGHT", "TRADE_AMOUNT",
+             "CHECK_INTERVAL_DAYS", "TRADE_FEE_PERCENTAGE"},
+    "trader": {"initial_budget", "target_profit_percent", "stop_loss_percent", "rsi_threshold_buy",
+               "prediction_threshold_buy", "slow_macd", "fast_macd", "signal_macd", "sma_period",
+               "ema_period", "ridge_alpha", "trade_fee_percentage"},
+}
+
+
+def load_strategy_config(path, symbol=None):
+    with open(path, "r") as f:
+        strategy_config = json.load(f)
+    if strategy_config.get("MARKETS"):
+        from scalper import market_configs
+        markets = market_configs(strategy_config)
+        matches = [m for m in markets if symbol in (None, m.get("SYMBOL"))]
+        if not matches:
+            raise SystemExit(f"Markt {symbol} niet gevonden in {path}")
+        strategy_config = matches[0]
+    return strategy_config
+
+
+def market_of(strategy_config, symbol=None):
+    """Markt van een strategieconfiguratie (hoofdletters bij scalper/hodl, kleine letters bij trader)."""
+    return symbol or strategy_config.get("SYMBOL") or strategy_config.get("symbol")
+
+
+def fee_of(strategy_config, strategy):
+    """Handelskosten van een strategieconfiguratie (hoofdletters bij scalper/hodl, kleine letters bij trader)."""
+    for key in ("TRADE_FEE_PERCENTAGE", "trade_fee_percentage"):
+        if strategy_config.get(key) is not None:
+            return strategy_config[key]
+    return DEFAULT_FEE_PERCENTAGES[strategy]
+
+
+def run_backtest(strategy, timestamps, prices, strategy_config, fee_percentage=None):
+    """Draai één backtest en geef het ledger terug."""
+    if fee_percentage is None:
+        fee_percentage = fee_of(strategy_config, strategy)
+    ledger = Ledger(fee_percentage)
+    STRATEGIES[strategy](timestamps, prices, strategy_config, ledger)
+    return ledger
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline backtest van de Bitvavo-bots.")
+    parser.add_argument("strategy", choices=sorted(STRATEGIES))
+    parser.add_argument("data", help="CSV-, Parquet-, candle-cachebestand (.db) of map met tickopnames")
+    parser.add_argument("--config", required=True, help="scalper.json, hodl.json of trader.json")
+    parser.add_argument("--symbol", help="Markt uit een MARKETS-lijst (scalper)")
+    parser.add_argument("--fee", type=float, help="Handelskosten in procent per order "
+                        "(standaard TRADE_FEE_PERCENTAGE of trade_fee_percentage, anders de standaard van de bot: "
+                        + ", ".join(f"{name} {fee}" for name, fee in sorted(DEFAULT_FEE_PERCENTAGES.items())) + ")")
+    parser.add_argument("--trades", help="Schrijf alle trades naar dit CSV-bestand")
+    parser.add_argument("--interval", default="1m", help="Candle-interval bij een .db-candle-cache")
+    args = parser.parse_args()
+
+    strategy_config = load_strategy_config(args.config, args.symbol)
+    timestamps, prices = load_prices(args.data, market_of(strategy_config, args.symbol), args.interval)
+
+    started = time.perf_counter()
+    ledger = run_backtest(args.strategy, timestamps, prices, strategy_config, args.fee)
+    elapsed = time.perf_counter() - started
+
+    summary = ledger.summary(float(prices[-1]))
+    print(f"Backtest {args.strategy} op {len(prices)} prijzen in {elapsed:.2f}s "
+          f"({len(prices) / max(elapsed, 1e-9):,.0f} ticks/s)")
+    for key, value in summary.items():
+        print(f"  {key:>15}: {value:.2f}" if isinstance(value, float) else f"  {key:>15}: {value}")
+    if args.trades:
+        ledger.write_csv(args.trades)
+        print(f"Trades geschreven naar {args.trades}")
+
+
+if __name__ == "__main__":
+    main()
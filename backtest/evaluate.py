@@ -0,0 +1,194 @@
+"""Walk-forward evaluatie van de prijsvoorspellers van de bots.
+
+Voorspelt voor elke tick de volgende prijs met alleen de data tot en met
+die tick, precies zoals de live bot dat doet, en meet hoe goed dat ging:
+gemiddelde absolute fout (MAE), skill ten opzichte van de naïeve
+voorspelling "prijs blijft gelijk", het aandeel voorspellingen met de goede
+richting en de kalibratie (klopt de grootte van de voorspelde beweging).
+De reeks wordt daarnaast in ``--folds`` opeenvolgende periodes geknipt om te
+zien of het model overal even goed (of slecht) is. Alle voorspellingen
+worden gevectoriseerd in één pass per venstergrootte berekend.
+
+Gebruik:
+    python backtest/evaluate.py scalper SOL-EUR-1m.csv --config scalper.json --windows 8,16,32,64
+    python backtest/evaluate.py hodl SOL-EUR-1m.csv --config hodl.json --windows 7,14,30
+    python backtest/evaluate.py trader data/ticks --config trader.json --windows 20,35 --out quality.csv
+
+Bij de scalper is het venster ``WINDOW_SIZE``, bij hodl
+``AI_PREDICTION_WINDOW`` (op dagelijkse slotkoersen) en bij de trader het
+aantal trainingsrijen van het model. Een richting-score rond 50% betekent
+dat het model niet beter is dan een muntworp; de live bots houden dezelfde
+getallen bij met ``regression.PredictionScore`` en kunnen met
+``MIN_DIRECTION_ACCURACY`` stoppen met kopen als het model daaronder zakt.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from backtest import load_prices, load_strategy_config, market_of, resample_closes, trader_signals
+
+# Aantal bakken voor de kalibratietabel (op grootte van de voorspelde beweging)
+CALIBRATION_BINS = 10
+
+
+def trend_predictions(prices, window, offset=None):
+    """Voorspelling per tick van de trendlijn over de laatste ``window`` prijzen.
+
+    Gelijk aan ``RollingRegression``: x loopt van 0 (oudste prijs) tot
+    window-1 en de voorspelling ligt op x = ``offset`` (standaard ``window``,
+    de eerstvolgende tick). Tick t krijgt een voorspelling zodra er
+    ``window`` prijzen tot en met t zijn, anders NaN.
+    """
+    n = len(prices)
+    predictions = np.full(n, np.nan)
+    if n < window:
+        return predictions
+    offset = window if offset is None else offset
+    # Rond het gemiddelde rekenen houdt de sommen klein en nauwkeurig
+    ref = float(prices.mean())
+    y = prices - ref
+    sum_y = np.convolve(y, np.ones(window), "valid")
+    sum_xy = np.correlate(y, np.arange(window, dtype=np.float64), "valid")
+    if window > 1:
+        sum_x = window * (window - 1) / 2
+        slope = (window * sum_xy - sum_x * sum_y) / (window * window * (window * window - 1) / 12)
+        intercept = (sum_y - slope * sum_x) / window
+    else:
+        slope = np.zeros_like(sum_y)
+        intercept = sum_y
+    predictions[window - 1:] = ref + intercept + slope * offset
+    return predictions
+
+
+def prediction_quality(prices, predictions, folds=1):
+    """Kwaliteit van ``predictions[t]`` als voorspelling van ``prices[t + 1]``.
+
+    Dezelfde definities als ``PredictionScore``: ticks zonder beweging tellen
+    niet mee voor de richting. De kalibratie is de hellingshoek van de
+    werkelijke tegen de voorspelde beweging (1 is perfect, onder 1 voorspelt
+    het model te grote bewegingen, rond 0 of negatief zit er geen informatie
+    in); per bak van de voorspelde beweging staan de gemiddelde voorspelde en
+    werkelijke beweging in ``calibration``.
+    """
+    base = prices[:-1]
+    actual = prices[1:]
+    predicted = predictions[:-1]
+    mask = np.isfinite(predicted)
+    base, actual, predicted = base[mask], actual[mask], predicted[mask]
+    if not len(base):
+        return {"predictions": 0}
+
+    error = np.abs(predicted - actual)
+    naive = np.abs(actual - base)
+    predicted_move = predicted - base
+    actual_move = actual - base
+    moved = actual_move != 0
+    hits = (predicted_move > 0) == (actual_move > 0)
+
+    variance = float(np.var(predicted_move))
+    slope = float(np.cov(predicted_move, actual_move, bias=True)[0, 1] / variance) if variance > 0 else float("nan")
+
+    fold_accuracy = []
+    for part_moved, part_hits in zip(np.array_split(moved, folds), np.array_split(hits, folds)):
+        fold_accuracy.append(float(part_hits[part_moved].mean()) if part_moved.any() else float("nan"))
+
+    calibration = []
+    order = np.argsort(predicted_move, kind="stable")
+    for chunk in np.array_split(order, min(CALIBRATION_BINS, len(order))):
+        calibration.append({
+            "predicted_move": float(predicted_move[chunk].mean()),
+            "actual_move": float(actual_move[chunk].mean()),
+            "direction_accuracy": float(hits[chunk][moved[chunk]].mean()) if moved[chunk].any() else float("nan"),
+        })
+
+    naive_total = float(naive.sum())
+    return {
+        "predictions": int(len(base)),
+        "mae": float(error.mean()),
+        "naive_mae": float(naive.mean()),
+        "skill": 1.0 - float(error.sum()) / naive_total if naive_total else float("nan"),
+        "direction_accuracy": float(hits[moved].mean()) if moved.any() else float("nan"),
+        "worst_fold_accuracy": float(np.nanmin(fold_accuracy)) if not np.isnan(fold_accuracy).all() else float("nan"),
+        "calibration_slope": slope,
+        "calibration": calibration,
+    }
+
+
+def strategy_predictions(strategy, timestamps, prices, strategy_config, window):
+    """(prijzen, voorspellingen) van een strategie bij venstergrootte ``window``."""
+    if strategy == "scalper":
+        return prices, trend_predictions(prices, window)
+    if strategy == "hodl":
+        # Zoals hodl.evaluate_signal: trend over de laatste dagen, voorspeld op x = len(prices)
+        _, closes = resample_closes(timestamps, prices, 86400)
+        return closes, trend_predictions(closes, window, strategy_config["SMA_WINDOW"] + window)
+    changes, _ = trader_signals(prices, strategy_config, rows=window)
+    return prices, prices * (1 + changes)
+
+
+def default_window(strategy, strategy_config):
+    if strategy == "scalper":
+        return strategy_config.get("WINDOW_SIZE", 10)
+    if strategy == "hodl":
+        return strategy_config["AI_PREDICTION_WINDOW"]
+    from trader import training_rows
+
+    return training_rows(strategy_config)
+
+
+def write_csv(path, results):
+    columns = ["window", "predictions", "mae", "naive_mae", "skill", "direction_accuracy",
+               "worst_fold_accuracy", "calibration_slope"]
+    with open(path, "w") as f:
+        f.write(",".join(columns) + "\n")
+        for result in results:
+            f.write(",".join(str(result.get(column, "")) for column in columns) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward evaluatie van de voorspellers van de bots.")
+    parser.add_argument("strategy", choices=["scalper", "hodl", "trader"])
+    parser.add_argument("data", help="CSV-, Parquet-, candle-cachebestand (.db) of map met tickopnames")
+    parser.add_argument("--config", required=True, help="scalper.json, hodl.json of trader.json")
+    parser.add_argument("--symbol", help="Markt uit een MARKETS-lijst (scalper)")
+    parser.add_argument("--windows", help="Kommagescheiden venstergroottes (standaard die uit de configuratie)")
+    parser.add_argument("--folds", type=int, default=5, help="Aantal opeenvolgende periodes voor de stabiliteit")
+    parser.add_argument("--calibration", action="store_true", help="Toon de kalibratietabel per venster")
+    parser.add_argument("--interval", default="1m", help="Candle-interval bij een .db-candle-cache")
+    parser.add_argument("--out", help="Schrijf de resultaten naar dit CSV-bestand")
+    args = parser.parse_args()
+
+    strategy_config = load_strategy_config(args.config, args.symbol)
+    timestamps, prices = load_prices(args.data, market_of(strategy_config, args.symbol), args.interval)
+    if args.windows:
+        windows = [int(window) for window in args.windows.split(",")]
+    else:
+        windows = [default_window(args.strategy, strategy_config)]
+
+    results = []
+    print(f"{'venster':>8} {'n':>9} {'MAE':>12} {'naïef':>12} {'skill':>8} {'richting':>9} "
+          f"{'slechtste':>9} {'kalibratie':>10} {'tijd':>7}")
+    for window in windows:
+        started = time.perf_counter()
+        series, predictions = strategy_predictions(args.strategy, timestamps, prices, strategy_config, window)
+        result = {"window": window, **prediction_quality(series, predictions, args.folds)}
+        elapsed = time.perf_counter() - started
+        results.append(result)
+        if not result["predictions"]:
+            print(f"{window:>8} {0:>9}  te weinig prijzen voor dit venster")
+            continue
+        print(f"{window:>8} {result['predictions']:>9} {result['mae']:>12.6g} {result['naive_mae']:>12.6g} "
+              f"{result['skill']:>+8.3f} {result['direction_accuracy']:>9.1%} {result['worst_fold_accuracy']:>9.1%} "
+              f"{result['calibration_slope']:>10.3f} {elapsed:>6.2f}s")
+        if args.calibration:
+            for row in result["calibration"]:
+                print(f"{'':>10} voorspeld {row['predicted_move']:>+12.6g}  werkelijk {row['actual_move']:>+12.6g}  "
+                      f"richting {row['direction_accuracy']:.1%}")
+    if args.out:
+        write_csv(args.out, results)
+        print(f"Resultaten geschreven naar {args.out}")
+
+
+if __name__ == "__main__":
+    main()
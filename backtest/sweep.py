@@ -0,0 +1,169 @@
+"""Parallelle parameter-sweep over de backtest.
+
+Evalueert een grid of een willekeurige steekproef van configuraties voor de
+scalper, hodl of trader over alle CPU-cores. De prijsreeks wordt één keer
+als memory-mapped ``.npy``-bestand weggeschreven en door elke worker
+gedeeld gemapt, in plaats van per taak gepickled. Het resultaat is een op
+winst/verlies gerangschikte tabel.
+
+Gebruik:
+    python backtest/sweep.py scalper SOL-EUR-1m.csv --config scalper.json --grid grid.json --out results.csv
+    python backtest/sweep.py trader SOL-EUR-1m.csv --config trader.json --grid grid.json --samples 2000
+
+Het grid-bestand koppelt configuratiesleutels aan een lijst waarden of aan
+een bereik ``{"min": .., "max": ..}`` (alleen met ``--samples``)::
+
+    {"WINDOW_SIZE": [8, 16, 32, 64], "THRESHOLD_SELL": [0.3, 0.5, 0.8], "STOP_LOSS": {"min": -3, "max": -0.5}}
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from backtest import STRATEGY_SETTINGS, load_prices, load_strategy_config, market_of, run_backtest
+
+# Per worker: de gedeelde, memory-mapped prijsreeks
+_shared = {}
+
+
+def _init_worker(timestamps_path, prices_path):
+    _shared["timestamps"] = np.load(timestamps_path, mmap_mode="r")
+    _shared["prices"] = np.load(prices_path, mmap_mode="r")
+
+
+def _evaluate(task):
+    strategy, strategy_config, params, fee_percentage = task
+    timestamps = _shared["timestamps"]
+    prices = _shared["prices"]
+    try:
+        ledger = run_backtest(strategy, timestamps, prices, {**strategy_config, **params}, fee_percentage)
+        summary = ledger.summary(float(prices[-1]))
+        summary["error"] = ""
+    except Exception as e:
+        summary = {"total_pnl": float("-inf"), "error": str(e)}
+    return {**params, **summary}
+
+
+def check_grid(grid, strategy, strategy_config):
+    """Weiger grid-sleutels die de strategie niet kent en die niet in de basisconfiguratie staan.
+
+    Zo'n sleutel verandert niets aan de backtest; de sweep zou alleen
+    dezelfde uitkomst vele keren berekenen.
+    """
+    unknown = sorted(set(grid) - STRATEGY_SETTINGS[strategy] - set(strategy_config))
+    if unknown:
+        raise SystemExit(f"Onbekende grid-sleutel(s) voor {strategy}: {', '.join(unknown)}. "
+                         f"Bekend: {', '.join(sorted(STRATEGY_SETTINGS[strategy]))}")
+
+
+def grid_configs(grid):
+    """Alle combinaties van de opgegeven waardenlijsten."""
+    for key, values in grid.items():
+        if not isinstance(values, list):
+            raise SystemExit(f"{key}: een bereik kan alleen met --samples gebruikt worden")
+    keys = list(grid)
+    for values in itertools.product(*(grid[key] for key in keys)):
+        yield dict(zip(keys, values))
+
+
+def random_configs(grid, samples, seed):
+    """Willekeurige steekproef uit lijsten en bereiken."""
+    rng = random.Random(seed)
+    for _ in range(samples):
+        params = {}
+        for key, spec in grid.items():
+            if isinstance(spec, list):
+                params[key] = rng.choice(spec)
+            elif isinstance(spec["min"], int) and isinstance(spec["max"], int):
+                params[key] = rng.randint(spec["min"], spec["max"])
+            else:
+                params[key] = rng.uniform(spec["min"], spec["max"])
+        yield params
+
+
+def share_prices(timestamps, prices, directory):
+    """Schrijf de reeksen naar .npy-bestanden die de workers kunnen mappen."""
+    paths = []
+    for name, array in (("timestamps", timestamps), ("prices", prices)):
+        path = os.path.join(directory, f"{name}.npy")
+        mapped = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=array.shape)
+        mapped[:] = array
+        mapped.flush()
+        del mapped
+        paths.append(path)
+    return paths
+
+
+def write_results(path, results):
+    columns = []
+    for result in results:
+        for key in result:
+            if key not in columns:
+                columns.append(key)
+    with open(path, "w") as f:
+        f.write(",".join(columns) + "\n")
+        for result in results:
+            f.write(",".join(str(result.get(column, "")) for column in columns) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallelle parameter-sweep over de backtest.")
+    parser.add_argument("strategy", choices=["scalper", "hodl", "trader"])
+    parser.add_argument("data", help="CSV-, Parquet-, candle-cachebestand (.db) of map met tickopnames")
+    parser.add_argument("--config", required=True, help="Basisconfiguratie (scalper.json, hodl.json of trader.json)")
+    parser.add_argument("--grid", required=True, help="JSON-bestand met parameterwaarden of -bereiken")
+    parser.add_argument("--symbol", help="Markt uit een MARKETS-lijst (scalper)")
+    parser.add_argument("--samples", type=int, help="Aantal willekeurige configuraties in plaats van het volledige grid")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fee", type=float, help="Handelskosten in procent per order")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--sort", default="total_pnl", help="Kolom waarop gerangschikt wordt (aflopend)")
+    parser.add_argument("--top", type=int, default=20, help="Aantal regels om te tonen")
+    parser.add_argument("--out", help="Schrijf de volledige gerangschikte tabel naar dit CSV-bestand")
+    parser.add_argument("--interval", default="1m", help="Candle-interval bij een .db-candle-cache")
+    args = parser.parse_args()
+
+    strategy_config = load_strategy_config(args.config, args.symbol)
+    with open(args.grid, "r") as f:
+        grid = json.load(f)
+    check_grid(grid, args.strategy, strategy_config)
+    if args.samples:
+        configs = list(random_configs(grid, args.samples, args.seed))
+    else:
+        configs = list(grid_configs(grid))
+    timestamps, prices = load_prices(args.data, market_of(strategy_config, args.symbol), args.interval)
+
+    tasks = [(args.strategy, strategy_config, params, args.fee) for params in configs]
+    chunksize = max(1, len(tasks) // (args.workers * 8))
+    shared_dir = tempfile.mkdtemp(prefix="sweep-")
+    started = time.perf_counter()
+    try:
+        timestamps_path, prices_path = share_prices(timestamps, prices, shared_dir)
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                 initargs=(timestamps_path, prices_path)) as executor:
+            results = list(executor.map(_evaluate, tasks, chunksize=chunksize))
+    finally:
+        shutil.rmtree(shared_dir, ignore_errors=True)
+    elapsed = time.perf_counter() - started
+
+    results.sort(key=lambda r: r.get(args.sort, float("-inf")), reverse=True)
+    print(f"{len(results)} configuraties op {len(prices)} prijzen in {elapsed:.1f}s met {args.workers} workers")
+    shown = list(grid) + ["trades", "fees", "realized_pnl", "total_pnl"]
+    print(" | ".join(f"{column:>14}" for column in ["rank"] + shown))
+    for rank, result in enumerate(results[:args.top], 1):
+        cells = [rank] + [result.get(column, "") for column in shown]
+        print(" | ".join(f"{cell:>14.4f}" if isinstance(cell, float) else f"{cell!s:>14}" for cell in cells))
+    if args.out:
+        write_results(args.out, results)
+        print(f"Resultaten geschreven naar {args.out}")
+
+
+if __name__ == "__main__":
+    main()
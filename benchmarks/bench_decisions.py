@@ -0,0 +1,360 @@
+"""Benchmark van de beslissing per tick van de scalper, hodl en trader, offline.
+
+Gebruik:
+    python benchmarks/bench_decisions.py [--ticks 500] [--windows 50 200 1000] [--bots scalper trader]
+    python benchmarks/bench_decisions.py --save       # Baseline in benchmarks/baselines/ bijwerken
+    python benchmarks/bench_decisions.py --compare    # Exitcode 1 bij een regressie (CI)
+
+Elke bot krijgt een synthetische prijsreeks en een gesimuleerde exchange
+(``SimulatedExchange`` met ``SyntheticFeed``, zonder netwerk en zonder
+echte wachttijden) en wordt tick voor tick door zijn beslispad gestuurd:
+
+- scalper ``tick``: prijs ophalen, ``MarketScalper.on_price`` en bij een
+  signaal de order plus ``apply_execution``, zoals ``trade_market``;
+- hodl ``evaluate_signal`` over SMA_WINDOW + AI_PREDICTION_WINDOW
+  slotkoersen, en los daarvan ``calculate_sma``, ``calculate_rsi`` en
+  ``train_model``;
+- trader ``tick``: prijs ophalen, ``TraderIndicators.update``,
+  ``evaluate_signal`` en koop/verkoop, en los daarvan
+  ``calculate_indicators`` (het hele venster) en ``train_ai_model``.
+
+Het venster is WINDOW_SIZE (scalper), SMA_WINDOW (hodl) of PRICE_WINDOW
+(trader). Per geval: percentielen van de latency per tick, doorvoer in
+ticks per seconde, en met ``tracemalloc`` in een aparte ronde de piek aan
+gealloceerd geheugen en wat er per tick blijft staan.
+
+Vóór elke meetronde wordt een vaste pure-Python-lus getimed; de baseline
+bewaart die kalibratietijd per geval. Bij ``--compare`` worden de
+baselinetijden met de verhouding tussen de kalibratietijden naar deze
+machine (en haar drukte op dat moment) geschaald. Alleen de p50 telt: een
+geval is een regressie als die meer dan ``--tolerance`` trager is én
+minstens ``--min-delta-us`` microseconden. De doorvoer en de hogere
+percentielen hangen te veel af van uitschieters (GC, andere processen) en
+worden alleen getoond; de ondergrens voorkomt dat ruis bij gevallen van
+een paar microseconden als regressie telt.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for bot_dir in ("bitvavo-scalper", "bitvavo-hodl", "bitvavo-trader"):
+    sys.path.insert(0, os.path.join(ROOT, bot_dir))
+
+BASELINE = os.path.join(ROOT, "benchmarks", "baselines", "decisions.json")
+MARKET = "SOL-EUR"
+
+SCALPER_CONFIG = {
+    "SYMBOL": MARKET, "THRESHOLD_BUY": -0.2, "THRESHOLD_SELL": 0.2, "STOP_LOSS": -1, "TRADE_AMOUNT": 0.1,
+    "CHECK_INTERVAL": 1, "DEMO_MODE": True, "TRADE_FEE_PERCENTAGE": 0.0, "ORDER_TYPE": "market",
+}
+HODL_CONFIG = {"AI_PREDICTION_WINDOW": 30, "RSI_OVERSOLD": 30, "RSI_OVERBOUGHT": 70}
+TRADER_CONFIG = {
+    "symbol": MARKET, "initial_budget": 100, "target_profit_percent": 0.5, "stop_loss_percent": -0.5,
+    "rsi_threshold_buy": 45, "prediction_threshold_buy": 0, "slow_macd": 26, "fast_macd": 12,
+    "signal_macd": 9, "sma_period": 10, "ema_period": 10, "model": "linear",
+}
+
+
+def synthetic_prices(count, seed=42, start=150.0, volatility=0.002):
+    rng = np.random.default_rng(seed)
+    return start * np.exp(np.cumsum(rng.normal(0.0, volatility, count)))
+
+
+def stub_exchange(seed=42):
+    """Deterministische exchange in het geheugen; elke request schuift de virtuele tijd één tick op."""
+    from simulator import SimulatedExchange, SyntheticFeed
+
+    return SimulatedExchange(SyntheticFeed({MARKET: 150.0}, seed=seed, volatility=0.3), seed=seed,
+                             start_time=1_700_000_000)
+
+
+# Gevallen: (bot, naam, fabriek(venster, prijzen) -> (tick, opwarmticks))
+
+
+def scalper_tick(window, prices):
+    from execution import OrderExecutor
+    from scalper import MarketScalper
+
+    exchange = stub_exchange()
+    config = dict(SCALPER_CONFIG, WINDOW_SIZE=window)
+    bot = MarketScalper(config, data_dir=None, clock=exchange.clock_for(MARKET), verbose=False)
+    executor = OrderExecutor.from_config(exchange, MARKET, config, fee_percentage=bot.trade_fee_percentage)
+
+    def tick():
+        price = float(exchange.tickerPrice({"market": MARKET})["price"])
+        signal = bot.on_price(price)
+        if signal is not None:
+            side = signal[0]
+            amount = bot.trade_amount if side == "buy" else bot.position_amount()
+            bot.apply_execution(executor.execute(side, amount, price))
+    return tick, window
+
+
+def hodl_closes(window, prices, call):
+    """Tick die ``call`` aanroept op het schuivende venster van SMA_WINDOW + AI_PREDICTION_WINDOW slotkoersen."""
+    history = window + HODL_CONFIG["AI_PREDICTION_WINDOW"]
+    ends = itertools.count(history)
+
+    def tick():
+        end = next(ends)
+        call(prices[end - history:end])
+    return tick, 0
+
+
+def hodl_evaluate(window, prices):
+    from hodl import evaluate_signal
+
+    return hodl_closes(window, prices, lambda closes: evaluate_signal(
+        closes, window, HODL_CONFIG["AI_PREDICTION_WINDOW"], HODL_CONFIG["RSI_OVERSOLD"],
+        HODL_CONFIG["RSI_OVERBOUGHT"]))
+
+
+def hodl_sma(window, prices):
+    from hodl import calculate_sma
+
+    return hodl_closes(window, prices, lambda closes: calculate_sma(closes, window))
+
+
+def hodl_rsi(window, prices):
+    from hodl import calculate_rsi
+
+    return hodl_closes(window, prices, lambda closes: calculate_rsi(closes, 14))
+
+
+def hodl_train(window, prices):
+    from hodl import predict_price, train_model
+
+    ai_window = HODL_CONFIG["AI_PREDICTION_WINDOW"]
+    return hodl_closes(window, prices, lambda closes: predict_price(train_model(closes[-ai_window:]), len(closes)))
+
+
+def trader_state(window):
+    """``TraderIndicators`` met PRICE_WINDOW = ``window``; alleen de constructor leest PRICE_WINDOW."""
+    import trader
+
+    original = trader.PRICE_WINDOW
+    trader.PRICE_WINDOW = window
+    try:
+        return trader.TraderIndicators(TRADER_CONFIG)
+    finally:
+        trader.PRICE_WINDOW = original
+
+
+def trader_tick(window, prices):
+    from execution import OrderExecutor
+    from trader import evaluate_signal
+
+    exchange = stub_exchange()
+    executor = OrderExecutor(exchange, MARKET, **exchange.executor_options(MARKET))
+    state = trader_state(window)
+    position = {"amount": 0.0, "buy_price": 0.0}
+
+    def tick():
+        price = float(exchange.tickerPrice({"market": MARKET})["price"])
+        state.update(price)
+        prediction, rsi = evaluate_signal(state, TRADER_CONFIG["model"])
+        if not position["amount"]:
+            if (prediction <= TRADER_CONFIG["prediction_threshold_buy"]
+                    and rsi < TRADER_CONFIG["rsi_threshold_buy"]):
+                execution = executor.execute("buy", TRADER_CONFIG["initial_budget"] / price, price)
+                if execution.filled_amount > 0:
+                    position.update(amount=execution.filled_amount, buy_price=execution.price)
+        else:
+            profit_percent = (price - position["buy_price"]) / position["buy_price"] * 100
+            if (profit_percent >= TRADER_CONFIG["target_profit_percent"]
+                    or profit_percent <= TRADER_CONFIG["stop_loss_percent"]):
+                execution = executor.execute("sell", position["amount"], price)
+                position["amount"] = max(0.0, position["amount"] - execution.filled_amount)
+    return tick, window
+
+
+def trader_indicators(window, prices):
+    from trader import calculate_indicators
+
+    ends = itertools.count(window)
+
+    def tick():
+        end = next(ends)
+        calculate_indicators(prices[end - window:end], TRADER_CONFIG)
+    return tick, 0
+
+
+def trader_train(window, prices):
+    from trader import train_ai_model
+
+    state = trader_state(window)
+    for price in prices[:window].tolist():
+        state.update(price)
+    following = iter(prices[window:].tolist())
+
+    def tick():
+        state.update(next(following))
+        features, targets, _ = state.training_data()
+        train_ai_model(features, targets, TRADER_CONFIG["model"])
+    return tick, 0
+
+
+CASES = [
+    ("scalper", "tick", scalper_tick),
+    ("hodl", "evaluate_signal", hodl_evaluate),
+    ("hodl", "calculate_sma", hodl_sma),
+    ("hodl", "calculate_rsi", hodl_rsi),
+    ("hodl", "train_model", hodl_train),
+    ("trader", "tick", trader_tick),
+    ("trader", "calculate_indicators", trader_indicators),
+    ("trader", "train_ai_model", trader_train),
+]
+
+
+def measure(factory, window, ticks, alloc_ticks, rounds):
+    """Statistieken van ``ticks`` gemeten ticks, na opwarmen, plus een aparte allocatieronde.
+
+    De ticks worden in ``rounds`` rondes gemeten, elk direct na een
+    kalibratie. De ronde met de mediane p50 ten opzichte van haar
+    kalibratie telt: een ronde die samen met haar kalibratie vertraagd
+    wordt, valt zo weg, en één uitschieter naar boven of beneden telt niet.
+    """
+    prices = synthetic_prices(2 * window + 64 + rounds * ticks + alloc_ticks)
+    tick, warmup = factory(window, prices)
+    for _ in range(warmup + 10):
+        tick()
+
+    perf_counter = time.perf_counter
+    measured = []
+    for _ in range(rounds):
+        calibration = calibrate()
+        timings = np.empty(ticks)
+        started = perf_counter()
+        for i in range(ticks):
+            t0 = perf_counter()
+            tick()
+            timings[i] = perf_counter() - t0
+        elapsed = perf_counter() - started
+        measured.append((np.median(timings) / calibration, timings, elapsed, calibration))
+    measured.sort(key=lambda item: item[0])
+    _, timings, elapsed, calibration = measured[len(measured) // 2]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(alloc_ticks):
+        tick()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    p50, p90, p99 = np.percentile(timings, [50, 90, 99]) * 1e6
+    return {
+        "p50_us": p50, "p90_us": p90, "p99_us": p99, "max_us": timings.max() * 1e6,
+        "ticks_per_second": ticks / elapsed,
+        "peak_kib": (peak - before) / 1024,
+        "retained_bytes_per_tick": (current - before) / alloc_ticks,
+        "calibration_us": calibration * 1e6,
+    }
+
+
+def calibrate(runs=3):
+    """Snelste tijd (s) van een vaste pure-Python-lus, om baselines tussen machines te schalen."""
+    def work():
+        total = 0.0
+        for i in range(50_000):
+            total += i * 0.5
+        return total
+
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        work()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def run(args):
+    results = {}
+    print(f"{'bot':>8} {'geval':>21} {'venster':>8} {'p50 us':>9} {'p90 us':>9} {'p99 us':>9} {'max us':>9} "
+          f"{'ticks/s':>10} {'piek KiB':>9} {'vast B/tick':>12}")
+    for bot, name, factory in CASES:
+        if bot not in args.bots:
+            continue
+        for window in args.windows:
+            stats = measure(factory, window, args.ticks, args.alloc_ticks, args.rounds)
+            results[f"{bot}/{name}/{window}"] = stats
+            print(f"{bot:>8} {name:>21} {window:>8} {stats['p50_us']:>9.1f} {stats['p90_us']:>9.1f} "
+                  f"{stats['p99_us']:>9.1f} {stats['max_us']:>9.1f} {stats['ticks_per_second']:>10.0f} "
+                  f"{stats['peak_kib']:>9.1f} {stats['retained_bytes_per_tick']:>12.1f}")
+    return results
+
+
+def compare(results, baseline, tolerance, min_delta_us):
+    """Vergelijk de p50 met de baseline; geeft het aantal regressies terug."""
+    print(f"\nTegen de baseline van {baseline['machine']['platform']} (Python {baseline['machine']['python']}), "
+          f"geschaald per geval met de kalibratie:")
+    print(f"{'geval':>36} {'schaal':>7} {'p50':>8} {'+us':>8} {'ticks/s':>8}  status")
+    regressions = 0
+    for key, stats in results.items():
+        old = baseline["cases"].get(key)
+        if old is None:
+            print(f"{key:>36} {'-':>7} {'-':>8} {'-':>8} {'-':>8}  nieuw")
+            continue
+        scale = stats["calibration_us"] / old["calibration_us"]
+        expected = old["p50_us"] * scale
+        latency = stats["p50_us"] / expected
+        delta = stats["p50_us"] - expected
+        throughput = (old["ticks_per_second"] / scale) / stats["ticks_per_second"]
+        regressed = latency > 1 + tolerance and delta > min_delta_us
+        regressions += regressed
+        print(f"{key:>36} {scale:>6.2f}x {latency:>7.2f}x {delta:>8.1f} {throughput:>7.2f}x  "
+              f"{'REGRESSIE' if regressed else 'ok'}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=500, help="Gemeten ticks per ronde")
+    parser.add_argument("--rounds", type=int, default=7, help="Rondes per geval; de mediane ronde telt")
+    parser.add_argument("--alloc-ticks", type=int, default=200, help="Ticks in de allocatieronde")
+    parser.add_argument("--windows", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--bots", nargs="+", default=["scalper", "hodl", "trader"],
+                        choices=["scalper", "hodl", "trader"])
+    parser.add_argument("--baseline", default=BASELINE, help="Baselinebestand voor --save en --compare")
+    parser.add_argument("--save", action="store_true", help="Schrijf de resultaten als nieuwe baseline")
+    parser.add_argument("--compare", action="store_true", help="Vergelijk met de baseline; exitcode 1 bij regressie")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Toegestane vertraging van de p50 (0.5 = 50%%)")
+    parser.add_argument("--min-delta-us", type=float, default=5.0,
+                        help="Kleinere vertragingen van de p50 (in microseconden) tellen niet als regressie")
+    args = parser.parse_args()
+
+    results = run(args)
+
+    if args.compare:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_us)
+        if regressions:
+            print(f"\n{regressions} regressie(s) van meer dan {args.tolerance:.0%} en {args.min_delta_us:g} us.")
+            sys.exit(1)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        baseline = {
+            "machine": {"platform": platform.platform(), "python": platform.python_version(),
+                        "numpy": np.__version__},
+            "ticks": args.ticks,
+            "rounds": args.rounds,
+            "cases": {key: {name: round(value, 3) for name, value in stats.items()}
+                      for key, stats in results.items()},
+        }
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline geschreven naar {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Microbenchmark: incrementele RollingRegression tegen de oude sklearn-refit per tick.
+
+Gebruik:
+    python benchmarks/bench_regression.py [--ticks 2000] [--windows 8 32 128 1000 10000]
+    python benchmarks/bench_regression.py --features 4 [--alpha 0.1]
+
+Voor elke venstergrootte wordt een synthetische prijsreeks tick voor tick
+verwerkt. Het sklearn-pad bouwt zoals voorheen elke tick nieuwe arrays, fit een
+``LinearRegression`` en voorspelt de volgende prijs; het incrementele pad werkt
+één ``RollingRegression`` bij. Beide voorspellingen worden vergeleken.
+
+Met ``--features`` wordt het model van de trader gemeten: ``RollingLinearModel``
+(rang-1-updates van de normaalvergelijkingen) tegen een refit per tick op
+synthetische kenmerken, met ``Ridge`` in plaats van ``LinearRegression`` als
+``--alpha`` > 0. Zonder scikit-learn dient een NumPy-refit als referentie.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "bitvavo-scalper"))
+
+from regression import RollingLinearModel, RollingRegression  # noqa: E402
+
+
+def synthetic_prices(count, seed=42, start=150.0):
+    rng = random.Random(seed)
+    prices = []
+    price = start
+    for _ in range(count):
+        price *= 1 + rng.gauss(0, 0.002)
+        prices.append(price)
+    return prices
+
+
+def sklearn_path(prices, window, ticks):
+    import numpy as np
+    from sklearn.linear_model import LinearRegression
+
+    predictions = []
+    start = time.perf_counter()
+    for i in range(window, window + ticks):
+        history = prices[i - window:i]
+        times = np.arange(len(history)).reshape(-1, 1)
+        values = np.array(history).reshape(-1, 1)
+        model = LinearRegression()
+        model.fit(times, values)
+        predictions.append(model.predict([[len(history)]])[0][0])
+    return time.perf_counter() - start, predictions
+
+
+def rolling_path(prices, window, ticks):
+    model = RollingRegression(window)
+    model.extend(prices[:window - 1])
+    predictions = []
+    start = time.perf_counter()
+    for i in range(window - 1, window - 1 + ticks):
+        model.update(prices[i])
+        predictions.append(model.predict(window))
+    return time.perf_counter() - start, predictions
+
+
+def synthetic_samples(count, features, seed=42):
+    """Kenmerken en doelen met ruis, een paar NaN-doelen en twee sterk gecorreleerde kolommen."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    x = rng.normal(0.0, 1.0, (count, features)) * rng.uniform(0.001, 50.0, features)
+    if features > 1:
+        x[:, -1] = 0.9 * x[:, -2] + 0.1 * x[:, -1]
+    y = x @ rng.normal(0.0, 0.01, features) + rng.normal(0.0, 0.001, count)
+    y[rng.random(count) < 0.05] = np.nan
+    return x, y
+
+
+def refit_path(x, y, window, ticks, alpha):
+    """Per tick het venster kopiëren, NaN's wegfilteren en opnieuw fitten (het oude trader-pad)."""
+    import numpy as np
+
+    try:
+        from sklearn.linear_model import LinearRegression, Ridge
+
+        def fit(features, targets):
+            return (Ridge(alpha=alpha) if alpha else LinearRegression()).fit(features, targets)
+    except ImportError:
+        def fit(features, targets):
+            x_mean = features.mean(axis=0)
+            y_mean = targets.mean()
+            centered = features - x_mean
+            a = centered.T @ centered + alpha * np.eye(features.shape[1])
+            coef = np.linalg.lstsq(a, centered.T @ (targets - y_mean), rcond=None)[0]
+            return type("Fit", (), {"predict": lambda self, f: f @ coef + y_mean - x_mean @ coef})()
+
+    predictions = []
+    start = time.perf_counter()
+    for i in range(window, window + ticks):
+        features = x[i - window:i]
+        targets = y[i - window:i]
+        valid = np.isfinite(targets)
+        predictions.append(fit(features[valid], targets[valid]).predict(x[i:i + 1])[0])
+    return time.perf_counter() - start, predictions
+
+
+def rolling_linear_path(x, y, window, ticks, alpha):
+    model = RollingLinearModel(x.shape[1], window, alpha)
+    for i in range(window - 1):
+        model.update(x[i], y[i])
+    predictions = []
+    start = time.perf_counter()
+    for i in range(window, window + ticks):
+        model.update(x[i - 1], y[i - 1])
+        predictions.append(model.predict_one(x[i]))
+    return time.perf_counter() - start, predictions
+
+
+def bench_features(args):
+    print(f"{args.features} kenmerken, alpha {args.alpha}")
+    print(f"{'venster':>8} {'refit us/tick':>14} {'rolling us/tick':>16} {'versnelling':>12} {'max afwijking':>14}")
+    for window in args.windows:
+        x, y = synthetic_samples(window + args.ticks, args.features)
+        rolling_time, rolling_pred = rolling_linear_path(x, y, window, args.ticks, args.alpha)
+        refit_time, refit_pred = refit_path(x, y, window, args.ticks, args.alpha)
+        rolling_us = rolling_time / args.ticks * 1e6
+        refit_us = refit_time / args.ticks * 1e6
+        max_diff = max(abs(a - b) for a, b in zip(refit_pred, rolling_pred))
+        print(f"{window:>8} {refit_us:>14.1f} {rolling_us:>16.1f} {refit_us / rolling_us:>11.1f}x {max_diff:>14.2e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=2000)
+    parser.add_argument("--windows", type=int, nargs="+", default=[8, 32, 128, 1000, 10000])
+    parser.add_argument("--features", type=int, help="Meet het model van de trader met zoveel kenmerken")
+    parser.add_argument("--alpha", type=float, default=0.0, help="Ridge-regularisatie voor --features")
+    args = parser.parse_args()
+
+    if args.features:
+        bench_features(args)
+        return
+
+    try:
+        import sklearn  # noqa: F401
+        have_sklearn = True
+    except ImportError:
+        have_sklearn = False
+        print("scikit-learn niet geïnstalleerd: alleen het incrementele pad wordt gemeten.")
+
+    print(f"{'venster':>8} {'sklearn us/tick':>16} {'rolling us/tick':>16} {'versnelling':>12} {'max afwijking':>14}")
+    for window in args.windows:
+        prices = synthetic_prices(window + args.ticks)
+        rolling_time, rolling_pred = rolling_path(prices, window, args.ticks)
+        rolling_us = rolling_time / args.ticks * 1e6
+        if have_sklearn:
+            sklearn_time, sklearn_pred = sklearn_path(prices, window, args.ticks)
+            sklearn_us = sklearn_time / args.ticks * 1e6
+            max_diff = max(abs(a - b) for a, b in zip(sklearn_pred, rolling_pred))
+            print(f"{window:>8} {sklearn_us:>16.1f} {rolling_us:>16.2f} {sklearn_us / rolling_us:>11.0f}x {max_diff:>14.2e}")
+        else:
+            print(f"{window:>8} {'-':>16} {rolling_us:>16.2f} {'-':>12} {'-':>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Opstartbenchmark: hoe lang duurt ``import <bot>`` in een vers interpreterproces?
+
+Gebruik:
+    python benchmarks/bench_startup.py [--runs 7] [--top 8] [--before HEAD~1]
+
+Per bot wordt het botmodule in een nieuw Python-proces geïmporteerd (zonder
+de bot te starten) en de mediane wandkloktijd over ``--runs`` metingen
+gerapporteerd, met en zonder de kale opstart van de interpreter. Met
+``-X importtime`` volgen de zwaarste directe imports van de bot. Een
+eerste, ongemeten run compileert de bytecode, net als ``compileall`` in de
+Dockerfiles.
+
+Met ``--before <git-ref>`` worden de botmappen van die revisie via
+``git archive`` in een tijdelijke map uitgepakt en naast de huidige tree
+gemeten, zodat het verschil voor en na een wijziging zichtbaar is.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Bot -> (map, module)
+BOTS = {
+    "scalper": ("bitvavo-scalper", "scalper"),
+    "hodl": ("bitvavo-hodl", "hodl"),
+    "trader": ("bitvavo-trader", "trader"),
+}
+
+
+def run_python(code, cwd, extra_args=()):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, *extra_args, "-c", code], cwd=cwd,
+                            capture_output=True, text=True)
+    return time.perf_counter() - started, result
+
+
+def median_import_time(module, cwd, runs):
+    """Mediane tijd in seconden, of None als de import mislukt (bijv. ontbrekende dependency)."""
+    _, result = run_python(f"import {module}", cwd)
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1]
+    return statistics.median(run_python(f"import {module}", cwd)[0] for _ in range(runs)), None
+
+
+def heaviest_imports(module, cwd, top):
+    """De ``top`` zwaarste directe imports van het botmodule volgens ``-X importtime`` (cumulatief, ms)."""
+    _, result = run_python(f"import {module}", cwd, ("-X", "importtime"))
+    imports = []
+    for line in result.stderr.splitlines():
+        # Formaat: "import time: <self us> | <cumulatief us> | <2 spaties per niveau><naam>"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        if name.startswith("   ") and name[3:4] != " ":  # Niveau 1: direct geïmporteerd door de bot
+            imports.append((int(cumulative_us) / 1000, name.strip()))
+    imports.sort(reverse=True)
+    return imports[:top]
+
+
+def extract_tree(ref, directory):
+    """Pak de botmappen van ``ref`` uit in ``directory``."""
+    archive = os.path.join(directory, "tree.tar")
+    with open(archive, "wb") as f:
+        subprocess.run(["git", "-C", ROOT, "archive", ref, *(folder for folder, _ in BOTS.values())],
+                       stdout=f, check=True)
+    with tarfile.open(archive) as tar:
+        tar.extractall(directory, filter="data")
+    return directory
+
+
+def measure(root, args):
+    results = {}
+    for bot, (folder, module) in BOTS.items():
+        cwd = os.path.join(root, folder)
+        seconds, error = median_import_time(module, cwd, args.runs)
+        results[bot] = (seconds, error, heaviest_imports(module, cwd, args.top) if error is None else [])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7, help="Aantal metingen per bot (mediaan)")
+    parser.add_argument("--top", type=int, default=8, help="Aantal zwaarste imports per bot")
+    parser.add_argument("--before", help="Git-revisie om mee te vergelijken, bijv. HEAD~1")
+    args = parser.parse_args()
+
+    interpreter = statistics.median(run_python("pass", ROOT)[0] for _ in range(args.runs))
+    print(f"Kale interpreter: {interpreter * 1000:.0f} ms (mediaan van {args.runs})")
+
+    after = measure(ROOT, args)
+    before = None
+    if args.before:
+        with tempfile.TemporaryDirectory() as directory:
+            before = measure(extract_tree(args.before, directory), args)
+
+    print()
+    header = f"{'bot':>8} {'nu ms':>8} {'excl. interpreter':>18}"
+    if before:
+        header += f" {args.before + ' ms':>14} {'versnelling':>12}"
+    print(header)
+    for bot, (seconds, error, _) in after.items():
+        if error:
+            print(f"{bot:>8} import mislukt: {error}")
+            continue
+        line = f"{bot:>8} {seconds * 1000:>8.0f} {(seconds - interpreter) * 1000:>18.0f}"
+        if before:
+            old, old_error, _ = before[bot]
+            if old_error:
+                line += f" {'mislukt':>14} {'-':>12}"
+            else:
+                line += f" {old * 1000:>14.0f} {(old - interpreter) / max(seconds - interpreter, 1e-9):>11.1f}x"
+        print(line)
+
+    for label, results in (("nu", after), (args.before, before)):
+        if not results:
+            continue
+        for bot, (_, error, imports) in results.items():
+            if error:
+                continue
+            print(f"\nZwaarste imports {bot} ({label}):")
+            for cumulative_ms, name in imports:
+                print(f"  {cumulative_ms:>8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
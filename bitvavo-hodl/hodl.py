@@ -1,15 +1,23 @@
-from python_bitvavo_api.bitvavo import Bitvavo
-from sklearn.linear_model import LinearRegression
-import numpy as np
+from bitvavo_client import BitvavoAPIError, BitvavoClient
+from candle_aggregator import CandleAggregator
+from candle_store import CandleStore
+from execution import OrderExecutor
+from hub_client import HubClient
+from indicators import RSI, SMA
+from journal import Journal, atomic_write_json
+from metrics import BotMetrics
+from notifier import SlackNotifier
+from pnl import PnlTracker
+from regression import RollingRegression
+from scheduler import Scheduler
+from simulator import SimulatedExchange
 import json
-import requests
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta
 import os
 import time
 
 # Configuratiebestanden
 DATA_DIR = "data"
-os.makedirs(DATA_DIR, exist_ok=True)
 
 
 def load_config(file_path):
@@ -17,38 +25,96 @@ def load_config(file_path):
         return json.load(f)
 
 
-# Configuratie laden
-config = load_config("config.json")
-hodl_config = load_config("hodl.json")
-
-# Bitvavo-instantie
-bitvavo = Bitvavo({
-    'APIKEY': config['API_KEY'],
-    'APISECRET': config['API_SECRET'],
-    'RESTURL': 'https://api.bitvavo.com/v2',
-    'WSURL': 'wss://ws.bitvavo.com/v2/',
-    'ACCESSWINDOW': 10000,
-    'DEBUGGING': False
-})
-
-# Configuratievariabelen
-SYMBOL = hodl_config["SYMBOL"]
-TRADE_AMOUNT = hodl_config["TRADE_AMOUNT"]
-CHECK_INTERVAL = hodl_config["CHECK_INTERVAL"]
-RSI_OVERBOUGHT = hodl_config["RSI_OVERBOUGHT"]
-RSI_OVERSOLD = hodl_config["RSI_OVERSOLD"]
-SMA_WINDOW = hodl_config["SMA_WINDOW"]
-AI_PREDICTION_WINDOW = hodl_config["AI_PREDICTION_WINDOW"]
-DEMO_MODE = hodl_config["DEMO_MODE"]
-
-# Configuratie laden uit slack.json
-slack_config = load_config('slack.json')
-SLACK_WEBHOOK_URL = slack_config.get("SLACK_WEBHOOK_URL")
-print(f"Slack configuratie: {slack_config}")
-
-# Dynamische bestandsnamen
-STATUS_FILE = os.path.join(DATA_DIR, f"status_{SYMBOL}.json")
-TRANSACTIONS_FILE = os.path.join(DATA_DIR, f"transactions_{SYMBOL}.json")
+# Runtime-configuratie, gevuld door load_runtime() bij het starten van de bot.
+# Zo blijft de module importeerbaar voor offline gebruik (backtests).
+config = {}
+hodl_config = {}
+bitvavo = None
+market_data = None
+SYMBOL = None
+TRADE_AMOUNT = None
+CHECK_INTERVAL = 86400
+# Na een trade zoveel dagen niet opnieuw handelen
+CHECK_INTERVAL_DAYS = 0
+RSI_OVERBOUGHT = None
+RSI_OVERSOLD = None
+SMA_WINDOW = None
+AI_PREDICTION_WINDOW = None
+DEMO_MODE = True
+SLACK_WEBHOOK_URL = None
+notifier = None
+STATUS_FILE = None
+TRANSACTIONS_FILE = None
+candle_store = None
+CANDLE_MAX_AGE = 300
+# Dagcandles uit de eigen tickerprijzen (AGGREGATE_CANDLES), anders None
+candle_aggregator = None
+executor = None
+METRICS_PORT = None
+# Latency per stap, loop-lag, fouten, orders en positie; alleen geserveerd met METRICS_PORT
+metrics = BotMetrics("hodl")
+
+
+def load_runtime():
+    """Laad config.json, hodl.json en slack.json en maak de Bitvavo-client aan."""
+    global config, hodl_config, bitvavo, market_data, SYMBOL, TRADE_AMOUNT, CHECK_INTERVAL
+    global RSI_OVERBOUGHT, RSI_OVERSOLD, SMA_WINDOW, AI_PREDICTION_WINDOW, DEMO_MODE
+    global SLACK_WEBHOOK_URL, notifier, STATUS_FILE, TRANSACTIONS_FILE, candle_store, CANDLE_MAX_AGE, executor
+    global METRICS_PORT, CHECK_INTERVAL_DAYS, candle_aggregator
+
+    # Configuratie laden
+    config = load_config("config.json")
+    hodl_config = load_config("hodl.json")
+
+    # Bitvavo-client met timeouts, retries en rate-limitbudget
+    bitvavo = BitvavoClient.from_config(config)
+    # Candles via de market-data hub als MARKET_HUB is ingesteld, anders rechtstreeks
+    market_data = HubClient.from_config(config, fallback=bitvavo) or bitvavo
+
+    # Configuratievariabelen
+    SYMBOL = hodl_config["SYMBOL"]
+    TRADE_AMOUNT = hodl_config["TRADE_AMOUNT"]
+    CHECK_INTERVAL = hodl_config.get("CHECK_INTERVAL", 86400)
+    CHECK_INTERVAL_DAYS = hodl_config.get("CHECK_INTERVAL_DAYS", 0)
+    RSI_OVERBOUGHT = hodl_config["RSI_OVERBOUGHT"]
+    RSI_OVERSOLD = hodl_config["RSI_OVERSOLD"]
+    SMA_WINDOW = hodl_config["SMA_WINDOW"]
+    AI_PREDICTION_WINDOW = hodl_config["AI_PREDICTION_WINDOW"]
+    DEMO_MODE = hodl_config["DEMO_MODE"]
+    METRICS_PORT = hodl_config.get("METRICS_PORT")
+
+    # In DEMO_MODE met SIMULATOR in config.json gaan candles en orders naar de gesimuleerde exchange
+    simulator = SimulatedExchange.from_config(config) if DEMO_MODE else None
+    if simulator is not None:
+        bitvavo = market_data = simulator
+        print(f"[SIM] Handelen tegen de gesimuleerde exchange ({type(simulator.feed).__name__}).")
+
+    # Orderuitvoering (market of limit/post-only) met het volgen van fills
+    executor = OrderExecutor.from_config(bitvavo, SYMBOL, hodl_config)
+
+    # Configuratie laden uit slack.json
+    slack_config = load_config('slack.json')
+    SLACK_WEBHOOK_URL = slack_config.get("SLACK_WEBHOOK_URL")
+    notifier = SlackNotifier.from_config(slack_config)
+    print(f"Slack configuratie: {slack_config}")
+
+    # Dynamische bestandsnamen
+    os.makedirs(DATA_DIR, exist_ok=True)
+    STATUS_FILE = os.path.join(DATA_DIR, f"status_{SYMBOL}.json")
+    TRANSACTIONS_FILE = os.path.join(DATA_DIR, f"transactions_{SYMBOL}.jsonl")
+
+    # Lokale candle-cache; binnen CANDLE_MAX_AGE seconden geen nieuw request
+    # (gesimuleerde candles alleen in het geheugen, zodat ze de echte cache niet vervuilen)
+    candle_store = CandleStore(":memory:" if simulator is not None else os.path.join(DATA_DIR, "candles.db"))
+    CANDLE_MAX_AGE = hodl_config.get("CANDLE_MAX_AGE", 300)
+    # Met AGGREGATE_CANDLES wordt de cache alleen bij het starten gelezen en daarna de lopende dagcandle
+    # bijgehouden uit de tickerprijs van elke ronde
+    if hodl_config.get("AGGREGATE_CANDLES", False):
+        candle_aggregator = CandleAggregator(
+            ("1d",), capacity=SMA_WINDOW + AI_PREDICTION_WINDOW,
+            clock=simulator.clock_for(SYMBOL) if simulator is not None else time.time)
+
+    print(f"HODL bot gestart met configuratie: {hodl_config}")
 
 # Laad en sla status op
 def load_status(file_path):
@@ -60,32 +126,20 @@ def load_status(file_path):
 
 
 def save_status(file_path, status):
-    with open(file_path, 'w') as f:
-        json.dump(status, f, indent=4)
+    atomic_write_json(file_path, status, indent=4)
 
-# Laad en sla transacties op
-def load_transactions(file_path):
-    try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return []
-
-
-def save_transactions(file_path, transactions):
-    with open(file_path, 'w') as f:
-        json.dump(transactions, f, indent=4)
+# Transactiejournaal openen (een oud JSON-transactiebestand wordt eenmalig omgezet)
+def open_journal(file_path):
+    journal = Journal(file_path)
+    journal.migrate_json_array(os.path.join(DATA_DIR, f"transactions_{SYMBOL}.json"))
+    return journal
 
 
-print(f"HODL bot gestart met configuratie: {hodl_config}")
-
 # Slack-bericht sturen
 def send_to_slack(message):
-    payload = {"text": message}
-    try:
-        requests.post(SLACK_WEBHOOK_URL, json=payload)
-    except Exception as e:
-        print(f"[FOUT] Kon bericht niet naar Slack sturen: {e}")
+    """Zet een bericht in de Slack-wachtrij; versturen gebeurt op de achtergrond."""
+    if notifier is not None:
+        notifier.notify(message)
 
 
 # Logfunctie
@@ -101,140 +155,180 @@ def log_message(message):
 
 # Historische prijzen ophalen
 def get_historical_prices(symbol, days=200):
-    end_time = int(datetime.now(timezone.utc).timestamp() * 1000)
-    start_time = end_time - (days * 24 * 60 * 60 * 1000)
-    candles = bitvavo.candles(
-        symbol, '1d', {'start': start_time, 'end': end_time})
-    return [float(c[2]) for c in candles]  # Sluitingsprijzen
-
-# Bereken SMA
+    """Slotkoersen van de laatste ``days`` dagcandles, oud naar nieuw, uit de candle-cache.
+
+    Met AGGREGATE_CANDLES komt alleen de eerste keer de cache eraan te pas;
+    daarna werkt de tickerprijs de lopende dagcandle bij.
+    """
+    if candle_aggregator is None:
+        return candle_store.recent_closes(market_data, symbol, '1d', days, max_age=CANDLE_MAX_AGE)
+    if not candle_aggregator.ticks:
+        candle_store.recent_closes(market_data, symbol, '1d', days, max_age=CANDLE_MAX_AGE)
+        candle_aggregator["1d"].seed(candle_store.load(symbol, '1d', limit=days), now=candle_aggregator.clock())
+    candle_aggregator.update(float(market_data.tickerPrice({"market": symbol})["price"]))
+    return candle_aggregator["1d"].closes(days, include_open=True)
+
+# Bereken SMA; met minder dan ``window`` prijzen het gemiddelde van wat er is
 def calculate_sma(prices, window):
-    return np.mean(prices[-window:])
-
-# Bereken RSI
+    prices = prices[-window:]
+    if not len(prices):
+        return float("nan")
+    sma = SMA(len(prices))
+    for price in prices:
+        sma.update(price)
+    return sma.value
+
+# Bereken RSI over de laatste ``window`` prijsveranderingen (of zoveel als er zijn)
 def calculate_rsi(prices, window=14):
-    deltas = np.diff(prices)
-    gains = np.where(deltas > 0, deltas, 0)
-    losses = np.where(deltas < 0, abs(deltas), 0)
-
-    avg_gain = np.mean(gains[-window:])
-    avg_loss = np.mean(losses[-window:])
-
-    if avg_loss == 0:
+    prices = prices[-(window + 1):]
+    if len(prices) < 2:
+        return float("nan")
+    rsi = RSI(len(prices) - 1)
+    for price in prices:
+        rsi.update(price)
+    if rsi.loss.value == 0:
         return 100
-
-    rs = avg_gain / avg_loss
-    return 100 - (100 / (1 + rs))
+    return rsi.value
 
 # AI-modellering
 def train_model(prices):
-    times = np.arange(len(prices)).reshape(-1, 1)
-    prices = np.array(prices).reshape(-1, 1)
-    model = LinearRegression()
-    model.fit(times, prices)
-    return model
+    return RollingRegression.from_prices(prices)
 
 
 def predict_price(model, next_time):
-    return model.predict([[next_time]])[0][0]
+    return model.predict(next_time)
+
+# Koop-/verkoopsignaal
+def evaluate_signal(prices, sma_window, ai_window, rsi_oversold, rsi_overbought):
+    """Bepaal het signaal ('buy', 'sell' of None) voor een reeks slotkoersen."""
+    current_price = prices[-1]
+
+    # Indicatorberekeningen
+    sma = calculate_sma(prices, sma_window)
+    rsi = calculate_rsi(prices, 14)
+
+    # AI-predictie
+    model = train_model(prices[-ai_window:])
+    next_price = predict_price(model, len(prices))
+    price_change = ((next_price - current_price) / current_price) * 100
+
+    signal = None
+    if current_price > sma and rsi < rsi_oversold and price_change > 0:
+        signal = 'buy'
+    elif current_price < sma and rsi > rsi_overbought and price_change < 0:
+        signal = 'sell'
+    return signal, {"price": current_price, "sma": sma, "rsi": rsi,
+                    "next_price": next_price, "price_change": price_change}
 
 # Plaats order
-def place_order(symbol, side, amount, price, transactions):
+def place_order(symbol, side, amount, price, journal, pnl):
+    """Plaats een order en journaliseer de werkelijke fills; geeft de ``Execution`` of None terug."""
     log_message(f"Placing {side} order: {amount} {symbol} at {price:.2f}")
-    transaction = {
-        "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        "side": side,
-        "amount": amount,
-        "price": price
-    }
-    transactions.append(transaction)
-    save_transactions(TRANSACTIONS_FILE, transactions)
-
     if DEMO_MODE:
         log_message("[DEMO MODE] Geen echte order geplaatst.")
-    else:
-        try:
-            order = bitvavo.placeOrder(symbol, side, 'market', {'amount': str(amount)})
-            log_message(f"Order geplaatst: {order}")
-        except Exception as e:
-            log_message(f"Fout bij plaatsen order: {e}")
+    try:
+        with metrics.stage(symbol, "order").time():
+            # Een verkoop sluit de positie en gaat dus als exit-order (standaard market)
+            execution = executor.execute(side, amount, price, exit=side == 'sell')
+    except BitvavoAPIError as e:
+        metrics.order(symbol, side, None)
+        log_message(f"Fout bij plaatsen order: {e}")
+        return None
+    metrics.order(symbol, side, execution)
+    if not executor.demo:
+        log_message(f"Order {execution.order_id}: {execution.describe()}")
+
+    if execution.filled_amount > 0:
+        transaction = execution.transaction(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        with metrics.stage(symbol, "journal").time():
+            journal.append(transaction)
+            pnl.add(transaction)
+            journal.maybe_checkpoint(pnl)
+    return execution
 
 # Rapportage
 
 
-def generate_report(transactions):
-    total_profit_loss = 0
-    for txn in transactions:
-        if txn['side'] == 'sell':
-            buy_txn = next(
-                (t for t in transactions if t['side'] == 'buy' and t['timestamp'] < txn['timestamp']),
-                None
-            )
-            if buy_txn:
-                profit_loss = (txn['price'] - buy_txn['price']) * txn['amount']
-                total_profit_loss += profit_loss
-
-    log_message(f"Totale winst/verlies: {total_profit_loss:.2f} EUR")
-    log_message("Transacties:")
-    for txn in transactions:
-        log_message(f"{txn['timestamp']} | {txn['side'].capitalize()} | "
-                    f"Hoeveelheid: {txn['amount']:.6f}, Prijs: {txn['price']:.2f}")
+def generate_report(pnl):
+    """Eén samengevat bericht met winst/verlies van vandaag, deze week en in totaal."""
+    log_message(pnl.format_summary())
 
 # Handelslogica
 def trading_bot():
     log_message(f"Start HODL-strategie bot voor {SYMBOL}")
     last_trade_date = None
     status = load_status(STATUS_FILE)
-    transactions = load_transactions(TRANSACTIONS_FILE)
+    journal = open_journal(TRANSACTIONS_FILE)
+    pnl = journal.restore(PnlTracker(hodl_config.get("PNL_METHOD", "fifo")))
+    metrics.watch_pnl(SYMBOL, pnl)
+    metrics.watch_client(bitvavo)
+    metrics.watch_notifier(notifier)
+    metrics.serve(METRICS_PORT)
+    # Elke CHECK_INTERVAL seconden op een vaste deadline, met ALIGN_INTERVAL op het sluiten van de dagcandle
+    scheduler = Scheduler.from_config(hodl_config, CHECK_INTERVAL)
+    metrics.watch_scheduler(SYMBOL, scheduler)
 
     while True:
-        # Controleer alleen 1 keer per CHECK_INTERVAL_DAYS
+        metrics.tick(SYMBOL, lag=scheduler.wait())
+        # Na een trade CHECK_INTERVAL_DAYS dagen niet opnieuw handelen
         if last_trade_date and datetime.now() - last_trade_date < timedelta(days=CHECK_INTERVAL_DAYS):
             log_message("Wachten tot volgende controle.")
-            time.sleep(3600)
             continue
 
-        # Haal historische prijzen op
-        prices = get_historical_prices(
-            SYMBOL, SMA_WINDOW + AI_PREDICTION_WINDOW)
-        current_price = prices[-1]
-
-        # Indicatorberekeningen
-        sma = calculate_sma(prices, SMA_WINDOW)
-        rsi = calculate_rsi(prices, 14)
-
-        # AI-predictie
-        model = train_model(prices[-AI_PREDICTION_WINDOW:])
-        next_price = predict_price(model, len(prices))
-        price_change = ((next_price - current_price) / current_price) * 100
+        # Haal historische prijzen op; bij een API-fout volgende keer opnieuw
+        try:
+            with metrics.stage(SYMBOL, "price_fetch").time():
+                prices = get_historical_prices(
+                    SYMBOL, SMA_WINDOW + AI_PREDICTION_WINDOW)
+        except (BitvavoAPIError, KeyError) as e:
+            metrics.errors.labels(SYMBOL, "price_fetch").inc()
+            log_message(f"[WARN] Historische prijzen ophalen mislukt: {e}")
+            continue
+        with metrics.stage(SYMBOL, "model").time():
+            signal, info = evaluate_signal(
+                prices, SMA_WINDOW, AI_PREDICTION_WINDOW, RSI_OVERSOLD, RSI_OVERBOUGHT)
+        current_price = info["price"]
 
         log_message(
-            f"Huidige prijs: {current_price:.2f}, SMA: {sma:.2f}, RSI: {rsi:.2f}, "
-            f"Voorspelde prijs: {next_price:.2f}, Voorspelde verandering: {price_change:.2f}%"
+            f"Huidige prijs: {current_price:.2f}, SMA: {info['sma']:.2f}, RSI: {info['rsi']:.2f}, "
+            f"Voorspelde prijs: {info['next_price']:.2f}, Voorspelde verandering: {info['price_change']:.2f}%"
         )
 
         # Koop-/Verkooplogica
-        if current_price > sma and rsi < RSI_OVERSOLD and price_change > 0:
+        if signal == 'buy':
             log_message("[SIGNAAL] Koopkans gedetecteerd.")
-            place_order(SYMBOL, 'buy', TRADE_AMOUNT,
-                        current_price, transactions)
-            status.update(
-                {"open_position": True, "buy_price": current_price, "last_action": "buy"})
-            save_status(STATUS_FILE, status)
-            last_trade_date = datetime.now()
-
-        elif current_price < sma and rsi > RSI_OVERBOUGHT and price_change < 0:
+            execution = place_order(SYMBOL, 'buy', TRADE_AMOUNT,
+                                    current_price, journal, pnl)
+            # Alleen bij (deels) gevulde orders de status bijwerken, tegen de werkelijke prijs
+            if execution is not None and execution.filled_amount > 0:
+                status.update({"open_position": True, "buy_price": execution.price,
+                               "amount": execution.filled_amount, "last_action": "buy"})
+                save_status(STATUS_FILE, status)
+                last_trade_date = datetime.now()
+
+        elif signal == 'sell':
             log_message("[SIGNAAL] Verkoopkans gedetecteerd.")
-            place_order(SYMBOL, 'sell', TRADE_AMOUNT,
-                        current_price, transactions)
-            status.update(
-                {"open_position": False, "buy_price": None, "last_action": "sell"})
-            save_status(STATUS_FILE, status)
-            last_trade_date = datetime.now()
+            execution = place_order(SYMBOL, 'sell', TRADE_AMOUNT,
+                                    current_price, journal, pnl)
+            if execution is not None and execution.filled_amount > 0:
+                # Wat er na een deels gevulde verkoop over is, volgt uit de positie, niet uit TRADE_AMOUNT
+                held = status["amount"] if status.get("amount") is not None else TRADE_AMOUNT
+                remaining = held - execution.filled_amount
+                if execution.fully_filled or remaining <= 0:
+                    status.update({"open_position": False, "buy_price": None, "amount": None, "last_action": "sell"})
+                else:
+                    status.update({"amount": remaining, "last_action": "sell"})
+                save_status(STATUS_FILE, status)
+                last_trade_date = datetime.now()
 
         # Rapportage
-        generate_report(transactions)
-        time.sleep(CHECK_INTERVAL)
+        generate_report(pnl)
+        print(bitvavo.format_metrics())
+        print(scheduler.format_stats())
 
 if __name__ == "__main__":
-    trading_bot()
+    load_runtime()
+    try:
+        trading_bot()
+    finally:
+        notifier.close()
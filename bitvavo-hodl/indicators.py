@@ -0,0 +1,160 @@
+"""Incrementele technische indicatoren: SMA, EMA, RSI en MACD.
+
+Elke indicator is een object met ``update(price)`` dat de nieuwe waarde in
+O(1) berekent. De formules zijn gelijk aan de pandas-varianten die de bots
+gebruikten: ``rolling(window).mean()``, ``ewm(span, adjust=False).mean()``
+en de RSI op voortschrijdende gemiddelden van winsten en verliezen. Waar
+pandas NaN geeft (opwarmperiode), geeft de indicator ook NaN.
+
+Voor opwarmen en backtests zijn er gevectoriseerde functies (``sma``,
+``ema``, ``rsi``, ``macd``) die voor een hele reeks dezelfde waarden als
+de objecten opleveren.
+"""
+import math
+from collections import deque
+
+import numpy as np
+
+NAN = float("nan")
+
+# Om de zoveel updates wordt een lopende som exact herberekend tegen afrondingsdrift
+RESYNC_EVERY = 1024
+
+
+class SMA:
+    """Voortschrijdend gemiddelde over ``period`` waarden."""
+
+    def __init__(self, period):
+        if period < 1:
+            raise ValueError("period moet minimaal 1 zijn")
+        self.period = period
+        self.value = NAN
+        self._window = deque()
+        self._sum = 0.0
+        self._nonzero = 0
+        self._updates = 0
+
+    def update(self, x):
+        window = self._window
+        window.append(x)
+        self._sum += x
+        self._nonzero += x != 0
+        if len(window) > self.period:
+            old = window.popleft()
+            self._sum -= old
+            self._nonzero -= old != 0
+        self._updates += 1
+        if self._nonzero == 0:
+            self._sum = 0.0  # Geen restje afrondingsfout als het venster alleen nullen bevat
+        elif self._updates % RESYNC_EVERY == 0:
+            self._sum = math.fsum(window)
+        self.value = self._sum / self.period if len(window) == self.period else NAN
+        return self.value
+
+
+class EMA:
+    """Exponentieel voortschrijdend gemiddelde, gelijk aan ``ewm(span, adjust=False)``."""
+
+    def __init__(self, span):
+        self.span = span
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = NAN
+
+    def update(self, x):
+        if self.value != self.value:  # Eerste waarde (NaN)
+            self.value = x
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+
+class RSI:
+    """RSI op het voortschrijdend gemiddelde van winsten en verliezen over ``period`` stappen.
+
+    De eerste prijs telt als verandering 0, net als ``diff().where(...)`` in
+    pandas, zodat de eerste waarde na ``period`` prijzen beschikbaar is.
+    Zonder verliezen is de RSI 100, zonder enige beweging NaN.
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        self.value = NAN
+        self.gain = SMA(period)
+        self.loss = SMA(period)
+        self._last = None
+
+    def update(self, price):
+        delta = 0.0 if self._last is None else price - self._last
+        self._last = price
+        gain = self.gain.update(delta if delta > 0 else 0.0)
+        loss = self.loss.update(-delta if delta < 0 else 0.0)
+        self.value = rsi_from_averages(gain, loss)
+        return self.value
+
+
+class MACD:
+    """MACD-lijn (snelle min trage EMA) en signaallijn (EMA van de MACD)."""
+
+    def __init__(self, slow=26, fast=12, signal=9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal_ema = EMA(signal)
+        self.value = NAN
+        self.signal = NAN
+
+    def update(self, price):
+        self.value = self.fast.update(price) - self.slow.update(price)
+        self.signal = self.signal_ema.update(self.value)
+        return self.value, self.signal
+
+
+def rsi_from_averages(gain, loss):
+    if loss == 0:
+        return 100.0 if gain > 0 else NAN
+    return 100.0 - 100.0 / (1.0 + gain / loss)
+
+
+# Gevectoriseerde varianten voor een hele reeks
+
+
+def sma(prices, period):
+    """SMA voor elke positie; de eerste ``period - 1`` waarden zijn NaN."""
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    prices = np.asarray(prices, dtype=np.float64)
+    out = np.full(len(prices), np.nan)
+    if len(prices) >= period:
+        out[period - 1:] = sliding_window_view(prices, period).mean(axis=1)
+    return out
+
+
+def ema(prices, span):
+    """EMA voor elke positie (``adjust=False``); de recursie loopt over Python-floats."""
+    values = np.asarray(prices, dtype=np.float64).tolist()
+    out = np.empty(len(values))
+    if not values:
+        return out
+    alpha = 2.0 / (span + 1.0)
+    value = values[0]
+    for i, x in enumerate(values):
+        value += alpha * (x - value)
+        out[i] = value
+    return out
+
+
+def rsi(prices, period=14):
+    """RSI voor elke positie; de eerste ``period - 1`` waarden zijn NaN."""
+    prices = np.asarray(prices, dtype=np.float64)
+    if not len(prices):
+        return np.empty(0)
+    delta = np.diff(prices, prepend=prices[0])
+    gain = sma(np.where(delta > 0, delta, 0.0), period)
+    loss = sma(np.where(delta < 0, -delta, 0.0), period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100.0 - 100.0 / (1.0 + gain / loss)
+
+
+def macd(prices, slow=26, fast=12, signal=9):
+    """(MACD-lijn, signaallijn) voor elke positie."""
+    line = ema(prices, fast) - ema(prices, slow)
+    return line, ema(line, signal)
@@ -0,0 +1,220 @@
+"""Append-only transactiejournaal met checkpoints en atomische statusbestanden.
+
+Elke transactie is één JSON-regel die aan het einde van het bestand wordt
+toegevoegd (en met fsync naar schijf gaat); het bestand wordt nooit
+herschreven tijdens het handelen. Een checkpoint legt een kleine
+samenvatting vast (de lopende winst/verlies uit ``pnl.py``) plus de
+bestandspositie tot waar die geldt, zodat de bot bij het opstarten alleen
+de regels daarna hoeft te lezen.
+
+Compacteren (met de bot gestopt of draaiend, het journaal wordt vergrendeld):
+    python journal.py compact data/transactions_SOL-EUR.jsonl --keep-days 30
+
+Regels die ouder zijn dan ``--keep-days`` en al in het checkpoint zijn
+verwerkt, verhuizen naar ``<journaal>.archive.gz``.
+"""
+import argparse
+import fcntl
+import gzip
+import json
+import os
+import time
+from contextlib import contextmanager
+
+
+def atomic_write_json(path, data, indent=None):
+    """Schrijf JSON via een tijdelijk bestand en rename, zodat het bestand nooit half geschreven is."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class Journal:
+    """Regelgescheiden JSON-journaal dat alleen aangevuld wordt."""
+
+    def __init__(self, path, fsync=True, checkpoint_every=100):
+        self.path = path
+        self.checkpoint_path = f"{path}.checkpoint"
+        self.lock_path = f"{path}.lock"
+        self.fsync = fsync
+        self.checkpoint_every = checkpoint_every
+        self.appended_since_checkpoint = 0
+        with self._locked():
+            self._repair()
+
+    @contextmanager
+    def _locked(self):
+        with open(self.lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _repair(self):
+        """Verwijder een half geschreven laatste regel na een crash."""
+        try:
+            with open(self.path, 'rb+') as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                if size == 0:
+                    return
+                f.seek(size - 1)
+                if f.read(1) == b"\n":
+                    return
+                # Terugzoeken naar de laatste volledige regel
+                position = size
+                while position > 0:
+                    step = min(4096, position)
+                    position -= step
+                    f.seek(position)
+                    newline = f.read(step).rfind(b"\n")
+                    if newline != -1:
+                        f.truncate(position + newline + 1)
+                        return
+                f.truncate(0)
+        except FileNotFoundError:
+            pass
+
+    def append(self, record):
+        """Voeg één record toe aan het einde van het journaal."""
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._locked():
+            with open(self.path, 'a') as f:
+                f.write(line)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+        self.appended_since_checkpoint += 1
+
+    def read_from(self, offset=0):
+        """Lees records vanaf een bestandspositie, zonder alles in het geheugen te laden."""
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    if line.endswith(b"\n"):
+                        yield json.loads(line)
+        except FileNotFoundError:
+            return
+
+    def __iter__(self):
+        return self.read_from(0)
+
+    def load_checkpoint(self):
+        """Geef (state, offset) van het laatste checkpoint, of (None, 0)."""
+        try:
+            with open(self.checkpoint_path, 'r') as f:
+                checkpoint = json.load(f)
+            return checkpoint["state"], checkpoint["offset"]
+        except FileNotFoundError:
+            return None, 0
+
+    def save_checkpoint(self, tracker):
+        """Leg de toestand van ``tracker`` vast als samenvatting van alle records tot nu toe."""
+        with self._locked():
+            try:
+                offset = os.path.getsize(self.path)
+            except FileNotFoundError:
+                offset = 0
+            atomic_write_json(self.checkpoint_path, {"offset": offset, "state": tracker.state(), "time": time.time()})
+        self.appended_since_checkpoint = 0
+
+    def maybe_checkpoint(self, tracker):
+        """Schrijf een checkpoint zodra er ``checkpoint_every`` records zijn toegevoegd."""
+        if self.appended_since_checkpoint >= self.checkpoint_every:
+            self.save_checkpoint(tracker)
+
+    def restore(self, tracker):
+        """Herstel ``tracker`` uit het checkpoint en speel alleen de records erna af.
+
+        ``tracker`` heeft ``add(record)``, ``state()`` en ``load_state(state)``;
+        past het checkpoint niet (andere versie), dan wordt alles afgespeeld.
+        """
+        state, offset = self.load_checkpoint()
+        if state is None or not tracker.load_state(state):
+            offset = 0
+        replayed = 0
+        for record in self.read_from(offset):
+            tracker.add(record)
+            replayed += 1
+        if replayed:
+            self.save_checkpoint(tracker)
+        return tracker
+
+    def migrate_json_array(self, legacy_path):
+        """Zet een oud transactiebestand (één JSON-lijst) eenmalig om naar dit journaal."""
+        if os.path.exists(self.path) or not os.path.exists(legacy_path):
+            return 0
+        with open(legacy_path, 'r') as f:
+            records = json.load(f)
+        with self._locked():
+            with open(self.path, 'a') as f:
+                for record in records:
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(legacy_path, f"{legacy_path}.migrated")
+        return len(records)
+
+    def compact(self, before_timestamp):
+        """Archiveer records van vóór ``before_timestamp`` die al in het checkpoint zitten.
+
+        Geeft het aantal gearchiveerde records terug.
+        """
+        with self._locked():
+            state, checkpoint_offset = self.load_checkpoint()
+            if state is None:
+                return 0
+            archived = 0
+            removed_bytes = 0
+            tmp_path = f"{self.path}.compact"
+            with open(self.path, 'rb') as source, open(tmp_path, 'wb') as target, \
+                    gzip.open(f"{self.path}.archive.gz", 'ab') as archive:
+                position = 0
+                for line in source:
+                    record_end = position + len(line)
+                    old = record_end <= checkpoint_offset and _timestamp(json.loads(line)) < before_timestamp
+                    if old and removed_bytes == position:
+                        archive.write(line)
+                        archived += 1
+                        removed_bytes = record_end
+                    else:
+                        target.write(line)
+                    position = record_end
+                target.flush()
+                os.fsync(target.fileno())
+            os.replace(tmp_path, self.path)
+            atomic_write_json(self.checkpoint_path, {
+                "offset": checkpoint_offset - removed_bytes, "state": state, "time": time.time()})
+        return archived
+
+
+def _timestamp(record):
+    """Tijdstempel van een record als epoch-seconden (ook het oude tekstformaat van hodl)."""
+    value = record.get("timestamp", 0)
+    if isinstance(value, str):
+        return time.mktime(time.strptime(value, '%Y-%m-%d %H:%M:%S'))
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Beheer van het transactiejournaal.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compact = commands.add_parser("compact", help="Archiveer oude, al gecheckpointe records")
+    compact.add_argument("path", help="Pad naar het .jsonl-journaal")
+    compact.add_argument("--keep-days", type=float, default=30,
+                         help="Records van de laatste zoveel dagen blijven in het journaal")
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        journal = Journal(args.path)
+        archived = journal.compact(time.time() - args.keep_days * 86400)
+        print(f"{archived} records gearchiveerd naar {args.path}.archive.gz")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import deque
+
+import requests
+
+
+class SlackNotifier:
+    """Verstuurt Slack-berichten vanuit een achtergrondthread.
+
+    ``notify`` zet een bericht alleen in een begrensde wachtrij en keert
+    direct terug, zodat een trage of hangende webhook de handelslus nooit
+    ophoudt. De thread bundelt wat binnen ``batch_interval`` binnenkomt tot
+    één post (identieke opeenvolgende berichten worden samengevoegd), houdt
+    minimaal ``min_interval`` seconden tussen posts aan en gebruikt een
+    timeout op elke request. Is de wachtrij vol, dan vervalt het oudste
+    bericht en wordt ``dropped`` opgehoogd.
+    """
+
+    def __init__(self, webhook_url, max_queue=1000, timeout=5, batch_interval=1.0,
+                 max_batch=20, min_interval=1.0):
+        self.webhook_url = webhook_url
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.batch_interval = batch_interval
+        self.max_batch = max_batch
+        self.min_interval = min_interval
+
+        self.queued = 0
+        self.sent = 0
+        self.posts = 0
+        self.dropped = 0
+        self.failed = 0
+        self.on_post = None  # Optioneel: aangeroepen met de duur van elke post in seconden
+
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._running = True
+        self._last_post = 0.0
+        self._session = requests.Session()
+        self._thread = threading.Thread(target=self._run, name="slack-notifier", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_config(cls, slack_config):
+        """Maak een notifier op basis van slack.json."""
+        return cls(
+            slack_config.get("SLACK_WEBHOOK_URL"),
+            max_queue=slack_config.get("SLACK_QUEUE_SIZE", 1000),
+            timeout=slack_config.get("SLACK_TIMEOUT", 5),
+            batch_interval=slack_config.get("SLACK_BATCH_INTERVAL", 1.0),
+            min_interval=slack_config.get("SLACK_MIN_INTERVAL", 1.0),
+        )
+
+    def notify(self, message):
+        """Zet een bericht in de wachtrij; blokkeert nooit."""
+        if not self.webhook_url:
+            return
+        with self._condition:
+            if len(self._queue) >= self.max_queue:
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append(message)
+            self.queued += 1
+            self._condition.notify()
+
+    def stats(self):
+        return {
+            "queued": self.queued,
+            "sent": self.sent,
+            "posts": self.posts,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "pending": len(self._queue),
+        }
+
+    def close(self, timeout=10):
+        """Verstuur wat nog in de wachtrij staat en stop de thread."""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join(timeout)
+
+    def _next_batch(self):
+        with self._condition:
+            while not self._queue and self._running:
+                self._condition.wait()
+            if not self._queue:
+                return None
+            # Even wachten zodat berichten die kort na elkaar komen samen gaan
+            deadline = time.monotonic() + self.batch_interval
+            while self._running and len(self._queue) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            count = min(len(self._queue), self.max_batch)
+            return [self._queue.popleft() for _ in range(count)]
+
+    @staticmethod
+    def _coalesce(messages):
+        lines = []
+        previous, repeats = None, 0
+        for message in messages + [None]:
+            if message == previous:
+                repeats += 1
+                continue
+            if previous is not None:
+                lines.append(previous if repeats == 1 else f"{previous} (x{repeats})")
+            previous, repeats = message, 1
+        return "\n".join(lines)
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+            wait = self._last_post + self.min_interval - time.monotonic()
+            if wait > 0 and self._running:
+                time.sleep(wait)
+            self._post(self._coalesce(batch), len(batch))
+        self._session.close()
+
+    def _post(self, text, count):
+        self._last_post = time.monotonic()
+        try:
+            response = self._session.post(self.webhook_url, json={"text": text}, timeout=self.timeout)
+            response.raise_for_status()
+            self.sent += count
+            self.posts += 1
+        except Exception as e:
+            self.failed += count
+            print(f"[FOUT] Kon bericht niet naar Slack sturen: {e}")
+        if self.on_post is not None:
+            self.on_post(time.monotonic() - self._last_post)
@@ -0,0 +1,297 @@
+"""Gedeelde Bitvavo REST-client met connection pooling, retries en rate-limitbudget.
+
+``BitvavoClient`` biedt dezelfde methodes als ``python_bitvavo_api`` die de
+bots gebruiken (``tickerPrice``, ``candles``, ``placeOrder``, ...), zonder
+die bibliotheek (en de websocket-afhankelijkheden ervan) te importeren, maar:
+
+* hergebruikt keep-alive verbindingen via één ``requests.Session``;
+* zet op elk request een connect- en read-timeout;
+* probeert idempotente GET-requests opnieuw met exponentiële backoff
+  (netwerkfouten, 429 en 5xx); orders worden alleen opnieuw verstuurd als
+  de verbinding niet eens tot stand kwam;
+* leest ``bitvavo-ratelimit-remaining``/``-resetat`` uit elk antwoord en
+  wacht tot de reset zodra het resterende gewicht onder ``reserve`` zakt.
+  Die headers gelden per IP-adres, dus bots die samen één IP delen remmen
+  elkaar zo automatisch af. Optioneel begrenst een lokale token bucket het
+  eigen aandeel (``rate_limit_per_minute``);
+* houdt latency, fouten, retries en het resterende budget bij (``metrics``).
+"""
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Bitvavo-foutcode wanneer het rate limit overschreden is (IP of key tijdelijk geblokkeerd)
+RATE_LIMIT_ERROR = 105
+
+
+def create_postfix(options):
+    """Querystring zoals python_bitvavo_api die opbouwt (de handtekening hangt ervan af)."""
+    if not options:
+        return ""
+    return "?" + "&".join(f"{key}={value}" for key, value in options.items())
+
+
+def create_signature(timestamp, method, path, body, api_secret):
+    """HMAC-SHA256 over tijdstempel, methode, pad (inclusief /v2) en body."""
+    message = str(timestamp) + method + path
+    if body:
+        message += json.dumps(body, separators=(",", ":"))
+    return hmac.new(api_secret.encode("utf-8"), message.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+class BitvavoAPIError(Exception):
+    """Foutantwoord van Bitvavo of een request dat na alle pogingen mislukte."""
+
+    def __init__(self, message, error_code=None, status=None):
+        super().__init__(message)
+        self.error_code = error_code
+        self.status = status
+
+
+class BitvavoClient:
+    """Thread-safe REST-client voor Bitvavo; zie de moduledocumentatie."""
+
+    def __init__(self, api_key=None, api_secret=None, rest_url="https://api.bitvavo.com/v2",
+                 access_window=10000, connect_timeout=3.05, read_timeout=10, max_retries=3,
+                 backoff=0.5, max_backoff=8, rate_limit_per_minute=None, reserve=100, pool_size=10):
+        self.api_key = api_key or ""
+        self.api_secret = api_secret or ""
+        self.base = rest_url.rstrip("/")
+        self.base_path = urlparse(self.base).path  # Meestal /v2; hoort bij de handtekening
+        self.access_window = access_window
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.reserve = reserve
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # Budget volgens de laatste rate-limitheaders van Bitvavo
+        self.limit = None
+        self.remaining = None
+        self.reset_at = 0.0
+
+        # Lokale token bucket voor het eigen aandeel in het budget
+        self.rate = rate_limit_per_minute / 60.0 if rate_limit_per_minute else None
+        self.capacity = max(1.0, self.rate) if self.rate else 0.0
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+        self._latencies = {}  # endpoint -> deque met de laatste latencies in seconden
+
+    @classmethod
+    def from_config(cls, config):
+        """Maak een client op basis van config.json."""
+        return cls(
+            api_key=config.get("API_KEY"),
+            api_secret=config.get("API_SECRET"),
+            rest_url=config.get("RESTURL", "https://api.bitvavo.com/v2"),
+            access_window=config.get("ACCESSWINDOW", 10000),
+            connect_timeout=config.get("REST_CONNECT_TIMEOUT", 3.05),
+            read_timeout=config.get("REST_TIMEOUT", 10),
+            max_retries=config.get("REST_RETRIES", 3),
+            rate_limit_per_minute=config.get("RATE_LIMIT_PER_MINUTE"),
+            reserve=config.get("RATE_LIMIT_RESERVE", 100),
+            pool_size=config.get("REST_POOL_SIZE", 10),
+        )
+
+    # Publieke endpoints
+
+    def time(self):
+        return self.request("GET", "/time")
+
+    def markets(self, options=None):
+        return self.request("GET", "/markets", options)
+
+    def tickerPrice(self, options=None):
+        return self.request("GET", "/ticker/price", options)
+
+    def tickerBook(self, options=None):
+        return self.request("GET", "/ticker/book", options)
+
+    def book(self, market, options=None):
+        return self.request("GET", f"/{market}/book", options, name="book")
+
+    def candles(self, market, interval, options=None):
+        options = dict(options or {})
+        options["interval"] = interval
+        return self.request("GET", f"/{market}/candles", options, name="candles")
+
+    # Private endpoints
+
+    def placeOrder(self, market, side, order_type, body):
+        body = {**body, "market": market, "side": side, "orderType": order_type}
+        return self.request("POST", "/order", body=body)
+
+    def getOrder(self, market, order_id):
+        return self.request("GET", "/order", {"market": market, "orderId": order_id})
+
+    def cancelOrder(self, market, order_id):
+        return self.request("DELETE", "/order", {"market": market, "orderId": order_id})
+
+    def balance(self, options=None):
+        return self.request("GET", "/balance", options)
+
+    # Requestafhandeling
+
+    def request(self, method, endpoint, params=None, body=None, weight=1, name=None):
+        """Voer een request uit met throttling, retries en metingen."""
+        name = name or endpoint.strip("/")
+        path = endpoint + create_postfix(params)
+        attempt = 0
+        while True:
+            self._throttle(weight)
+            started = time.monotonic()
+            try:
+                response = self.session.request(
+                    method, self.base + path, headers=self._headers(method, path, body),
+                    json=body, timeout=self.timeout)
+                self._update_budget(response.headers)
+                data = response.json()
+            except (requests.ConnectionError, requests.Timeout, ValueError) as e:
+                self._record(name, started, error=True)
+                # Een order mag alleen opnieuw als de verbinding niet tot stand kwam
+                retryable = method == "GET" or isinstance(e, requests.ConnectTimeout)
+                if retryable and attempt < self.max_retries:
+                    attempt = self._wait_retry(attempt)
+                    continue
+                raise BitvavoAPIError(f"{method} {name} mislukt: {e}") from e
+
+            self._record(name, started, error=isinstance(data, dict) and "errorCode" in data)
+            if isinstance(data, dict) and "errorCode" in data:
+                if data["errorCode"] == RATE_LIMIT_ERROR:
+                    self._block_until_reset(data.get("error", ""))
+                elif method == "GET" and (response.status_code == 429 or response.status_code >= 500) \
+                        and attempt < self.max_retries:
+                    attempt = self._wait_retry(attempt)
+                    continue
+                raise BitvavoAPIError(f"{method} {name}: {data.get('error')}",
+                                      error_code=data["errorCode"], status=response.status_code)
+            return data
+
+    def _headers(self, method, path, body):
+        if not self.api_key:
+            return {}
+        now = int(time.time() * 1000)
+        return {
+            "bitvavo-access-key": self.api_key,
+            "bitvavo-access-signature": create_signature(now, method, self.base_path + path, body, self.api_secret),
+            "bitvavo-access-timestamp": str(now),
+            "bitvavo-access-window": str(self.access_window),
+        }
+
+    def _wait_retry(self, attempt):
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+        self.retries += 1
+        time.sleep(delay)
+        return attempt + 1
+
+    def _throttle(self, weight):
+        """Wacht op de lokale token bucket en op de reset van het Bitvavo-budget."""
+        with self._lock:
+            wait = 0.0
+            now = time.time()
+            if self.remaining is not None and self.remaining - weight < self.reserve and now < self.reset_at:
+                wait = self.reset_at - now
+            if self.rate:
+                monotonic = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (monotonic - self._updated) * self.rate)
+                self._updated = monotonic
+                self.tokens -= weight
+                if self.tokens < 0:
+                    wait = max(wait, -self.tokens / self.rate)
+            if self.remaining is not None:
+                self.remaining -= weight
+            if wait > 0:
+                self.throttled += 1
+                self.throttled_seconds += wait
+        if wait > 0:
+            time.sleep(wait)
+
+    def _update_budget(self, headers):
+        remaining = headers.get("bitvavo-ratelimit-remaining")
+        if remaining is None:
+            return
+        with self._lock:
+            self.remaining = int(remaining)
+            if "bitvavo-ratelimit-limit" in headers:
+                self.limit = int(headers["bitvavo-ratelimit-limit"])
+            if "bitvavo-ratelimit-resetat" in headers:
+                self.reset_at = int(headers["bitvavo-ratelimit-resetat"]) / 1000
+
+    def _block_until_reset(self, error):
+        """Na een rate-limitfout geen requests meer tot het opgegeven tijdstip."""
+        reset_at = time.time() + 60
+        if " at " in error:
+            try:
+                reset_at = int(error.split(" at ")[1].split(".")[0]) / 1000
+            except ValueError:
+                pass
+        with self._lock:
+            self.remaining = 0
+            self.reset_at = reset_at
+
+    def _record(self, name, started, error=False):
+        latency = time.monotonic() - started
+        with self._lock:
+            self.requests += 1
+            if error:
+                self.errors += 1
+            samples = self._latencies.get(name)
+            if samples is None:
+                samples = self._latencies[name] = deque(maxlen=1000)
+            samples.append(latency)
+
+    def metrics(self):
+        """Aantallen, latency-percentielen per endpoint en het resterende budget."""
+        with self._lock:
+            endpoints = {}
+            for name, samples in self._latencies.items():
+                ordered = sorted(samples)
+                endpoints[name] = {
+                    "count": len(ordered),
+                    "p50_ms": ordered[len(ordered) // 2] * 1000,
+                    "p95_ms": ordered[int(len(ordered) * 0.95)] * 1000,
+                    "max_ms": ordered[-1] * 1000,
+                }
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "throttled_seconds": self.throttled_seconds,
+                "remaining": self.remaining,
+                "limit": self.limit,
+                "reset_in": max(0.0, self.reset_at - time.time()),
+                "endpoints": endpoints,
+            }
+
+    def format_metrics(self):
+        """Korte samenvatting van de metrics voor in het logboek."""
+        m = self.metrics()
+        latency = ", ".join(f"{name} p50 {e['p50_ms']:.0f}ms p95 {e['p95_ms']:.0f}ms"
+                            for name, e in m["endpoints"].items())
+        return (f"REST: {m['requests']} requests, {m['errors']} fouten, {m['retries']} retries, "
+                f"{m['throttled']}x afgeremd ({m['throttled_seconds']:.1f}s), "
+                f"budget {m['remaining']}/{m['limit'] or '?'} | {latency}")
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1 @@
+docker build -t bitvavo-hub . --no-cache
\ No newline at end of file
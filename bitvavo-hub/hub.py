@@ -0,0 +1,346 @@
+"""Market-data hub: één Bitvavo-feed per markt, gedeeld door alle bots op dezelfde machine.
+
+De scalper, hodl en trader volgen vaak dezelfde markten en vroegen elk
+dezelfde prijzen en candles los op bij Bitvavo, wat rate limit kost voor
+identieke data. De hub houdt per markt één feed bij: de WebSocket-stream
+(``STREAMING``) of één ``tickerPrice``-request voor alle markten per
+``POLL_INTERVAL`` seconden. De bots vragen via een Unix-socket (of TCP):
+
+* ``ticker``: de laatste prijs uit de feed, in het formaat van
+  ``tickerPrice``. Is die ouder dan ``MAX_PRICE_AGE`` seconden (of volgt de
+  hub de markt niet), dan haalt de hub hem via REST op, één keer voor alle
+  bots die er tegelijk om vragen;
+* ``candles``: candles uit een gedeelde ``CandleStore``, die bij Bitvavo
+  alleen ophaalt wat nog niet in de cache staat (hooguit eens per
+  ``CANDLE_MAX_AGE`` seconden);
+* ``subscribe``: een doorlopende stroom prijzen voor markten uit de feed.
+  Een trage bot krijgt alleen de laatste prijs per markt en houdt de
+  andere bots niet op.
+
+Met ``RECORD_DIR`` neemt de hub de feed op met de tick-recorder
+(``tick_recorder.py``): alle prijzen en, bij ``STREAMING``, ook het beste
+bod/laat en de trades.
+
+Het protocol is één JSON-object per regel. Fouten komen terug in het
+Bitvavo-formaat (``errorCode``/``error``). De bots gebruiken
+``hub_client.HubClient`` en ``hub_client.HubStream``.
+
+Starten:
+    python hub.py [--config hub.json] [--exchange-config config.json]
+"""
+import argparse
+import json
+import os
+import socketserver
+import threading
+import time
+
+from bitvavo_client import BitvavoAPIError, BitvavoClient
+from candle_store import INTERVALS, MAX_CANDLES_PER_REQUEST, CandleStore
+from hub_client import encode, parse_address
+from metrics import BotMetrics
+from tick_recorder import TickRecorder
+from ticker_stream import TickerStream
+
+# Foutcodes van de hub zelf (Bitvavo-fouten worden met hun eigen code doorgegeven)
+BAD_REQUEST = 400
+UPSTREAM_ERROR = 502
+# Seconden tussen heartbeats naar abonnees zonder nieuwe prijzen
+HEARTBEAT_INTERVAL = 5
+
+metrics = BotMetrics("hub")
+
+
+def load_config(file_path):
+    with open(file_path, 'r') as f:
+        return json.load(f)
+
+
+def error(code, message):
+    return {"errorCode": code, "error": message}
+
+
+class Subscriber:
+    """Wachtende prijzen voor één abonnee; per markt telt alleen de laatste."""
+
+    def __init__(self, markets):
+        self.markets = set(markets)
+        self._pending = {}
+        self._condition = threading.Condition()
+
+    def offer(self, market, price):
+        with self._condition:
+            self._pending[market] = price
+            self._condition.notify()
+
+    def take(self, timeout):
+        """De prijzen sinds de vorige aanroep; leeg als er binnen ``timeout`` niets kwam."""
+        with self._condition:
+            if not self._pending:
+                self._condition.wait(timeout)
+            pending, self._pending = self._pending, {}
+        return pending
+
+
+class MarketHub:
+    """Gedeelde feed, prijscache en candle-cache; zie de moduledocumentatie."""
+
+    def __init__(self, client, markets, db_path, streaming=False, ws_url="wss://ws.bitvavo.com/v2/",
+                 poll_interval=5, max_price_age=10, candle_max_age=5, recorder=None, clock=time.monotonic):
+        self.client = client
+        self.markets = list(markets)
+        self.db_path = db_path
+        self.streaming = streaming
+        self.ws_url = ws_url
+        self.poll_interval = poll_interval
+        self.max_price_age = max_price_age
+        self.candle_max_age = candle_max_age
+        self.recorder = recorder
+        self.clock = clock
+
+        self.prices = {}  # markt -> (prijs, tijdstip volgens clock)
+        self.subscribers = []
+        self.stream = None
+        self.running = False
+        self._subscribers_lock = threading.Lock()
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self._local = threading.local()
+
+    @classmethod
+    def from_config(cls, config, hub_config):
+        """Maak de hub op basis van config.json (Bitvavo-URL's) en hub.json."""
+        return cls(
+            BitvavoClient.from_config(config),
+            hub_config.get("MARKETS", []),
+            hub_config.get("CANDLE_DB", os.path.join("data", "candles.db")),
+            streaming=hub_config.get("STREAMING", False),
+            ws_url=config.get("WSURL", "wss://ws.bitvavo.com/v2/"),
+            poll_interval=hub_config.get("POLL_INTERVAL", 5),
+            max_price_age=hub_config.get("MAX_PRICE_AGE", 10),
+            candle_max_age=hub_config.get("CANDLE_MAX_AGE", 5),
+            recorder=TickRecorder.from_config(hub_config),
+        )
+
+    def start(self):
+        """Start de feed: de WebSocket-stream of de poller voor alle markten."""
+        self.running = True
+        if not self.markets:
+            return self
+        if self.streaming:
+            self.stream = TickerStream(
+                self.ws_url, self.markets, on_price=self.publish,
+                on_event=self.recorder.record_event if self.recorder is not None else None,
+                on_gap=lambda seconds: print(f"[HUB] Gat van {seconds:.0f}s in de WebSocket-stream")).start()
+        else:
+            threading.Thread(target=self._poll, name="hub-poller", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.stream is not None:
+            self.stream.stop()
+        if self.recorder is not None:
+            self.recorder.close()
+        with self._subscribers_lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            subscriber.offer(None, None)
+
+    def _poll(self):
+        """Eén ``tickerPrice``-request voor alle markten per ``poll_interval`` seconden."""
+        markets = set(self.markets)
+        next_poll = time.monotonic()
+        while self.running:
+            try:
+                for ticker in self.client.tickerPrice():
+                    if ticker.get("market") in markets and "price" in ticker:
+                        self.publish(ticker["market"], float(ticker["price"]))
+            except (BitvavoAPIError, AttributeError, TypeError, ValueError) as e:
+                metrics.errors.labels("", "poll").inc()
+                print(f"[HUB] Prijzen pollen mislukt: {e}")
+            next_poll += self.poll_interval
+            time.sleep(max(0.0, next_poll - time.monotonic()))
+
+    def publish(self, market, price):
+        """Nieuwe prijs in de cache zetten en doorgeven aan de abonnees van de markt."""
+        self.prices[market] = (price, self.clock())
+        metrics.ticks.labels(market).inc()
+        if self.recorder is not None:
+            self.recorder.ticker(market, price)
+        with self._subscribers_lock:
+            subscribers = [s for s in self.subscribers if market in s.markets]
+        for subscriber in subscribers:
+            subscriber.offer(market, price)
+
+    def _lock_for(self, key):
+        lock = self._locks.get(key)
+        if lock is None:
+            with self._locks_lock:
+                lock = self._locks.setdefault(key, threading.Lock())
+        return lock
+
+    def _fresh_price(self, market):
+        entry = self.prices.get(market)
+        if entry is not None and self.clock() - entry[1] <= self.max_price_age:
+            return entry[0]
+        return None
+
+    def ticker(self, market):
+        """Prijs in het formaat van ``tickerPrice``; bij een verouderde prijs één REST-request."""
+        price = self._fresh_price(market)
+        if price is None:
+            with self._lock_for(market):
+                # Wie op het lock wachtte, krijgt de prijs die net is opgehaald
+                price = self._fresh_price(market)
+                if price is None:
+                    price = float(self.client.tickerPrice({"market": market})["price"])
+                    self.publish(market, price)
+        return {"market": market, "price": str(price)}
+
+    def _store(self):
+        # SQLite-verbindingen zijn per thread; de WAL-modus laat ze naast elkaar lezen
+        store = getattr(self._local, "store", None)
+        if store is None:
+            store = self._local.store = CandleStore(self.db_path)
+        return store
+
+    def candles(self, market, interval, options):
+        """Candles in het Bitvavo-formaat (nieuw naar oud) uit de gedeelde cache."""
+        if interval not in INTERVALS:
+            return error(BAD_REQUEST, f"Onbekend interval: {interval}")
+        now = time.time()
+        end = int(options.get("end", now * 1000))
+        limit = min(int(options.get("limit", MAX_CANDLES_PER_REQUEST)), MAX_CANDLES_PER_REQUEST)
+        start = int(options["start"]) if "start" in options else end - limit * INTERVALS[interval]
+        store = self._store()
+        with self._lock_for((market, interval)):
+            store.update(self.client, market, interval, start, max_age=self.candle_max_age, now=now)
+        rows = store.load(market, interval, start, end, limit).tolist()
+        return [[int(row[0]), *(str(value) for value in row[1:])] for row in reversed(rows)]
+
+    def handle(self, request):
+        """Beantwoord één request (behalve ``subscribe``)."""
+        op = request.get("op")
+        market = str(request.get("market", ""))
+        stage = op if op in ("ticker", "candles") else "unknown"
+        try:
+            with metrics.stage(market, stage).time():
+                if op == "ticker":
+                    return self.ticker(request["market"])
+                if op == "candles":
+                    return self.candles(request["market"], request["interval"], request.get("options") or {})
+                return error(BAD_REQUEST, f"Onbekende operatie: {op}")
+        except KeyError as e:
+            return error(BAD_REQUEST, f"Ontbrekend veld: {e}")
+        except (BitvavoAPIError, ValueError, TypeError) as e:
+            metrics.errors.labels(market, stage).inc()
+            return error(getattr(e, "error_code", None) or UPSTREAM_ERROR, str(e))
+
+    def serve_subscriber(self, markets, wfile):
+        """Stuur prijzen naar één abonnee tot de verbinding wegvalt."""
+        unknown = [market for market in markets if market not in self.markets]
+        if not markets or unknown:
+            wfile.write(encode(error(BAD_REQUEST, f"Markten niet in de feed van de hub: {unknown or markets}")))
+            return
+        subscriber = Subscriber(markets)
+        with self._subscribers_lock:
+            self.subscribers.append(subscriber)
+        try:
+            wfile.write(encode({"event": "subscribed", "markets": markets}))
+            # Eerst de laatst bekende prijzen, zodat de bot niet op de volgende tick hoeft te wachten
+            for market in markets:
+                if market in self.prices:
+                    subscriber.offer(market, self.prices[market][0])
+            while self.running:
+                pending = subscriber.take(HEARTBEAT_INTERVAL)
+                if not pending:
+                    wfile.write(encode({"event": "heartbeat"}))
+                for market, price in pending.items():
+                    if market is not None:
+                        wfile.write(encode({"event": "ticker", "market": market, "price": str(price)}))
+                wfile.flush()
+        except OSError:
+            pass
+        finally:
+            with self._subscribers_lock:
+                self.subscribers.remove(subscriber)
+
+
+class HubRequestHandler(socketserver.StreamRequestHandler):
+    """Eén verbinding van een bot: requests en antwoorden als JSON-regels."""
+
+    def handle(self):
+        hub = self.server.hub
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                self.wfile.write(encode(error(BAD_REQUEST, "Ongeldige JSON")))
+                continue
+            if not isinstance(request, dict):
+                self.wfile.write(encode(error(BAD_REQUEST, "Request moet een JSON-object zijn")))
+                continue
+            if request.get("op") == "subscribe":
+                hub.serve_subscriber(list(request.get("markets") or []), self.wfile)
+                return
+            self.wfile.write(encode(hub.handle(request)))
+
+
+class UnixHubServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class TCPHubServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def make_server(hub, address):
+    """Server op een Unix-socket (pad) of TCP (``host:poort``); een oude socket wordt opgeruimd."""
+    family, target = parse_address(address)
+    if family == TCPHubServer.address_family:
+        server = TCPHubServer(target, HubRequestHandler)
+    else:
+        directory = os.path.dirname(target)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(target):
+            os.unlink(target)
+        server = UnixHubServer(target, HubRequestHandler)
+    server.hub = hub
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="hub.json", help="Markten en instellingen van de hub")
+    parser.add_argument("--exchange-config", default="config.json", help="RESTURL en WSURL van Bitvavo")
+    args = parser.parse_args()
+
+    config = load_config(args.exchange_config)
+    hub_config = load_config(args.config)
+    address = hub_config.get("ADDRESS", "/run/market-hub/hub.sock")
+
+    hub = MarketHub.from_config(config, hub_config).start()
+    server = make_server(hub, address)
+    metrics.watch_client(hub.client)
+    metrics.registry.gauge("hub_subscribers", "Verbonden abonnees").labels().set_function(
+        lambda: len(hub.subscribers))
+    metrics.serve(hub_config.get("METRICS_PORT"))
+    feed = "WebSocket" if hub.streaming else f"polling elke {hub.poll_interval}s"
+    print(f"[HUB] Market-data hub op {address} voor {', '.join(hub.markets) or 'geen vaste markten'} ({feed})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("[HUB] Gestopt door gebruiker.")
+    finally:
+        hub.stop()
+        server.server_close()
+        if parse_address(address)[0] != TCPHubServer.address_family and os.path.exists(address):
+            os.unlink(address)
+        print(f"[HUB] {hub.client.format_metrics()}")
+
+
+if __name__ == "__main__":
+    main()
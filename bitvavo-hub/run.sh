@@ -0,0 +1,23 @@
+#!/bin/bash
+#
+# Shell script to run the market-data hub in a Docker container
+#
+# Usage: ./run.sh
+#
+# The bots reach the hub through the socket in /tmp/market-hub; mount that
+# directory in their containers as /run/market-hub and set
+# "MARKET_HUB": "/run/market-hub/hub.sock" in their config.json.
+#
+
+echo "Running market-data hub"
+docker volume create hub_volume
+mkdir -p /tmp/market-hub
+
+docker run --rm --name market_hub -d \
+  -v $(pwd)/config/config.json:/app/config.json \
+  -v $(pwd)/config/hub.json:/app/hub.json \
+  -v /tmp/market-hub:/run/market-hub \
+  -v hub_volume:/app/data \
+  bitvavo-hub:latest
+sleep 5
+docker logs market_hub
@@ -0,0 +1,198 @@
+import json
+import threading
+import time
+
+
+class TickerStream:
+    """Live prijsstroom via de Bitvavo WebSocket (ticker- en trades-kanaal).
+
+    Draait in een eigen thread, verbindt automatisch opnieuw (met oplopende
+    wachttijd) en abonneert zich na elke reconnect opnieuw. Een onderbreking
+    langer dan ``gap_threshold`` seconden wordt als gat gemeld via ``on_gap``.
+    Eén stream kan meerdere markten over dezelfde verbinding bedienen; met
+    ``on_price(market, price)`` worden prijzen direct doorgegeven (vanuit de
+    stream-thread), met ``on_event(market, message)`` elk ticker- en
+    trade-event zelf (bijv. voor de tick-recorder). Met ``books`` (markt ->
+    ``OrderBook``) abonneert de stream zich ook op het ``book``-kanaal,
+    vraagt na elke (re)connect en bij een gat in de nonces een snapshot op
+    met ``getBook`` en houdt die boeken bij.
+    """
+
+    def __init__(self, ws_url, markets, gap_threshold=30, ping_interval=20,
+                 ping_timeout=10, max_reconnect_delay=60, on_gap=None, on_price=None, on_event=None, books=None):
+        self.ws_url = ws_url
+        self.markets = [markets] if isinstance(markets, str) else list(markets)
+        self.gap_threshold = gap_threshold
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.max_reconnect_delay = max_reconnect_delay
+        self.on_gap = on_gap
+        self.on_price = on_price
+        self.on_event = on_event
+        self.books = books or {}
+
+        self.connected = False
+        self.reconnects = 0
+        self.gaps = 0
+        self.last_prices = {}
+        self.last_message_time = None
+        self.disconnected_since = None
+
+        self._seq = {market: 0 for market in self.markets}
+        self._consumed_seq = dict(self._seq)
+        self._condition = threading.Condition()
+        self._running = False
+        self._reconnect_delay = 1
+        self._ws = None
+        self._thread = None
+
+    def start(self):
+        """Start de achtergrondthread die de verbinding onderhoudt."""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="ticker-stream", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop de stream en sluit de verbinding."""
+        self._running = False
+        if self._ws is not None:
+            self._ws.close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        with self._condition:
+            self._condition.notify_all()
+
+    def next_price(self, timeout, market=None):
+        """Wacht maximaal ``timeout`` seconden op een nieuwe prijs.
+
+        Geeft de meest recente prijs terug die nog niet is opgehaald, of None
+        als er binnen de timeout niets binnenkwam (socket down of stille markt).
+        Tussenliggende ticks worden samengevoegd: alleen de laatste telt.
+        """
+        market = market or self.markets[0]
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._seq[market] == self._consumed_seq[market] and self._running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+            if self._seq[market] == self._consumed_seq[market]:
+                return None
+            self._consumed_seq[market] = self._seq[market]
+            return self.last_prices[market]
+
+    def _run(self):
+        import websocket  # Pas laden als er echt gestreamd wordt; scheelt opstarttijd
+
+        while self._running:
+            self._ws = websocket.WebSocketApp(
+                self.ws_url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close,
+            )
+            try:
+                self._ws.run_forever(ping_interval=self.ping_interval, ping_timeout=self.ping_timeout)
+            except Exception as e:
+                print(f"[WS] Verbindingsfout: {e}")
+            self._mark_disconnected()
+            if not self._running:
+                break
+            time.sleep(self._reconnect_delay)
+            self._reconnect_delay = min(self._reconnect_delay * 2, self.max_reconnect_delay)
+
+    def _subscribe(self, ws):
+        channels = [
+            {"name": "ticker", "markets": self.markets},
+            {"name": "trades", "markets": self.markets},
+        ]
+        if self.books:
+            channels.append({"name": "book", "markets": list(self.books)})
+        ws.send(json.dumps({"action": "subscribe", "channels": channels}))
+        for market, book in self.books.items():
+            # Delta's die vóór de snapshot binnenkomen worden door het boek gebufferd
+            book.reset()
+            self._request_book(ws, market)
+
+    def _request_book(self, ws, market):
+        ws.send(json.dumps({"action": "getBook", "market": market}))
+
+    def _on_open(self, ws):
+        self.connected = True
+        self._reconnect_delay = 1
+        if self.disconnected_since is not None:
+            self.reconnects += 1
+            gap = time.time() - self.disconnected_since
+            if gap > self.gap_threshold:
+                self._report_gap(gap)
+            self.disconnected_since = None
+            self.last_message_time = None
+        self._subscribe(ws)
+
+    def _on_message(self, ws, message):
+        now = time.time()
+        try:
+            msg = json.loads(message)
+        except ValueError:
+            return
+        event = msg.get("event")
+        if "error" in msg:
+            print(f"[WS] Foutmelding van Bitvavo: {msg.get('error')}")
+            return
+        if msg.get("action") == "getBook":
+            snapshot = msg.get("response") or {}
+            book = self.books.get(snapshot.get("market"))
+            if book is not None and not book.load_snapshot(snapshot):
+                self._request_book(ws, book.market)
+            return
+        market = msg.get("market")
+        if market not in self._seq:
+            return
+        if event == "book":
+            book = self.books.get(market)
+            if book is not None and not book.apply(msg):
+                print(f"[WS] Gat in het orderboek van {market}, nieuwe snapshot opgevraagd.")
+                self._request_book(ws, market)
+            return
+        if self.on_event is not None:
+            self.on_event(market, msg)
+
+        price = None
+        if event == "ticker" and "lastPrice" in msg:
+            price = msg["lastPrice"]
+        elif event == "trade" and "price" in msg:
+            price = msg["price"]
+        if price is None:
+            return
+
+        # Stilte op een open verbinding langer dan de drempel telt ook als gat
+        if self.last_message_time is not None and now - self.last_message_time > self.gap_threshold:
+            self._report_gap(now - self.last_message_time)
+        self.last_message_time = now
+
+        price = float(price)
+        with self._condition:
+            self.last_prices[market] = price
+            self._seq[market] += 1
+            self._condition.notify_all()
+        if self.on_price is not None:
+            self.on_price(market, price)
+
+    def _on_error(self, ws, error):
+        print(f"[WS] Fout in stream: {error}")
+
+    def _on_close(self, ws, status_code=None, message=None):
+        self._mark_disconnected()
+
+    def _mark_disconnected(self):
+        if self.connected:
+            self.connected = False
+            self.disconnected_since = time.time()
+
+    def _report_gap(self, seconds):
+        self.gaps += 1
+        if self.on_gap is not None:
+            self.on_gap(seconds)
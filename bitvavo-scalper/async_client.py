@@ -0,0 +1,131 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class RateLimiter:
+    """Token bucket voor asyncio-taken die samen één API-budget delen.
+
+    Bitvavo rekent een gewicht per request af tegen een limiet per minuut
+    per IP-adres. Alle markten in het proces halen hun tokens uit dezelfde
+    emmer, zodat het totaal nooit boven ``rate_per_minute`` uitkomt.
+    """
+
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst if burst is not None else max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.waits = 0
+        self._updated = time.monotonic()
+        self._lock = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, weight=1):
+        """Wacht tot er ``weight`` tokens beschikbaar zijn en neem ze af."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self._refill()
+            while self.tokens < weight:
+                self.waits += 1
+                await asyncio.sleep((weight - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= weight
+
+
+class OrderClient:
+    """Synchrone client voor een ``OrderExecutor`` die in een orderthread van ``AsyncBitvavo`` draait.
+
+    Elke ``placeOrder``, ``getOrder`` en ``cancelOrder`` neemt eerst een
+    token uit de gedeelde ``RateLimiter`` op de event loop, zodat ook het
+    pollen van een openstaande order binnen het rate limit blijft. Al het
+    andere (``simulated``, ``executor_options``, ...) komt van de
+    onderliggende client.
+    """
+
+    def __init__(self, async_client):
+        self._async = async_client
+
+    def __getattr__(self, name):
+        return getattr(self._async.bitvavo, name)
+
+    def _call(self, method, *args):
+        loop = self._async.loop
+        if loop is not None and not self._async.simulated:
+            asyncio.run_coroutine_threadsafe(self._async.limiter.acquire(), loop).result()
+        return method(*args)
+
+    def placeOrder(self, market, side, order_type, body):
+        return self._call(self._async.bitvavo.placeOrder, market, side, order_type, body)
+
+    def getOrder(self, market, order_id):
+        return self._call(self._async.bitvavo.getOrder, market, order_id)
+
+    def cancelOrder(self, market, order_id):
+        return self._call(self._async.bitvavo.cancelOrder, market, order_id)
+
+
+class AsyncBitvavo:
+    """Gedeelde asynchrone wrapper rond één synchrone Bitvavo REST-client.
+
+    Elke aanroep wacht eerst op de gedeelde ``RateLimiter`` en draait daarna
+    in een kleine vaste threadpool, zodat blokkerende HTTP-requests de
+    event loop (en daarmee de andere markten) niet ophouden. Prijzen en
+    candles komen van ``market_data`` (bijv. een ``HubClient``); alleen als
+    dat Bitvavo zelf is, tellen ze mee voor het rate limit. Tegen een
+    gesimuleerde exchange (``simulator.py``) geldt geen rate limit.
+
+    Het volgen van orders kan tot ``fill_timeout`` seconden duren en draait
+    daarom in een eigen pool van ``order_workers`` threads, zodat het de
+    prijsrequests van andere markten niet blokkeert. Executors krijgen
+    ``orders`` als client (een ``OrderClient``), waardoor elke REST-aanroep
+    tijdens het volgen apart een token neemt.
+    """
+
+    def __init__(self, bitvavo, limiter, max_workers=4, market_data=None, order_workers=4):
+        self.bitvavo = bitvavo
+        self.limiter = limiter
+        self.market_data = market_data or bitvavo
+        self._data_weight = 1 if self.market_data is bitvavo else 0
+        self.simulated = getattr(bitvavo, "simulated", False)
+        self.loop = None
+        self.orders = OrderClient(self)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bitvavo-rest")
+        self._order_executor = ThreadPoolExecutor(max_workers=order_workers, thread_name_prefix="bitvavo-orders")
+
+    async def _call(self, method, *args, weight=1):
+        if weight and not self.simulated:
+            await self.limiter.acquire(weight)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(method, *args))
+
+    async def ticker_price(self, market):
+        return await self._call(self.market_data.tickerPrice, {'market': market}, weight=self._data_weight)
+
+    async def book(self, market, options=None):
+        return await self._call(self.bitvavo.book, market, options)
+
+    async def candles(self, market, interval, options):
+        return await self._call(self.market_data.candles, market, interval, options, weight=self._data_weight)
+
+    async def place_order(self, market, side, order_type, body):
+        return await self._call(self.bitvavo.placeOrder, market, side, order_type, body)
+
+    async def execute(self, executor, side, amount, price, exit=False):
+        """Voer een order uit via een ``OrderExecutor`` met ``orders`` als client, in de orderpool.
+
+        Het rate limit geldt per REST-aanroep van de executor, niet voor de
+        order als geheel.
+        """
+        self.loop = asyncio.get_running_loop()
+        return await self.loop.run_in_executor(
+            self._order_executor, functools.partial(executor.execute, side, amount, price, exit))
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self._order_executor.shutdown(wait=False)
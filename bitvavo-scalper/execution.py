@@ -0,0 +1,415 @@
+"""Orderuitvoering: market-, limit- en post-only-orders met het volgen van fills.
+
+``OrderExecutor.execute`` plaatst een order en wacht tot die klaar is, of
+tot ``fill_timeout`` seconden voorbij zijn. Daarna wordt het restant
+geannuleerd. Het resultaat (``Execution``) bevat de werkelijke fills:
+gevulde hoeveelheid, gemiddelde prijs en betaalde fee. Een deels gevulde
+order levert dus alleen de gevulde hoeveelheid op, en een mislukte order
+geeft een ``BitvavoAPIError`` in plaats van een verzonnen transactie.
+
+Fills komen uit het ``account``-kanaal van de Bitvavo WebSocket
+(``AccountStream``) als die draait. Anders, of als de stream wegvalt,
+wordt de order via REST (``getOrder``) gevolgd. Aan het eind wordt de order
+altijd één keer via REST gecontroleerd, zodat fills die de stream miste
+alsnog meetellen.
+
+De executor gebruikt alleen ``placeOrder``, ``getOrder`` en ``cancelOrder``
+van de client. Een lokale of gesimuleerde exchange met dezelfde methodes
+kan dus rechtstreeks worden aangesloten; ``SimulatedExchange``
+(``simulator.py``) levert ook de klok en de wachtfunctie.
+"""
+import json
+import math
+import threading
+import time
+
+from bitvavo_client import BitvavoAPIError, create_signature
+
+# Orderstatussen waarna er niets meer gevuld wordt (plus alle "canceled..."-varianten)
+FINAL_STATUSES = {"filled", "expired", "rejected"}
+ORDER_TYPES = ("market", "limit")
+# Kleinere restanten tellen als volledig gevuld (afrondingsverschillen)
+DUST = 1e-12
+# Maximaal aantal orders waarvan de stream events bewaart (ook orders van andere processen)
+MAX_TRACKED_ORDERS = 1000
+
+
+def is_final(status):
+    return status in FINAL_STATUSES or (status or "").startswith("canceled")
+
+
+def round_price(price, significant=5):
+    """Rond een prijs af op het aantal significante cijfers dat Bitvavo accepteert."""
+    if price <= 0:
+        return price
+    return round(price, significant - 1 - math.floor(math.log10(price)))
+
+
+def format_number(value, decimals=8):
+    """Getal als string zonder wetenschappelijke notatie of overbodige nullen."""
+    return f"{value:.{decimals}f}".rstrip("0").rstrip(".")
+
+
+class Execution:
+    """Stand van één order: status en de fills tot nu toe."""
+
+    def __init__(self, market, side, amount, order_id=None, order_type="market", demo=False):
+        self.market = market
+        self.side = side
+        self.amount = amount
+        self.order_id = order_id
+        self.order_type = order_type
+        self.demo = demo
+        self.status = "new"
+        self.fills = {}  # fillId -> (hoeveelheid, prijs, fee in quote-valuta)
+        # Totalen zoals Bitvavo ze bij de order meldt, voor als losse fills ontbreken
+        self._reported = (0.0, 0.0, 0.0)  # (filledAmount, filledAmountQuote, feePaid)
+
+    @property
+    def done(self):
+        return is_final(self.status)
+
+    def _fee_in_quote(self, fee, currency, price):
+        # Bitvavo rekent de fee meestal in de quote-valuta (EUR) af, soms in de base-valuta
+        if currency == self.market.split("-")[0]:
+            return fee * price
+        return fee
+
+    def add_fill(self, fill):
+        """Voeg een fill uit een REST-antwoord of WebSocket-event toe; dubbele fills tellen één keer."""
+        fill_id = fill.get("id") or fill.get("fillId")
+        amount = float(fill["amount"])
+        price = float(fill["price"])
+        fee = self._fee_in_quote(float(fill.get("fee", 0) or 0), fill.get("feeCurrency"), price)
+        self.fills[fill_id or len(self.fills)] = (amount, price, fee)
+
+    def update(self, order):
+        """Verwerk een orderobject (antwoord van placeOrder/getOrder of een 'order'-event)."""
+        self.order_id = order.get("orderId", self.order_id)
+        if order.get("status"):
+            self.status = order["status"]
+        for fill in order.get("fills") or ():
+            self.add_fill(fill)
+        if "filledAmount" in order:
+            filled = float(order["filledAmount"])
+            quote = float(order.get("filledAmountQuote", 0) or 0)
+            fee = float(order.get("feePaid", 0) or 0)
+            if filled and quote:
+                fee = self._fee_in_quote(fee, order.get("feeCurrency"), quote / filled)
+            self._reported = (filled, quote, fee)
+
+    def _totals(self):
+        amount = sum(fill[0] for fill in self.fills.values())
+        quote = sum(fill[0] * fill[1] for fill in self.fills.values())
+        fee = sum(fill[2] for fill in self.fills.values())
+        if self._reported[0] > amount + DUST:
+            return self._reported
+        return amount, quote, fee
+
+    @property
+    def filled_amount(self):
+        return self._totals()[0]
+
+    @property
+    def price(self):
+        """Gemiddelde fillprijs, of None zonder fills."""
+        amount, quote, _ = self._totals()
+        return quote / amount if amount > DUST else None
+
+    @property
+    def fee(self):
+        return self._totals()[2]
+
+    @property
+    def fully_filled(self):
+        return self.filled_amount >= self.amount - DUST
+
+    def transaction(self, timestamp):
+        """Transactie voor het journaal met de werkelijke hoeveelheid, prijs en fee."""
+        return {
+            "side": self.side,
+            "amount": self.filled_amount,
+            "price": self.price,
+            "fee": self.fee,
+            "timestamp": timestamp,
+            "order_id": self.order_id,
+        }
+
+    def describe(self):
+        if self.filled_amount <= DUST:
+            return f"{self.side} {self.market}: niets gevuld (status {self.status})"
+        return (f"{self.side} {format_number(self.filled_amount)}/{format_number(self.amount)} {self.market} "
+                f"gevuld tegen gemiddeld {self.price:.2f}, fee {self.fee:.4f} (status {self.status})")
+
+
+class OrderExecutor:
+    """Plaatst orders voor één markt en volgt ze tot ze gevuld, geannuleerd of verlopen zijn.
+
+    ``order_type`` is "market" of "limit". Een limitorder krijgt de huidige
+    prijs min (koop) of plus (verkoop) ``limit_offset`` procent als
+    limietprijs. Met ``post_only`` wordt hij alleen als maker in het boek
+    gezet (lagere fee) en door Bitvavo geannuleerd als hij direct zou
+    matchen. In ``demo``-modus wordt niets verstuurd en volledig gevuld
+    tegen de (limiet)prijs met ``fee_percentage`` aan kosten.
+
+    Exits (``execute(..., exit=True)``: stop-loss en winstneming) gebruiken
+    ``exit_order_type``, standaard "market". Een post-only limitorder kan
+    bij een dalende koers blijven liggen of door Bitvavo geannuleerd worden,
+    en dan blijft de positie juist openstaan als hij dicht moet. Een
+    limit-exit gaat daarom nooit post-only de markt op.
+
+    ``clock`` en ``sleep`` zijn de klok en de wachtfunctie bij het volgen
+    van een order; een simulator met virtuele tijd geeft hier de zijne.
+    """
+
+    def __init__(self, client, market, order_type="market", post_only=True, limit_offset=0.0,
+                 fill_timeout=30, poll_interval=1.0, reconcile_interval=10, stream=None,
+                 demo=False, fee_percentage=0.25, clock=time.time, sleep=time.sleep,
+                 exit_order_type="market"):
+        for kind in (order_type, exit_order_type):
+            if kind not in ORDER_TYPES:
+                raise ValueError(f"Onbekend ordertype: {kind}")
+        self.client = client
+        self.market = market
+        self.order_type = order_type
+        self.exit_order_type = exit_order_type
+        self.post_only = post_only
+        self.limit_offset = limit_offset
+        self.fill_timeout = fill_timeout
+        self.poll_interval = poll_interval
+        self.reconcile_interval = reconcile_interval
+        self.stream = stream
+        self.demo = demo
+        self.fee_percentage = fee_percentage
+        self.clock = clock
+        self.sleep = sleep
+
+    @classmethod
+    def from_config(cls, client, market, config, stream=None, fee_percentage=None):
+        """Maak een executor op basis van een botconfiguratie (ORDER_TYPE, POST_ONLY, ...).
+
+        Is ``client`` een gesimuleerde exchange, dan gaan de orders in demo-modus
+        gewoon naar de simulator in plaats van direct gevuld te worden.
+        """
+        simulated = getattr(client, "simulated", False)
+        return cls(
+            client, market,
+            order_type=config.get("ORDER_TYPE", "market"),
+            exit_order_type=config.get("EXIT_ORDER_TYPE", "market"),
+            post_only=config.get("POST_ONLY", True),
+            limit_offset=config.get("LIMIT_OFFSET", 0.0),
+            fill_timeout=config.get("FILL_TIMEOUT", 30),
+            poll_interval=config.get("ORDER_POLL_INTERVAL", 1.0),
+            stream=stream,
+            demo=bool(config.get("DEMO_MODE")) and not simulated,
+            fee_percentage=fee_percentage if fee_percentage is not None else config.get("TRADE_FEE_PERCENTAGE", 0.25),
+            **(client.executor_options(market) if simulated else {}),
+        )
+
+    def limit_price(self, side, price):
+        offset = self.limit_offset / 100
+        return round_price(price * (1 - offset) if side == "buy" else price * (1 + offset))
+
+    def order_body(self, side, amount, price, exit=False):
+        body = {"amount": format_number(amount)}
+        if self.order_type_for(exit) == "limit":
+            body["price"] = format_number(self.limit_price(side, price), 10)
+            body["timeInForce"] = "GTC"
+            body["postOnly"] = bool(self.post_only) and not exit
+        return body
+
+    def order_type_for(self, exit=False):
+        return self.exit_order_type if exit else self.order_type
+
+    def execute(self, side, amount, price, exit=False):
+        """Plaats een order van ``amount`` rond ``price`` en geef de ``Execution`` terug.
+
+        Met ``exit`` gaat de order als ``exit_order_type`` en nooit post-only.
+
+        Een fout bij het plaatsen komt als ``BitvavoAPIError`` naar boven.
+        Na ``fill_timeout`` seconden wordt het ongevulde deel geannuleerd;
+        fouten daarna leveren de (deels) gevulde ``Execution`` op.
+        """
+        # Zelfde afronding als in de order, anders lijkt een volledig gevulde order deels gevuld
+        amount = float(format_number(amount))
+        order_type = self.order_type_for(exit)
+        execution = Execution(self.market, side, amount, order_type=order_type, demo=self.demo)
+        if self.demo:
+            fill_price = self.limit_price(side, price) if order_type == "limit" else price
+            execution.update({"orderId": "demo", "status": "filled", "fills": [{
+                "id": "demo", "amount": amount, "price": fill_price,
+                "fee": self.fee_percentage / 100 * fill_price * amount}]})
+            return execution
+
+        order = self.client.placeOrder(self.market, side, order_type, self.order_body(side, amount, price, exit))
+        execution.update(order)
+        try:
+            if not execution.done:
+                self._follow(execution)
+        finally:
+            if self.stream is not None:
+                self.stream.forget(execution.order_id)
+        return execution
+
+    def _follow(self, execution):
+        """Volg een openstaande order tot hij klaar is; annuleer het restant na ``fill_timeout``.
+
+        Een mislukte ``getOrder`` tijdens het volgen wordt gemeld en bij de
+        volgende poll opnieuw geprobeerd. Annuleren en de eindcontrole gebeuren
+        altijd, ook als het volgen zelf misgaat, zodat er geen order blijft
+        openstaan en de (deels) gevulde ``Execution`` terugkomt.
+        """
+        deadline = self.clock() + self.fill_timeout
+        last_reconcile = self.clock()
+        try:
+            while not execution.done and self.clock() < deadline:
+                streaming = self.stream is not None and self.stream.connected
+                if streaming:
+                    for event in self.stream.wait_events(execution.order_id, self.poll_interval):
+                        if event.get("event") == "fill":
+                            execution.add_fill(event)
+                        else:
+                            execution.update(event)
+                else:
+                    self.sleep(self.poll_interval)
+                if not streaming or self.clock() - last_reconcile >= self.reconcile_interval:
+                    last_reconcile = self.clock()
+                    self._reconcile(execution)
+        finally:
+            if not execution.done:
+                try:
+                    execution.update(self.client.cancelOrder(self.market, execution.order_id))
+                except BitvavoAPIError as e:
+                    # Bijvoorbeeld als de order intussen toch gevuld is
+                    print(f"[ORDER] Annuleren van {execution.order_id} mislukt: {e}")
+            # Eindstand altijd via REST, met eventueel door de stream gemiste fills
+            self._reconcile(execution)
+
+    def _reconcile(self, execution):
+        """Werk ``execution`` bij met ``getOrder``; een fout wordt gemeld en niet doorgegeven."""
+        try:
+            execution.update(self.client.getOrder(self.market, execution.order_id))
+        except BitvavoAPIError as e:
+            print(f"[ORDER] Opvragen van {execution.order_id} mislukt: {e}")
+
+
+class AccountStream:
+    """Order- en fill-events uit het geauthenticeerde ``account``-kanaal van de Bitvavo WebSocket.
+
+    Draait in een eigen thread en verbindt na een onderbreking opnieuw.
+    Events worden per orderId bewaard tot ``forget``. ``OrderExecutor``
+    haalt ze op met ``wait_events``. Gemiste events zijn geen probleem,
+    want de executor controleert elke order aan het eind via REST.
+    """
+
+    def __init__(self, ws_url, api_key, api_secret, markets, access_window=10000, max_reconnect_delay=60):
+        self.ws_url = ws_url
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.markets = list(markets)
+        self.access_window = access_window
+        self.max_reconnect_delay = max_reconnect_delay
+
+        self.connected = False
+        self.reconnects = 0
+        self._events = {}  # orderId -> lijst met nog niet opgehaalde events
+        self._condition = threading.Condition()
+        self._running = False
+        self._reconnect_delay = 1
+        self._ws = None
+        self._thread = None
+
+    @classmethod
+    def from_config(cls, config, markets):
+        return cls(config.get("WSURL", "wss://ws.bitvavo.com/v2/"), config.get("API_KEY"),
+                   config.get("API_SECRET"), markets, access_window=config.get("ACCESSWINDOW", 10000))
+
+    def start(self):
+        import websocket  # Alleen nodig als de stream aan staat
+
+        self._websocket = websocket
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="account-stream", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._ws is not None:
+            self._ws.close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def wait_events(self, order_id, timeout):
+        """Wacht maximaal ``timeout`` seconden op events voor ``order_id`` en geef ze terug."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while not self._events.get(order_id) and self._running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return self._events.pop(order_id, [])
+
+    def forget(self, order_id):
+        with self._condition:
+            self._events.pop(order_id, None)
+
+    def _run(self):
+        while self._running:
+            self._ws = self._websocket.WebSocketApp(
+                self.ws_url, on_open=self._on_open, on_message=self._on_message,
+                on_error=self._on_error, on_close=self._on_close)
+            try:
+                self._ws.run_forever(ping_interval=20, ping_timeout=10)
+            except Exception as e:
+                print(f"[ORDER-WS] Verbindingsfout: {e}")
+            self.connected = False
+            if not self._running:
+                break
+            time.sleep(self._reconnect_delay)
+            self._reconnect_delay = min(self._reconnect_delay * 2, self.max_reconnect_delay)
+            self.reconnects += 1
+
+    def _on_open(self, ws):
+        timestamp = int(time.time() * 1000)
+        ws.send(json.dumps({
+            "action": "authenticate",
+            "key": self.api_key,
+            "signature": create_signature(timestamp, "GET", "/v2/websocket", None, self.api_secret),
+            "timestamp": timestamp,
+            "window": self.access_window,
+        }))
+
+    def _on_message(self, ws, message):
+        try:
+            msg = json.loads(message)
+        except ValueError:
+            return
+        if "error" in msg:
+            print(f"[ORDER-WS] Foutmelding van Bitvavo: {msg.get('error')}")
+            return
+        event = msg.get("event")
+        if event == "authenticate":
+            if msg.get("authenticated"):
+                ws.send(json.dumps({"action": "subscribe",
+                                    "channels": [{"name": "account", "markets": self.markets}]}))
+            return
+        if event == "subscribed":
+            self.connected = True
+            self._reconnect_delay = 1
+            return
+        if event in ("order", "fill") and msg.get("orderId"):
+            with self._condition:
+                self._events.setdefault(msg["orderId"], []).append(msg)
+                if len(self._events) > MAX_TRACKED_ORDERS:
+                    del self._events[next(iter(self._events))]
+                self._condition.notify_all()
+
+    def _on_error(self, ws, error):
+        print(f"[ORDER-WS] Fout in stream: {error}")
+
+    def _on_close(self, ws, status_code=None, message=None):
+        self.connected = False
+        with self._condition:
+            self._condition.notify_all()
@@ -0,0 +1,233 @@
+"""Client voor de market-data hub (``bitvavo-hub/hub.py``).
+
+``HubClient`` biedt ``tickerPrice`` en ``candles`` met dezelfde aanroepen en
+antwoorden als ``BitvavoClient``. Met ``MARKET_HUB`` in config.json haalt
+een bot zijn marktdata zo bij de hub in plaats van bij Bitvavo; orders gaan
+altijd rechtstreeks naar Bitvavo. Is de hub niet bereikbaar, dan valt de
+client terug op de gewone REST-client (``fallback``) en probeert hij het na
+``retry_after`` seconden opnieuw bij de hub.
+
+``HubStream`` is de pushvariant: een prijsstroom met dezelfde callbacks als
+``TickerStream`` (``on_price``, ``on_gap``), gevoed door de hub in plaats
+van een eigen WebSocket naar Bitvavo.
+
+``MARKET_HUB`` is een pad (Unix-socket) of ``host:poort`` (TCP).
+"""
+import json
+import socket
+import threading
+import time
+
+from bitvavo_client import BitvavoAPIError
+
+
+def parse_address(address):
+    """(family, doel) voor ``socket``: een pad is een Unix-socket, ``host:poort`` TCP."""
+    if "/" in address or ":" not in address:
+        return socket.AF_UNIX, address
+    host, port = address.rsplit(":", 1)
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def connect(address, timeout):
+    family, target = parse_address(address)
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(target)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def encode(message):
+    return json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+class HubClient:
+    """Marktdata via de hub, met terugval op Bitvavo; zie de moduledocumentatie."""
+
+    def __init__(self, address, fallback=None, timeout=5, retry_after=10):
+        self.address = address
+        self.fallback = fallback
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.requests = 0
+        self.fallbacks = 0
+        self._sock = None
+        self._file = None
+        self._down_until = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, fallback=None):
+        """Een client als ``MARKET_HUB`` in config.json staat, anders None."""
+        address = config.get("MARKET_HUB")
+        if not address:
+            return None
+        return cls(address, fallback, timeout=config.get("MARKET_HUB_TIMEOUT", 5),
+                   retry_after=config.get("MARKET_HUB_RETRY", 10))
+
+    def tickerPrice(self, options=None):
+        options = options or {}
+        if "market" not in options:
+            # De hub beantwoordt alleen prijzen per markt
+            return self._fallback("tickerPrice", options)
+        return self._call({"op": "ticker", "market": options["market"]}, "tickerPrice", options)
+
+    def candles(self, market, interval, options=None):
+        request = {"op": "candles", "market": market, "interval": interval, "options": options or {}}
+        return self._call(request, "candles", market, interval, options)
+
+    def _call(self, request, method, *args):
+        if time.monotonic() >= self._down_until:
+            try:
+                response = self._request(request)
+            except (OSError, ValueError) as e:
+                self._down_until = time.monotonic() + self.retry_after
+                if self.fallback is None:
+                    raise BitvavoAPIError(f"Market-data hub {self.address} niet bereikbaar: {e}") from e
+                print(f"[HUB] {self.address} niet bereikbaar ({e}), {self.retry_after}s via Bitvavo")
+            else:
+                if isinstance(response, dict) and "errorCode" in response:
+                    raise BitvavoAPIError(f"hub {request['op']}: {response.get('error')}",
+                                          error_code=response["errorCode"])
+                return response
+        return self._fallback(method, *args)
+
+    def _fallback(self, method, *args):
+        if self.fallback is None:
+            raise BitvavoAPIError(f"Market-data hub {self.address} niet bereikbaar")
+        self.fallbacks += 1
+        return getattr(self.fallback, method)(*args)
+
+    def _request(self, request):
+        """Eén request over de vaste verbinding; een verbroken verbinding wordt één keer hersteld."""
+        data = encode(request)
+        with self._lock:
+            for attempt in range(2):
+                if self._sock is None:
+                    self._sock = connect(self.address, self.timeout)
+                    self._file = self._sock.makefile("rb")
+                try:
+                    self._sock.sendall(data)
+                    line = self._file.readline()
+                    if not line:
+                        raise ConnectionError("verbinding gesloten door de hub")
+                    self.requests += 1
+                    return json.loads(line)
+                except OSError:
+                    self._close()
+                    if attempt:
+                        raise
+
+    def _close(self):
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+        self._sock = self._file = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+class HubStream:
+    """Prijzen van de hub voor ``markets``, doorgegeven via ``on_price(market, price)``.
+
+    Draait in een eigen thread en verbindt opnieuw (met oplopende wachttijd)
+    als de hub wegvalt. Een onderbreking langer dan ``gap_threshold``
+    seconden wordt gemeld via ``on_gap``. De hub stuurt elke paar seconden
+    een heartbeat; blijft alles ``idle_timeout`` seconden stil, dan geldt de
+    verbinding als verbroken.
+    """
+
+    def __init__(self, address, markets, gap_threshold=30, idle_timeout=20,
+                 max_reconnect_delay=60, on_gap=None, on_price=None):
+        self.address = address
+        self.markets = [markets] if isinstance(markets, str) else list(markets)
+        self.gap_threshold = gap_threshold
+        self.idle_timeout = idle_timeout
+        self.max_reconnect_delay = max_reconnect_delay
+        self.on_gap = on_gap
+        self.on_price = on_price
+
+        self.connected = False
+        self.reconnects = 0
+        self.gaps = 0
+        self.last_prices = {}
+        self.disconnected_since = None
+
+        self._running = False
+        self._sock = None
+        self._thread = None
+
+    def start(self):
+        """Start de achtergrondthread die de verbinding met de hub onderhoudt."""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="hub-stream", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        delay = 1
+        while self._running:
+            try:
+                self._sock = connect(self.address, self.idle_timeout)
+                self._sock.sendall(encode({"op": "subscribe", "markets": self.markets}))
+                self._on_connect()
+                delay = 1
+                self._read(self._sock.makefile("rb"))
+            except (OSError, ValueError) as e:
+                if self._running:
+                    print(f"[HUB] Stream onderbroken: {e}")
+            finally:
+                if self._sock is not None:
+                    self._sock.close()
+                    self._sock = None
+                self._mark_disconnected()
+            if not self._running:
+                break
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _read(self, stream):
+        for line in stream:
+            message = json.loads(line)
+            event = message.get("event")
+            if event == "ticker":
+                market = message["market"]
+                price = float(message["price"])
+                self.last_prices[market] = price
+                if self.on_price is not None:
+                    self.on_price(market, price)
+            elif "errorCode" in message:
+                raise ValueError(f"hub weigert abonnement: {message.get('error')}")
+
+    def _on_connect(self):
+        self.connected = True
+        if self.disconnected_since is not None:
+            self.reconnects += 1
+            gap = time.time() - self.disconnected_since
+            if gap > self.gap_threshold:
+                self.gaps += 1
+                if self.on_gap is not None:
+                    self.on_gap(gap)
+            self.disconnected_since = None
+
+    def _mark_disconnected(self):
+        if self.connected:
+            self.connected = False
+            self.disconnected_since = time.time()
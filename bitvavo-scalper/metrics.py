@@ -0,0 +1,358 @@
+"""Prometheus-metrics voor de bots, zonder extra dependency.
+
+``BotMetrics`` bundelt wat elke bot meet: latency-histogrammen per stap van
+de handelslus (prijs ophalen, model, order, journaal, ...), de loop-lag ten
+opzichte van het ingestelde interval (of de deadline van de ``Scheduler``),
+overgeslagen rondes, fouten en orders per markt en, via
+callbacks die pas bij het uitlezen draaien, positie, gerealiseerde
+winst/verlies, REST-statistieken van ``BitvavoClient``, de Slack-wachtrij en
+de live voorspelkwaliteit van het model (``PredictionScore``).
+
+Een meting kost een paar ``perf_counter``-aanroepen, een ``bisect`` en een
+lock (enkele microseconden), dus de metrics staan altijd aan. Met een poort
+in de configuratie (``METRICS_PORT``) serveert ``start_http_server`` ze op
+``http://<host>:<poort>/metrics`` in het Prometheus-tekstformaat.
+"""
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency-buckets in seconden, van 0,1 ms tot 30 s
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Buckets voor de loop-lag in seconden (te laat ten opzichte van het interval)
+LAG_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if value != value:
+        return "NaN"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """Het kind voor deze labelwaarden; bewaar het voor gebruik in een hete lus."""
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def samples(self, const_names, const_values):
+        for values, child in list(self._children.items()):
+            yield from child.samples(self.name, const_names + self.labelnames, const_values + values)
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        """Lees de waarde pas bij het uitlezen van de metrics uit ``function()``."""
+        self.function = function
+
+    def samples(self, name, names, values):
+        value = self.value
+        if self.function is not None:
+            try:
+                value = self.function()
+            except Exception:
+                return
+            if value is None:
+                return
+        yield name, names, values, value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        """Contextmanager die de duur van het blok observeert."""
+        return _Timer(self)
+
+    def samples(self, name, names, values):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            yield f"{name}_bucket", names + ("le",), values + (_format_value(bound),), cumulative
+        yield f"{name}_sum", names, values, total
+        yield f"{name}_count", names, values, cumulative
+
+
+class _Timer:
+    # Een klasse in plaats van @contextmanager: scheelt de generator-overhead per meting
+    __slots__ = ("child", "started")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.started)
+        return False
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+
+class Registry:
+    """Verzameling metrics met vaste labels (bijv. ``bot="scalper"``) en tekstexport."""
+
+    def __init__(self, **const_labels):
+        self.const_names = tuple(const_labels)
+        self.const_values = tuple(const_labels.values())
+        self.metrics = []
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._add(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self):
+        """Alle metrics in het Prometheus-tekstformaat (versie 0.0.4)."""
+        lines = []
+        for metric in self.metrics:
+            samples = list(metric.samples(self.const_names, self.const_values))
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, names, values, value in samples:
+                lines.append(f"{name}{_format_labels(names, values)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def start_http_server(registry, port, host="0.0.0.0"):
+    """Serveer ``/metrics`` vanuit een achtergrondthread; geeft de server terug."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+class BotMetrics:
+    """De standaardmetrics van een bot; zie de moduledocumentatie."""
+
+    def __init__(self, bot):
+        self.registry = Registry(bot=bot)
+        registry = self.registry
+        self.stage_seconds = registry.histogram(
+            "bot_stage_seconds", "Duur per stap van de handelslus in seconden", ("market", "stage"))
+        self.loop_lag_seconds = registry.histogram(
+            "bot_loop_lag_seconds", "Hoeveel later dan het ingestelde interval een ronde begon",
+            ("market",), LAG_BUCKETS)
+        self.loop_interval = registry.gauge(
+            "bot_loop_interval_seconds", "Ingesteld interval van de handelslus", ("market",))
+        self.ticks = registry.counter("bot_ticks_total", "Verwerkte prijzen", ("market",))
+        self.errors = registry.counter("bot_errors_total", "Fouten per stap", ("market", "stage"))
+        self.orders = registry.counter("bot_orders_total", "Orders per kant en resultaat", ("market", "side", "result"))
+        self.position = registry.gauge("bot_position", "Open positie in de base-valuta", ("market",))
+        self.realized_pnl = registry.gauge(
+            "bot_realized_pnl", "Gerealiseerde winst/verlies na fees in de quote-valuta", ("market",))
+        self.fees = registry.gauge("bot_fees", "Betaalde fees in de quote-valuta", ("market",))
+        self.slack_post_seconds = registry.histogram("bot_slack_post_seconds", "Duur van een Slack-post in seconden")
+        self._rest = {}
+        self._predictions = {}
+        self._missed = None
+        self._last_tick = {}
+
+    def stage(self, market, stage):
+        """Histogram-kind voor een stap; ``with metrics.stage(m, "model").time(): ...``."""
+        return self.stage_seconds.labels(market, stage)
+
+    def tick(self, market, interval=None, lag=None):
+        """Tel een ronde en meet de loop-lag: ``lag`` van een ``Scheduler``, of ten opzichte van ``interval`` seconden."""
+        now = time.monotonic()
+        self.ticks.labels(market).inc()
+        last = self._last_tick.get(market)
+        self._last_tick[market] = now
+        if lag is not None:
+            self.loop_lag_seconds.labels(market).observe(lag)
+        elif interval and last is not None:
+            self.loop_interval.labels(market).set(interval)
+            self.loop_lag_seconds.labels(market).observe(max(0.0, now - last - interval))
+
+    def order(self, market, side, execution):
+        """Tel een order: gevuld, deels gevuld, niet gevuld of mislukt (``execution`` is None)."""
+        if execution is None:
+            result = "error"
+        elif execution.filled_amount <= 0:
+            result = "unfilled"
+        elif execution.fully_filled:
+            result = "filled"
+        else:
+            result = "partial"
+        self.orders.labels(market, side, result).inc()
+
+    def watch_pnl(self, market, pnl):
+        """Positie, winst/verlies en fees van een ``PnlTracker``, gelezen bij het uitlezen."""
+        self.position.labels(market).set_function(lambda: pnl.position)
+        self.realized_pnl.labels(market).set_function(lambda: pnl.realized)
+        self.fees.labels(market).set_function(lambda: pnl.fees)
+
+    def watch_predictions(self, market, score):
+        """Voorspelkwaliteit van een ``PredictionScore``; fout, skill en richting zijn de recente waarden."""
+        registry = self.registry
+        if not self._predictions:
+            self._predictions = {
+                "count": registry.counter("bot_predictions_total", "Gescoorde voorspellingen", ("market",)),
+                "recent_mae": registry.gauge(
+                    "bot_prediction_mae", "Recente gemiddelde absolute fout van de voorspelde prijs", ("market",)),
+                "recent_skill": registry.gauge(
+                    "bot_prediction_skill", "Recente skill: 1 - MAE / MAE van 'prijs blijft gelijk'", ("market",)),
+                "recent_direction_accuracy": registry.gauge(
+                    "bot_prediction_direction_accuracy", "Recent aandeel voorspellingen met de goede richting",
+                    ("market",)),
+            }
+        for key, metric in self._predictions.items():
+            metric.labels(market).set_function(lambda key=key: getattr(score, key))
+
+    def watch_scheduler(self, market, scheduler):
+        """Interval en overgeslagen rondes van een ``Scheduler``; de lag komt via ``tick(market, lag=...)``."""
+        if self._missed is None:
+            self._missed = self.registry.counter(
+                "bot_missed_ticks_total", "Rondes overgeslagen omdat de vorige te lang duurde", ("market",))
+        self.loop_interval.labels(market).set(scheduler.interval)
+        self._missed.labels(market).set_function(lambda: scheduler.missed)
+
+    def watch_client(self, client):
+        """REST-tellers, rate-limitbudget en latency per endpoint van een ``BitvavoClient``."""
+        registry = self.registry
+        if not self._rest:
+            self._rest = {
+                "requests": registry.counter("bitvavo_rest_requests_total", "REST-requests naar Bitvavo"),
+                "errors": registry.counter("bitvavo_rest_errors_total", "Mislukte REST-requests en foutantwoorden"),
+                "retries": registry.counter("bitvavo_rest_retries_total", "Herhaalde REST-requests"),
+                "throttled": registry.counter("bitvavo_rest_throttled_total", "Keren afgeremd voor het rate limit"),
+                "throttled_seconds": registry.counter(
+                    "bitvavo_rest_throttled_seconds_total", "Totale wachttijd voor het rate limit"),
+                "remaining": registry.gauge("bitvavo_ratelimit_remaining", "Resterend gewicht volgens Bitvavo"),
+            }
+            self._latency = registry.gauge(
+                "bitvavo_rest_latency_seconds", "Latency-percentielen per endpoint (laatste 1000 requests)",
+                ("endpoint", "quantile"))
+        cache = {"time": 0.0, "metrics": None}
+
+        def snapshot():
+            # Eén keer per scrape de metrics van de client opvragen
+            now = time.monotonic()
+            if now - cache["time"] > 0.5:
+                cache["metrics"] = client.metrics()
+                cache["time"] = now
+                for name, endpoint in cache["metrics"]["endpoints"].items():
+                    self._latency.labels(name, "0.5").set(endpoint["p50_ms"] / 1000)
+                    self._latency.labels(name, "0.95").set(endpoint["p95_ms"] / 1000)
+            return cache["metrics"]
+
+        for key, metric in self._rest.items():
+            metric.labels().set_function(lambda key=key: snapshot()[key])
+
+    def watch_notifier(self, notifier):
+        """Slack-tellers en de duur van elke post."""
+        if notifier is None:
+            return
+        messages = self.registry.counter("bot_slack_messages_total", "Slack-berichten per resultaat", ("result",))
+        for result in ("queued", "sent", "dropped", "failed"):
+            messages.labels(result).set_function(lambda result=result: notifier.stats()[result])
+        self.registry.gauge("bot_slack_pending", "Berichten in de Slack-wachtrij").labels().set_function(
+            lambda: notifier.stats()["pending"])
+        notifier.on_post = self.slack_post_seconds.labels().observe
+
+    def serve(self, port, host="0.0.0.0"):
+        """Start het HTTP-endpoint als er een poort is ingesteld."""
+        if not port:
+            return None
+        server = start_http_server(self.registry, int(port), host)
+        print(f"[METRICS] Prometheus-metrics op http://{host}:{port}/metrics")
+        return server
@@ -0,0 +1,200 @@
+"""Lokaal orderboek, bijgehouden uit de snapshot en delta's van de Bitvavo WebSocket.
+
+Bitvavo stuurt op het ``book``-kanaal alleen wijzigingen: per prijsniveau
+de nieuwe totale hoeveelheid, 0 als het niveau verdwijnt, met een
+oplopende ``nonce``. ``OrderBook`` laadt een snapshot (``getBook``), past
+de delta's erna toe en merkt een ontbrekende nonce als gat; de stream
+vraagt dan een nieuwe snapshot op. Delta's die binnenkomen voordat de
+snapshot er is, worden gebufferd en daarna afgespeeld.
+
+Per kant staan de prijsniveaus in een gesorteerde lijst met het beste
+niveau achteraan, plus een dict van niveau naar hoeveelheid. Een bestaand
+niveau bijwerken is één dict-toegang; een niveau toevoegen of weghalen is
+een ``bisect`` (O(log n)) plus een verschuiving van alleen de niveaus
+erachter. Omdat bijna alle wijzigingen rond de beste prijs vallen, is dat
+meestal een handvol elementen. Beste bied/laat is O(1), en VWAP en slippage
+voor een hoeveelheid lopen alleen de niveaus af die daarvoor nodig zijn.
+"""
+import bisect
+import threading
+
+# Zoveel delta's worden bewaard terwijl er op een snapshot gewacht wordt
+MAX_BUFFERED = 10000
+
+
+class _Side:
+    """Eén kant van het boek; intern zijn de sleutels zo gekozen dat de beste prijs achteraan staat."""
+
+    def __init__(self, descending):
+        self.sign = -1.0 if descending else 1.0
+        self.keys = []
+        self.sizes = {}
+
+    def clear(self):
+        self.keys.clear()
+        self.sizes.clear()
+
+    def set(self, price, size):
+        key = self.sign * price
+        if size > 0:
+            if key not in self.sizes:
+                bisect.insort(self.keys, key)
+            self.sizes[key] = size
+        elif key in self.sizes:
+            del self.sizes[key]
+            del self.keys[bisect.bisect_left(self.keys, key)]
+
+    def best(self):
+        if not self.keys:
+            return None, None
+        key = self.keys[-1]
+        return self.sign * key, self.sizes[key]
+
+    def levels(self, count=None):
+        """(prijs, hoeveelheid) vanaf de beste prijs."""
+        keys = self.keys if count is None else self.keys[-count:]
+        return [(self.sign * key, self.sizes[key]) for key in reversed(keys)]
+
+    def fill(self, amount):
+        """(gemiddelde prijs, gevulde hoeveelheid) voor ``amount`` tegen deze kant."""
+        remaining = amount
+        quote = 0.0
+        sizes = self.sizes
+        for key in reversed(self.keys):
+            size = sizes[key]
+            take = size if size < remaining else remaining
+            quote += take * key
+            remaining -= take
+            if remaining <= 0:
+                break
+        filled = amount - max(remaining, 0.0)
+        return (self.sign * quote / filled if filled > 0 else None), filled
+
+
+class OrderBook:
+    """Orderboek van één markt; thread-safe, de stream schrijft en de bot leest."""
+
+    def __init__(self, market):
+        self.market = market
+        self.nonce = None
+        self.synced = False
+        self.updates = 0
+        self.resyncs = 0
+        self.bids = _Side(descending=False)  # Hoogste bod achteraan
+        self.asks = _Side(descending=True)  # Laagste laat achteraan
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Vergeet het boek, bijv. na een reconnect; er is een nieuwe snapshot nodig."""
+        with self._lock:
+            self.synced = False
+            self.nonce = None
+            self._buffer.clear()
+            self.bids.clear()
+            self.asks.clear()
+
+    def load_snapshot(self, snapshot):
+        """Laad een volledig boek (``getBook`` of REST ``/book``) en speel gebufferde delta's af.
+
+        Geeft False als de gebufferde delta's niet aansluiten; dan is een
+        nieuwe snapshot nodig.
+        """
+        with self._lock:
+            self.bids.clear()
+            self.asks.clear()
+            self._apply_levels(snapshot)
+            self.nonce = snapshot.get("nonce")
+            self.synced = True
+            buffered, self._buffer = self._buffer, []
+            for update in buffered:
+                nonce = update.get("nonce")
+                if self.nonce is not None and nonce is not None and nonce <= self.nonce:
+                    continue
+                if not self._apply(update):
+                    return False
+            return True
+
+    def apply(self, update):
+        """Verwerk een ``book``-event; False bij een gat in de nonces (nieuwe snapshot nodig)."""
+        with self._lock:
+            if not self.synced:
+                if len(self._buffer) < MAX_BUFFERED:
+                    self._buffer.append(update)
+                return True
+            return self._apply(update)
+
+    def _apply(self, update):
+        nonce = update.get("nonce")
+        if nonce is not None and self.nonce is not None:
+            if nonce <= self.nonce:
+                return True  # Al verwerkt
+            if nonce != self.nonce + 1:
+                self.synced = False
+                self.resyncs += 1
+                self._buffer = [update]
+                return False
+        self._apply_levels(update)
+        if nonce is not None:
+            self.nonce = nonce
+        self.updates += 1
+        return True
+
+    def _apply_levels(self, message):
+        for price, size, *_ in message.get("bids", ()):
+            self.bids.set(float(price), float(size))
+        for price, size, *_ in message.get("asks", ()):
+            self.asks.set(float(price), float(size))
+
+    def best_bid(self):
+        with self._lock:
+            return self.bids.best()[0]
+
+    def best_ask(self):
+        with self._lock:
+            return self.asks.best()[0]
+
+    def spread(self):
+        """Laat min bod, of None als een kant leeg is."""
+        with self._lock:
+            bid, ask = self.bids.best()[0], self.asks.best()[0]
+        return None if bid is None or ask is None else ask - bid
+
+    def mid(self):
+        with self._lock:
+            bid, ask = self.bids.best()[0], self.asks.best()[0]
+        return None if bid is None or ask is None else (bid + ask) / 2
+
+    def depth(self, levels=10):
+        """De beste ``levels`` niveaus per kant: {"bids": [(prijs, hoeveelheid), ...], "asks": [...]}."""
+        with self._lock:
+            return {"bids": self.bids.levels(levels), "asks": self.asks.levels(levels)}
+
+    def vwap(self, side, amount):
+        """Gemiddelde prijs waartegen een market order van ``amount`` nu gevuld zou worden.
+
+        ``side`` is de kant van onze order: "buy" loopt de laten af, "sell"
+        de biedingen. None als het boek niet bijgewerkt is of niet diep genoeg.
+        """
+        with self._lock:
+            if not self.synced:
+                return None
+            price, filled = (self.asks if side == "buy" else self.bids).fill(amount)
+        return price if filled >= amount * (1 - 1e-9) else None
+
+    def slippage(self, side, amount):
+        """Relatieve kosten van ``amount`` doorhandelen ten opzichte van de beste prijs (0,001 = 0,1%)."""
+        with self._lock:
+            best = (self.asks if side == "buy" else self.bids).best()[0]
+        price = self.vwap(side, amount)
+        if price is None or not best:
+            return None
+        return (price - best) / best if side == "buy" else (best - price) / best
+
+    def round_trip_cost(self, amount):
+        """Kosten in de quote-valuta om ``amount`` nu te kopen en meteen weer te verkopen (spread plus diepte)."""
+        buy = self.vwap("buy", amount)
+        sell = self.vwap("sell", amount)
+        if buy is None or sell is None:
+            return None
+        return (buy - sell) * amount
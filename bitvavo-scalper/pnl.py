@@ -0,0 +1,176 @@
+"""Winst/verlies-rapportage met FIFO- of gemiddelde-kostprijs-matching.
+
+``PnlTracker`` verwerkt transacties één voor één: een aankoop opent een lot,
+een verkoop sluit de oudste lots (FIFO) of rekent tegen de gemiddelde
+kostprijs. Elke transactie kost O(1) (geamortiseerd), ook bij honderdduizenden
+fills, en de lopende totalen per dag, per week en over de hele looptijd zijn
+direct beschikbaar voor één samengevat rapport.
+"""
+from collections import deque
+from datetime import datetime, timedelta
+
+STATE_VERSION = 1
+
+# Restanten kleiner dan dit gelden als volledig gesloten lot
+EPSILON = 1e-12
+
+
+def transaction_time(txn):
+    """Tijdstip van een transactie; epoch-seconden of het tekstformaat van hodl."""
+    value = txn['timestamp']
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+    return datetime.fromtimestamp(value)
+
+
+def week_key(day):
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+class PnlTracker:
+    """Incrementele winst/verlies-boekhouding van één markt."""
+
+    def __init__(self, method="fifo", keep_days=35):
+        if method not in ("fifo", "average"):
+            raise ValueError(f"Onbekende PnL-methode: {method}")
+        self.method = method
+        self.keep_days = keep_days
+        self.lots = deque()  # [hoeveelheid, prijs] van open aankopen, oudste eerst
+        self.position = 0.0
+        self.cost = 0.0
+        self.realized = 0.0
+        self.fees = 0.0
+        self.trades = 0
+        self.unmatched = 0.0
+        self.daily = {}   # "YYYY-MM-DD" -> [winst/verlies, trades]
+        self.weekly = {}  # "YYYY-Www" -> [winst/verlies, trades]
+        self._day_range = (0.0, 0.0, None)  # (start, einde, sleutels) van de laatst geziene dag
+
+    def add(self, txn):
+        """Verwerk één transactie en geef de gerealiseerde winst/verlies ervan terug."""
+        amount = float(txn['amount'])
+        price = float(txn['price'])
+        fee = float(txn.get('fee', 0.0))
+        realized = 0.0 - fee
+
+        if txn['side'] == 'buy':
+            self.position += amount
+            self.cost += amount * price
+            if self.method == "fifo":
+                self.lots.append([amount, price])
+        else:
+            matched = min(amount, self.position)
+            self.unmatched += amount - matched
+            if self.method == "fifo":
+                cost = self._close_lots(matched)
+            else:
+                cost = self.cost * matched / self.position if self.position > EPSILON else 0.0
+            realized += matched * price - cost
+            self.position -= matched
+            self.cost -= cost
+            if self.position <= EPSILON:
+                self.position = self.cost = 0.0
+                self.lots.clear()
+
+        self.realized += realized
+        self.fees += fee
+        self.trades += 1
+        day, day_key, week = self._day_of(txn['timestamp'])
+        self._bucket(self.daily, day_key, realized)
+        self._bucket(self.weekly, week, realized)
+        if len(self.daily) > self.keep_days:
+            self._prune(day)
+        return realized
+
+    def _day_of(self, timestamp):
+        """(datum, dagsleutel, weeksleutel) van een tijdstempel; de laatst geziene dag wordt hergebruikt."""
+        if isinstance(timestamp, str):
+            day = transaction_time({'timestamp': timestamp}).date()
+            return day, day.isoformat(), week_key(day)
+        start, end, keys = self._day_range
+        if start <= timestamp < end:
+            return keys
+        day = datetime.fromtimestamp(timestamp).date()
+        start = datetime.combine(day, datetime.min.time()).timestamp()
+        end = datetime.combine(day + timedelta(days=1), datetime.min.time()).timestamp()
+        keys = (day, day.isoformat(), week_key(day))
+        self._day_range = (start, end, keys)
+        return keys
+
+    def _close_lots(self, amount):
+        """Sluit ``amount`` af tegen de oudste lots en geef de kostprijs terug."""
+        cost = 0.0
+        while amount > EPSILON and self.lots:
+            lot = self.lots[0]
+            take = min(amount, lot[0])
+            cost += take * lot[1]
+            lot[0] -= take
+            amount -= take
+            if lot[0] <= EPSILON:
+                self.lots.popleft()
+        return cost
+
+    @staticmethod
+    def _bucket(buckets, key, realized):
+        bucket = buckets.get(key)
+        if bucket is None:
+            buckets[key] = [realized, 1]
+        else:
+            bucket[0] += realized
+            bucket[1] += 1
+
+    def _prune(self, day):
+        oldest = (day - timedelta(days=self.keep_days)).isoformat()
+        self.daily = {key: value for key, value in self.daily.items() if key > oldest}
+        oldest_week = week_key(day - timedelta(days=self.keep_days))
+        self.weekly = {key: value for key, value in self.weekly.items() if key >= oldest_week}
+
+    def summary(self, now=None):
+        """Winst/verlies van de dag en week van ``now`` en van de hele looptijd."""
+        day = (now or datetime.now()).date()
+        today = self.daily.get(day.isoformat(), [0.0, 0])
+        week = self.weekly.get(week_key(day), [0.0, 0])
+        return {
+            "day": day.isoformat(), "week": week_key(day),
+            "day_pnl": today[0], "day_trades": today[1],
+            "week_pnl": week[0], "week_trades": week[1],
+            "total_pnl": self.realized, "total_trades": self.trades,
+            "fees": self.fees,
+            "position": self.position,
+            "average_price": self.cost / self.position if self.position > EPSILON else None,
+        }
+
+    def format_summary(self, now=None):
+        """Eén samengevat rapportbericht voor de dag en week van ``now``."""
+        s = self.summary(now)
+        message = (f"Winst/verlies {s['day']}: {s['day_pnl']:.2f} EUR ({s['day_trades']} trades) | "
+                   f"week {s['week']}: {s['week_pnl']:.2f} EUR ({s['week_trades']}) | "
+                   f"totaal: {s['total_pnl']:.2f} EUR ({s['total_trades']})")
+        if s["position"]:
+            message += f" | open positie: {s['position']:.6f} @ {s['average_price']:.2f}"
+        return message
+
+    def state(self):
+        """JSON-serialiseerbare toestand voor een journaal-checkpoint."""
+        return {
+            "version": STATE_VERSION, "method": self.method,
+            "lots": list(self.lots), "position": self.position, "cost": self.cost,
+            "realized": self.realized, "fees": self.fees, "trades": self.trades,
+            "unmatched": self.unmatched, "daily": self.daily, "weekly": self.weekly,
+        }
+
+    def load_state(self, state):
+        """Herstel een checkpoint; False als het niet bij deze versie of methode past."""
+        if state.get("version") != STATE_VERSION or state.get("method") != self.method:
+            return False
+        self.lots = deque(state["lots"])
+        self.position = state["position"]
+        self.cost = state["cost"]
+        self.realized = state["realized"]
+        self.fees = state["fees"]
+        self.trades = state["trades"]
+        self.unmatched = state["unmatched"]
+        self.daily = state["daily"]
+        self.weekly = state["weekly"]
+        return True
@@ -0,0 +1,67 @@
+import time
+
+import numpy as np
+
+
+class PriceRing:
+    """Ringbuffer met vaste capaciteit voor prijzen en tijdstempels (float64).
+
+    Elke waarde wordt twee keer weggeschreven (op positie ``i`` en
+    ``i + capacity``), waardoor de laatste N waarden altijd aaneengesloten in
+    geheugen staan. ``values()`` en ``timestamps()`` geven daardoor
+    read-only NumPy views terug in chronologische volgorde, zonder kopie.
+    Een view blijft naar de buffer wijzen: na nieuwe ``append``-aanroepen
+    verandert de inhoud mee.
+    """
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("capacity moet minimaal 1 zijn")
+        self.capacity = capacity
+        self.total = 0  # Aantal ooit toegevoegde waarden
+        self._prices = np.zeros(2 * capacity, dtype=np.float64)
+        self._times = np.zeros(2 * capacity, dtype=np.float64)
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def is_full(self):
+        return self._count == self.capacity
+
+    def append(self, price, timestamp=None):
+        """Voeg een prijs toe; bij een volle buffer wordt de oudste overschreven."""
+        if timestamp is None:
+            timestamp = time.time()
+        i = self._next
+        self._prices[i] = self._prices[i + self.capacity] = price
+        self._times[i] = self._times[i + self.capacity] = timestamp
+        self._next = (i + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+        self.total += 1
+
+    def _window(self, buffer, n):
+        if n is None:
+            n = self._count
+        if n > self._count:
+            raise ValueError(f"Slechts {self._count} waarden beschikbaar, {n} gevraagd")
+        end = self._next + self.capacity
+        view = buffer[end - n:end]
+        view.flags.writeable = False
+        return view
+
+    def values(self, n=None):
+        """De laatste ``n`` prijzen (standaard alles), oudste eerst."""
+        return self._window(self._prices, n)
+
+    def timestamps(self, n=None):
+        """De tijdstempels bij ``values(n)``."""
+        return self._window(self._times, n)
+
+    def latest(self):
+        """De meest recente prijs, of None als de buffer leeg is."""
+        if self._count == 0:
+            return None
+        return float(self._prices[self._next + self.capacity - 1])
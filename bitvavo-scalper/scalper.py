@@ -1,12 +1,24 @@
-from python_bitvavo_api.bitvavo import Bitvavo
-from sklearn.linear_model import LinearRegression
-import requests
+import asyncio
 import json
-import numpy as np
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
-from decimal import Decimal
+from async_client import AsyncBitvavo, RateLimiter
+from bitvavo_client import BitvavoAPIError, BitvavoClient
+from checkpoint import Checkpointer, backfill
+from execution import AccountStream, OrderExecutor
+from hub_client import HubClient, HubStream
+from journal import Journal, atomic_write_json
+from metrics import BotMetrics
+from notifier import SlackNotifier
+from order_book import OrderBook
+from pnl import PnlTracker
+from regression import PredictionScore, RollingRegression
+from ringbuffer import PriceRing
+from scheduler import Scheduler
+from simulator import SimulatedExchange
+from tick_recorder import TickRecorder
+from ticker_stream import TickerStream
 
 #Meta info
 BOTNAME = "BAIBY"
@@ -14,7 +26,6 @@ version = "0.9"
 
 # Configuratiebestanden
 DATA_DIR = "data"
-os.makedirs(DATA_DIR, exist_ok=True)
 
 # Laad configuratie vanuit JSON-bestand
 def load_config(file_path):
@@ -30,230 +41,595 @@ def load_status(file_path):
         return {"last_action": None, "buy_price": None, "open_position": False}
 
 def save_status(file_path, status):
-    """Sla de huidige status van de bot op."""
-    with open(file_path, 'w') as f:
-        json.dump(status, f)
-
-def load_transactions(file_path):
-    """Laad transacties uit een bestand."""
-    try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return []
-
-def save_transactions(file_path, transactions):
-    """Sla transacties op in een bestand."""
-    with open(file_path, 'w') as f:
-        json.dump(transactions, f)
-
-# Configuratie laden uit config.json
-config = load_config('config.json')
-bitvavo = Bitvavo({
-    'APIKEY': config.get('API_KEY'),
-    'APISECRET': config.get('API_SECRET'),
-    'RESTURL': config.get('RESTURL', 'https://api.bitvavo.com/v2'),
-    'WSURL': config.get('WSURL', 'wss://ws.bitvavo.com/v2/'),
-    'ACCESSWINDOW': config.get('ACCESSWINDOW', 10000),
-    'DEBUGGING': config.get('DEBUGGING', False)
-})
-
-# Configuratie laden uit slack.json
-slack_config = load_config('slack.json')
-SLACK_WEBHOOK_URL = slack_config.get("SLACK_WEBHOOK_URL")
-print(f"Slack configuratie: {slack_config}")
-
-# Configuratie laden vanuit trader.json
-scalper_config = load_config('scalper.json')
-SYMBOL = scalper_config.get("SYMBOL")
-THRESHOLD_BUY = scalper_config.get("THRESHOLD_BUY")
-THRESHOLD_SELL = scalper_config.get("THRESHOLD_SELL")
-STOP_LOSS = scalper_config.get("STOP_LOSS")
-TRADE_AMOUNT = scalper_config.get("TRADE_AMOUNT")
-CHECK_INTERVAL = scalper_config.get("CHECK_INTERVAL")
-DEMO_MODE = scalper_config.get("DEMO_MODE")
-WINDOW_SIZE = scalper_config.get("WINDOW_SIZE", 10)
-TRADE_FEE_PERCENTAGE= scalper_config.get("TRADE_FEE_PERCENTAGE", 0.5)
-
-# Status en transacties laden/opslaan
-STATUS_FILE = os.path.join(DATA_DIR, f"status_{SYMBOL}.json")
-TRANSACTIONS_FILE = os.path.join(DATA_DIR, f"transactions_{SYMBOL}.log")
-
-# Status en transacties laden
-status = load_status(STATUS_FILE)
-transactions = load_transactions(TRANSACTIONS_FILE)
-price_history = []  # Historische prijzen
-start_time = datetime.now()  # Starttijd voor dagelijkse rapportage
+    """Sla de huidige status van de bot atomisch op."""
+    atomic_write_json(file_path, status)
+
+# Runtime-configuratie, gevuld door load_runtime() bij het starten van de bot.
+# Zo blijft de module importeerbaar voor offline gebruik (backtests).
+config = {}
+bitvavo = None
+market_data = None
+SLACK_WEBHOOK_URL = None
+notifier = None
+scalper_config = {}
+STREAMING = False
+STREAM_GAP_THRESHOLD = 30
+ORDER_STREAM = False
+RATE_LIMIT_PER_MINUTE = 600
+REST_WORKERS = 4
+METRICS_PORT = None
+# Lokaal orderboek voor spread- en dieptekosten in de winstcontrole
+ORDER_BOOK = False
+# Tick-recorder voor backtests met de prijzen die de bot echt zag (RECORD_DIR)
+recorder = None
+# Latency per stap, loop-lag, fouten, orders en positie; altijd bijgehouden, alleen geserveerd met METRICS_PORT
+metrics = BotMetrics("scalper")
+
+
+def load_runtime():
+    """Laad config.json, slack.json en scalper.json en maak de Bitvavo-client aan."""
+    global config, bitvavo, market_data, SLACK_WEBHOOK_URL, notifier, scalper_config
+    global STREAMING, STREAM_GAP_THRESHOLD, ORDER_STREAM, RATE_LIMIT_PER_MINUTE, REST_WORKERS, METRICS_PORT
+    global recorder, ORDER_BOOK
+
+    # Configuratie laden uit config.json
+    config = load_config('config.json')
+    bitvavo = BitvavoClient.from_config(config)
+    # Prijzen via de market-data hub als MARKET_HUB is ingesteld, anders rechtstreeks
+    market_data = HubClient.from_config(config, fallback=bitvavo) or bitvavo
+
+    # Configuratie laden uit slack.json
+    slack_config = load_config('slack.json')
+    SLACK_WEBHOOK_URL = slack_config.get("SLACK_WEBHOOK_URL")
+    notifier = SlackNotifier.from_config(slack_config)
+    print(f"Slack configuratie: {slack_config}")
+
+    # Configuratie laden vanuit scalper.json
+    scalper_config = load_config('scalper.json')
+    STREAMING = scalper_config.get("STREAMING", False)
+    STREAM_GAP_THRESHOLD = scalper_config.get("STREAM_GAP_THRESHOLD", 30)
+    ORDER_STREAM = scalper_config.get("ORDER_STREAM", False)
+    RATE_LIMIT_PER_MINUTE = scalper_config.get("RATE_LIMIT_PER_MINUTE", 600)
+    REST_WORKERS = scalper_config.get("REST_WORKERS", 4)
+    METRICS_PORT = scalper_config.get("METRICS_PORT")
+    ORDER_BOOK = scalper_config.get("ORDER_BOOK", False)
+    recorder = TickRecorder.from_config(scalper_config)
+
+
+def market_configs(scalper_config):
+    """Geef de configuratie per markt terug.
+
+    Met een ``MARKETS``-lijst in scalper.json draait één proces meerdere
+    markten; instellingen op het hoogste niveau gelden dan als standaard voor
+    elke markt. Zonder ``MARKETS`` is scalper.json zelf de enige markt.
+    """
+    markets = scalper_config.get("MARKETS")
+    if not markets:
+        return [scalper_config]
+    defaults = {key: value for key, value in scalper_config.items() if key != "MARKETS"}
+    return [{**defaults, **market} for market in markets]
 
     # Slack-bericht sturen
 def send_to_slack(message):
-    payload= {"text": message}
-    try:
-        requests.post(SLACK_WEBHOOK_URL, json=payload)
-    except Exception as e:
-        print(f"[FOUT] Kon bericht niet naar Slack sturen: {e}")
+    """Zet een bericht in de Slack-wachtrij; versturen gebeurt op de achtergrond."""
+    if notifier is not None:
+        notifier.notify(message)
 
 # Logfunctie
-def log_message(message):
-    if DEMO_MODE:
+def log_message(message, symbol, demo_mode):
+    if demo_mode:
         RUNSTATUS = "[DEMO]"
     else:
         RUNSTATUS = "[PROD]"
 
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    print(f"{RUNSTATUS}[SCALPER][{SYMBOL}][{timestamp}] {BOTNAME} {message}")
-    send_to_slack(f"{RUNSTATUS}[SCALPER][{SYMBOL}] {message}")
+    print(f"{RUNSTATUS}[SCALPER][{symbol}][{timestamp}] {BOTNAME} {message}")
+    send_to_slack(f"{RUNSTATUS}[SCALPER][{symbol}] {message}")
+
 
-def get_current_price(symbol):
+def predict_price(model, next_time):
+    """Voorspel de prijs voor de volgende iteratie."""
+    return model.predict(next_time)
+
+
+class MarketScalper:
+    """Status en handelslogica van de scalper voor één markt.
+
+    Met ``data_dir=None`` wordt niets naar schijf geschreven (backtests);
+    ``clock`` levert de tijdstempels voor transacties. Transacties gaan naar
+    een append-only journaal; in het geheugen staat alleen de lopende
+    winst/verlies-boekhouding (``PnlTracker``) voor de rapportage.
+    """
+
+    def __init__(self, market_config, data_dir=DATA_DIR, clock=time.time, verbose=True):
+        self.config = market_config
+        self.symbol = market_config.get("SYMBOL")
+        self.threshold_buy = market_config.get("THRESHOLD_BUY")
+        self.threshold_sell = market_config.get("THRESHOLD_SELL")
+        self.stop_loss = market_config.get("STOP_LOSS")
+        self.trade_amount = market_config.get("TRADE_AMOUNT")
+        self.check_interval = market_config.get("CHECK_INTERVAL")
+        self.demo_mode = market_config.get("DEMO_MODE")
+        self.window_size = market_config.get("WINDOW_SIZE", 10)
+        self.trade_fee_percentage = market_config.get("TRADE_FEE_PERCENTAGE", 0.5)
+        self.pnl_method = market_config.get("PNL_METHOD", "fifo")
+        # Geen nieuwe posities als het model de richting recent vaker mis dan goed heeft
+        self.min_direction_accuracy = market_config.get("MIN_DIRECTION_ACCURACY")
+        self.min_predictions = market_config.get("MIN_PREDICTIONS", 500)
+        # Warme herstart: prijsvenster periodiek naar schijf, gat na een herstart aanvullen met candles
+        self.checkpoint_interval = market_config.get("CHECKPOINT_INTERVAL", 60)
+        self.backfill_interval = market_config.get("BACKFILL_INTERVAL", "1m")
+        # Diepte van de REST-snapshot als het orderboek niet via de WebSocket bijgehouden wordt
+        self.book_depth = market_config.get("ORDER_BOOK_DEPTH", 50)
+
+        self.clock = clock
+        self.verbose = verbose
+
+        # Status en transactiejournaal laden/opslaan
+        if data_dir is not None:
+            os.makedirs(data_dir, exist_ok=True)
+            self.status_file = os.path.join(data_dir, f"status_{self.symbol}.json")
+            self.journal = Journal(os.path.join(data_dir, f"transactions_{self.symbol}.jsonl"))
+            self.journal.migrate_json_array(os.path.join(data_dir, f"transactions_{self.symbol}.log"))
+            self.status = load_status(self.status_file)
+            self.pnl = self.journal.restore(PnlTracker(self.pnl_method))
+            self.checkpointer = Checkpointer(os.path.join(data_dir, f"checkpoint_{self.symbol}.npz"),
+                                             self.checkpoint_state, self.checkpoint_interval)
+        else:
+            self.status_file = self.journal = self.checkpointer = None
+            self.status = {"last_action": None, "buy_price": None, "open_position": False}
+            self.pnl = PnlTracker(self.pnl_method)
+
+        self.price_history = PriceRing(self.window_size)  # Historische prijzen
+        self.model = RollingRegression(self.window_size)  # Incrementeel bijgewerkt regressiemodel
+        self.prediction_score = PredictionScore()  # Live fout en richting van de voorspellingen
+        self.book = None  # Lokaal ``OrderBook`` met ORDER_BOOK, anders alleen de fee als kosten
+        self.start_time = datetime.now()  # Starttijd voor dagelijkse rapportage
+
+    def log(self, message):
+        log_message(message, self.symbol, self.demo_mode)
+
+    def checkpoint_state(self):
+        """Prijsvenster en voorspeltellers voor een warm-restart-checkpoint; de positie staat in de status."""
+        return ({"prices": self.price_history.values(), "timestamps": self.price_history.timestamps()},
+                {"symbol": self.symbol, "score": self.prediction_score.state()})
+
+    def warm_up(self, prices, timestamps):
+        """Vul het prijsvenster en het model zonder handelsbeslissingen."""
+        for price, timestamp in zip(prices, timestamps):
+            self.price_history.append(price, timestamp)
+            self.model.update(price)
+
+    def warm_start(self, client, now=None):
+        """Herstel het prijsvenster uit het checkpoint en vul het gat daarna aan met candles.
+
+        Prijzen van langer dan WINDOW_SIZE × CHECK_INTERVAL geleden zouden
+        live ook al uit het venster zijn gevallen en worden overgeslagen.
+        """
+        now = self.clock() if now is None else now
+        since = now - self.window_size * self.check_interval
+        restored = filled = 0
+        if self.checkpointer is not None:
+            arrays, state = self.checkpointer.load()
+            if arrays is not None and state.get("symbol") == self.symbol:
+                self.prediction_score.load_state(state["score"])
+                recent = arrays["timestamps"] > since
+                self.warm_up(arrays["prices"][recent].tolist(), arrays["timestamps"][recent].tolist())
+                restored = int(recent.sum())
+                if restored:
+                    since = float(arrays["timestamps"][-1])
+        if self.backfill_interval:
+            try:
+                timestamps, closes = backfill(client, self.symbol, since, self.backfill_interval,
+                                              limit=self.window_size, now=now)
+                self.warm_up(closes.tolist(), timestamps.tolist())
+                filled = len(closes)
+            except (BitvavoAPIError, ValueError) as e:
+                self.log(f"[WARN] Candles voor het prijsvenster ophalen mislukt: {e}")
+        if restored or filled:
+            self.log(f"[INFO] Prijsvenster hersteld: {restored} prijzen uit het checkpoint, "
+                     f"{filled} {self.backfill_interval}-candles, {len(self.price_history)}/{self.window_size} gevuld.")
+        return restored, filled
+
+    def calculate_trade_cost(self, price, amount):
+        """Bereken de handelskosten."""
+        return (self.trade_fee_percentage / 100) * price * amount
+
+    def book_cost(self, amount):
+        """Spread- en dieptekosten van meteen kopen en weer verkopen volgens het orderboek.
+
+        Zonder (bijgewerkt) boek 0, zodat alleen de fee telt; is het boek
+        niet diep genoeg voor ``amount``, dan oneindig.
+        """
+        if self.book is None or not self.book.synced:
+            return 0.0
+        cost = self.book.round_trip_cost(amount)
+        return float("inf") if cost is None else cost
+
+    def position_amount(self):
+        """Hoeveelheid van de open positie (een oud statusbestand kent alleen TRADE_AMOUNT)."""
+        return self.status.get("amount") or self.trade_amount
+
+    def on_price(self, current_price):
+        """Verwerk een nieuwe prijs en bepaal of er gehandeld moet worden.
+
+        Geeft ``(side, message)`` terug als er een order geplaatst moet
+        worden, anders None. De status wordt pas aangepast in
+        ``apply_trade`` nadat de order is geplaatst.
+        """
+        self.price_history.append(current_price, self.clock())
+        self.model.update(current_price)
+
+        if len(self.price_history) < self.window_size:
+            self.prediction_score.observe(current_price)
+            if self.verbose:
+                print(f"[{self.symbol}] AI Verzamelt huidige prijs info: {current_price:.2f}")
+            return None
+
+        next_price = predict_price(self.model, len(self.price_history))
+        self.prediction_score.observe(current_price, next_price)
+        price_change = ((next_price - current_price) /
+                        current_price) * 100
+
+        # Minimale winst om break-even te draaien
+        trade_cost = self.calculate_trade_cost(current_price, self.trade_amount)
+        minimum_profit = 2 * trade_cost  # Kosten bij kopen en verkopen
+        if not self.status["open_position"]:
+            minimum_profit += self.book_cost(self.trade_amount)  # Plus spread en diepte bij instappen
+
+        if self.verbose:
+            print(
+                f"[{self.symbol}] Huidige prijs: {current_price:.2f} EUR | Voorspelde prijs: {next_price:.2f} EUR | Verandering: {price_change:.2f}% | "
+                f"Minimale winst vereist: {minimum_profit:.2f} EUR"
+            )
+
+        if not self.status["open_position"] and next_price > current_price + minimum_profit:
+            if not self.model_trusted():
+                if self.verbose:
+                    print(f"[{self.symbol}] Koopsignaal genegeerd: richting recent "
+                          f"{self.prediction_score.recent_direction_accuracy:.1%} goed, "
+                          f"minimaal {self.min_direction_accuracy:.1%} vereist")
+                return None
+            # Kooppositie openen
+            return 'buy', f":green_apple: Koopt {self.trade_amount} (verwachte winst > kosten)."
+
+        if self.status["open_position"]:
+            # Controleer winst of verlies
+            buy_price = self.status["buy_price"]
+            profit_loss = ((current_price - buy_price) / buy_price) * 100
+            if profit_loss > self.threshold_sell and current_price - buy_price > minimum_profit:
+                return 'sell', f":apple: Verkoopt {self.trade_amount} {self.symbol.split('-')[0]} (+{profit_loss:.2f}% winst)."
+            if profit_loss < self.stop_loss:
+                return 'sell', f":meat_on_bone: Verkoopt {self.trade_amount} {self.symbol.split('-')[0]} (stop-loss bereikt)."
+        return None
+
+    def model_trusted(self):
+        """False als het model na ``MIN_PREDICTIONS`` voorspellingen de richting te vaak mis heeft."""
+        score = self.prediction_score
+        if self.min_direction_accuracy is None or score.directional < self.min_predictions:
+            return True
+        return score.recent_direction_accuracy >= self.min_direction_accuracy
+
+    def apply_trade(self, side, price, amount=None, fee=None, order_id=None):
+        """Registreer een uitgevoerde order en werk de status bij.
+
+        Zonder ``amount`` geldt TRADE_AMOUNT (backtests); na een deels gevulde
+        verkoop blijft het restant als open positie staan.
+        """
+        amount = self.trade_amount if amount is None else amount
+        self.record_transaction(side, amount, price, fee, order_id)
+        if side == 'buy':
+            self.status.update(
+                {"last_action": "buy", "buy_price": price, "open_position": True, "amount": amount})
+        else:
+            remaining = self.position_amount() - amount
+            if remaining > 1e-12:
+                self.status.update({"last_action": "sell", "amount": remaining})
+            else:
+                self.status.update(
+                    {"last_action": "sell", "buy_price": None, "open_position": False, "amount": None})
+        if self.status_file is not None:
+            save_status(self.status_file, self.status)
+
+    def apply_execution(self, execution):
+        """Verwerk de fills van een order; een order zonder fills verandert niets."""
+        if execution.filled_amount <= 0:
+            return False
+        self.apply_trade(execution.side, execution.price, execution.filled_amount,
+                         execution.fee, execution.order_id)
+        return True
+
+    def record_transaction(self, side, amount, price, fee=None, order_id=None):
+        """Registreer een transactie met de werkelijke (of anders geschatte) fee."""
+        transaction = {
+            'side': side,
+            'amount': amount,
+            'price': price,
+            'fee': self.calculate_trade_cost(price, amount) if fee is None else fee,
+            'timestamp': self.clock()
+        }
+        if order_id is not None:
+            transaction['order_id'] = order_id
+        self.pnl.add(transaction)
+        if self.journal is not None:
+            self.journal.append(transaction)
+            self.journal.maybe_checkpoint(self.pnl)
+
+    def generate_daily_report(self, now=None):
+        """Genereer een rapportage van de dag, de week en de hele looptijd in één bericht."""
+        self.log(f"[INFO] {self.pnl.format_summary(now)}")
+        self.log(f"[INFO] {self.prediction_score.format_summary()}")
+        return self.pnl.summary(now)
+
+    def report_if_new_day(self):
+        """Controleer of een nieuwe dag is begonnen."""
+        if (datetime.now() - self.start_time).days >= 1:
+            # Rapporteer over de dag die net voorbij is
+            self.generate_daily_report(datetime.now() - timedelta(days=1))
+            if isinstance(bitvavo, (BitvavoClient, SimulatedExchange)):
+                print(f"[{self.symbol}] {bitvavo.format_metrics()}")
+            self.start_time = datetime.now()
+
+
+async def get_current_price(client, bot):
     """Haal de huidige prijs op."""
-    ticker = bitvavo.tickerPrice({'market': symbol})
+    with metrics.stage(bot.symbol, "price_fetch").time():
+        ticker = await client.ticker_price(bot.symbol)
     if 'price' not in ticker:
-        log_message(f"[ERROR] Kon de prijs niet ophalen voor {symbol}.")
-        raise ValueError(f"Kon de prijs niet ophalen voor {symbol}. Response: {ticker}")
+        raise ValueError(f"Kon de prijs niet ophalen voor {bot.symbol}. Response: {ticker}")
     return float(ticker['price'])
 
 
-def train_model(prices):
-    """Train een lineair regressiemodel."""
-    times = np.arange(len(prices)).reshape(-1, 1)
-    prices = np.array(prices).reshape(-1, 1)
-    model = LinearRegression()
-    model.fit(times, prices)
-    return model
-
+async def place_order(client, bot, executor, side, amount, price):
+    """Plaats een order (of simuleer hem in demo-modus) en geef de ``Execution`` terug.
 
-def predict_price(model, next_time):
-    """Voorspel de prijs voor de volgende iteratie."""
-    return model.predict([[next_time]])[0][0]
-
-
-def record_transaction(side, amount, price):
-    """Registreer een transactie."""
-    transaction = {
-        'side': side,
-        'amount': amount,
-        'price': price,
-        'timestamp': time.time()
-    }
-    transactions.append(transaction)
-    save_transactions(TRANSACTIONS_FILE, transactions)
-
-
-def generate_daily_report():
-    """Genereer een dagelijkse rapportage."""
-    total_profit_loss = 0
-    for txn in transactions:
-        if txn['side'] == 'sell':
-            buy_txn = next(
-                (t for t in transactions if t['side'] == 'buy' and t['timestamp'] < txn['timestamp']), None)
-            if buy_txn:
-                profit_loss = (txn['price'] - buy_txn['price']) * txn['amount']
-                total_profit_loss += profit_loss
-
-    log_message(f"[INFO] Dagelijkse winst/verlies: {total_profit_loss:.2f} EUR")
-    return total_profit_loss
-
-
-def place_order(symbol, side, amount, price):
-    """Plaats een order of toon een simulatie in demo-modus."""
-    if DEMO_MODE:
-        log_message(f"[DEMO] {side.capitalize()} {amount:.6f} {symbol.split('-')[0]} tegen {price:.2f} EUR.")
+    Bij een fout komt er None terug en blijft de status van de bot ongewijzigd.
+    """
+    if bot.demo_mode:
+        bot.log(f"[DEMO] {side.capitalize()} {amount:.6f} {bot.symbol.split('-')[0]} tegen {price:.2f} EUR.")
+    try:
+        with metrics.stage(bot.symbol, "order").time():
+            # Elke verkoop sluit een positie (stop-loss of winst) en gaat dus als exit-order
+            execution = await client.execute(executor, side, amount, price, exit=side == 'sell')
+    except BitvavoAPIError as e:
+        metrics.order(bot.symbol, side, None)
+        bot.log(f"[ERROR] Fout bij het plaatsen van de order: {e}")
+        return None
+    metrics.order(bot.symbol, side, execution)
+    if not executor.demo:
+        print(f"[INFO] Order {execution.order_id}: {execution.describe()}")
+        if not execution.fully_filled:
+            bot.log(f"[WARN] Order niet volledig gevuld: {execution.describe()}")
+    return execution
+
+
+def offer_latest(queue, price):
+    """Zet de nieuwste prijs in een wachtrij van één plek; een oudere prijs vervalt."""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(price)
+
+
+def start_order_books(bots):
+    """Geef elke markt een lokaal orderboek als ORDER_BOOK aan staat.
+
+    Met een eigen WebSocket (STREAMING zonder MARKET_HUB) houdt de stream de
+    boeken bij uit snapshot en delta's; anders haalt de handelslus elke
+    ronde een REST-snapshot op. Geeft de boeken terug die de stream bijhoudt.
+    """
+    if not ORDER_BOOK:
+        return {}
+    for bot in bots:
+        bot.book = OrderBook(bot.symbol)
+    if STREAMING and not config.get("MARKET_HUB"):
+        return {bot.symbol: bot.book for bot in bots}
+    print("[BOOK] Orderboek elke ronde via REST: alleen met een eigen WebSocket-stream komen de delta's live binnen.")
+    return {}
+
+
+def start_ticker_stream(bots, loop, books=None):
+    """Start één gedeelde WebSocket-prijsstroom voor alle markten als STREAMING aan staat.
+
+    Met MARKET_HUB komt de stroom van de hub in plaats van een eigen
+    WebSocket naar Bitvavo. Geeft de stream en per markt een wachtrij met de
+    laatste prijs terug. De stream houdt ook de orderboeken in ``books`` bij.
+    """
+    if not STREAMING:
+        return None, {}
+
+    queues = {bot.symbol: asyncio.Queue(maxsize=1) for bot in bots}
+
+    def on_price(market, price):
+        loop.call_soon_threadsafe(offer_latest, queues[market], price)
+
+    def on_gap(seconds):
+        for bot in bots:
+            bot.log(f"[WARN] Gat van {seconds:.0f}s in de WebSocket-stream, prijzen zijn tussentijds via REST opgehaald.")
+
+    if config.get("MARKET_HUB"):
+        stream = HubStream(config["MARKET_HUB"], list(queues), gap_threshold=STREAM_GAP_THRESHOLD,
+                           on_gap=on_gap, on_price=on_price).start()
     else:
+        stream = TickerStream(
+            config.get('WSURL', 'wss://ws.bitvavo.com/v2/'), list(queues),
+            gap_threshold=STREAM_GAP_THRESHOLD, on_gap=on_gap, on_price=on_price,
+            on_event=recorder.record_event if recorder is not None else None, books=books).start()
+    return stream, queues
+
+
+def start_simulator(bots):
+    """Handel tegen de gesimuleerde exchange als SIMULATOR in config.json staat.
+
+    Alleen als alle markten in DEMO_MODE draaien: prijzen en orders gaan dan
+    naar de simulator en nooit naar Bitvavo. Geeft de simulator terug, of None.
+    """
+    global bitvavo, market_data, STREAMING
+    simulator = SimulatedExchange.from_config(config)
+    if simulator is None:
+        return None
+    if not all(bot.demo_mode for bot in bots):
+        print("[SIM] SIMULATOR genegeerd: niet alle markten draaien in DEMO_MODE.")
+        return None
+    bitvavo = market_data = simulator
+    for bot in bots:
+        # Een open demo-positie uit een eerdere run krijgt zijn saldo in de simulator
+        base = bot.symbol.split("-")[0]
+        if bot.status["open_position"] and base not in simulator.balances:
+            simulator.balances[base] = bot.position_amount()
+    if STREAMING:
+        print("[SIM] STREAMING staat uit: prijzen komen van de simulator.")
+        STREAMING = False
+    print(f"[SIM] Handelen tegen de gesimuleerde exchange ({type(simulator.feed).__name__}).")
+    return simulator
+
+
+def start_metrics(bots):
+    """Koppel positie, REST-client en Slack aan de metrics en start het endpoint (METRICS_PORT)."""
+    for bot in bots:
+        metrics.watch_pnl(bot.symbol, bot.pnl)
+        metrics.watch_predictions(bot.symbol, bot.prediction_score)
+    if isinstance(bitvavo, BitvavoClient):
+        metrics.watch_client(bitvavo)
+    metrics.watch_notifier(notifier)
+    return metrics.serve(METRICS_PORT)
+
+
+def start_account_stream(bots):
+    """Start de WebSocket voor order- en fill-events als ORDER_STREAM aan staat en er echt gehandeld wordt."""
+    markets = [bot.symbol for bot in bots if not bot.demo_mode]
+    if not ORDER_STREAM or not markets:
+        return None
+    return AccountStream.from_config(config, markets).start()
+
+
+async def fetch_price(client, bot, queue):
+    """Wacht op de volgende streamprijs, val terug op REST als de stream stil is."""
+    if queue is not None:
         try:
-            order = bitvavo.placeOrder(symbol, side, 'market', {'amount': str(amount)})
-            print(f"[INFO] Order geplaatst: {order}")
-        except Exception as e:
-            log_message(f"[ERROR] Fout bij het plaatsen van de order: {e}")
+            return await asyncio.wait_for(queue.get(), timeout=bot.check_interval)
+        except asyncio.TimeoutError:
+            pass
+    return await get_current_price(client, bot)
 
-def calculate_trade_cost(price, amount):
-    """Bereken de handelskosten."""
-    return (TRADE_FEE_PERCENTAGE / 100) * price * amount
 
-
-def trading_bot():
-    """Scalping bot met AI-predictie, handelskosten en winstvalidatie."""
-    global status, start_time
+async def refresh_book(client, bot):
+    """Vervang het orderboek door een REST-snapshot; bij een fout telt het boek niet mee."""
+    try:
+        with metrics.stage(bot.symbol, "book").time():
+            bot.book.load_snapshot(await client.book(bot.symbol, {"depth": bot.book_depth}))
+    except (BitvavoAPIError, KeyError, ValueError) as e:
+        metrics.errors.labels(bot.symbol, "book").inc()
+        bot.book.reset()
+        print(f"[{bot.symbol}] Orderboek ophalen mislukt: {e}")
+
+
+async def trade_market(client, bot, executor, queue, rest_book=False):
+    """Scalping-taak met AI-predictie, handelskosten en winstvalidatie voor één markt."""
+    failures = 0
+    model_timer = metrics.stage(bot.symbol, "model")
+    journal_timer = metrics.stage(bot.symbol, "journal")
+    # Bij pollen vaste deadlines (eventueel op candle-grenzen); in streaming-modus bepaalt de stream het tempo
+    scheduler = Scheduler.from_config(bot.config) if queue is None else None
+    if scheduler is not None:
+        metrics.watch_scheduler(bot.symbol, scheduler)
     try:
         while True:
-            current_price = get_current_price(SYMBOL)
-            price_history.append(current_price)
-
-            # Behoud alleen de laatste WINDOW_SIZE prijzen
-            if len(price_history) > WINDOW_SIZE:
-                price_history.pop(0)
-
-            if len(price_history) < WINDOW_SIZE:
-                print(f"AI Verzamelt huidige prijs info: {current_price:.2f}")
-
-            # Alleen trainen als we genoeg data hebben
-            if len(price_history) == WINDOW_SIZE:
-                model = train_model(price_history)
-                next_price = predict_price(model, len(price_history))
-                price_change = ((next_price - current_price) /
-                                current_price) * 100
-
-                # Minimale winst om break-even te draaien
-                trade_cost = calculate_trade_cost(current_price, TRADE_AMOUNT)
-                minimum_profit = 2 * trade_cost  # Kosten bij kopen en verkopen
-
-                print(
-                    f"Huidige prijs: {current_price:.2f} EUR | Voorspelde prijs: {next_price:.2f} EUR | Verandering: {price_change:.2f}% | "
-                    f"Minimale winst vereist: {minimum_profit:.2f} EUR"
-                )
-
-                if not status["open_position"] and next_price > current_price + minimum_profit:
-                    # Kooppositie openen
-                    log_message(
-                        f":green_apple: Koopt {TRADE_AMOUNT} (verwachte winst > kosten).")
-                    place_order(SYMBOL, 'buy', TRADE_AMOUNT, current_price)
-                    record_transaction('buy', TRADE_AMOUNT, current_price)
-                    status.update(
-                        {"last_action": "buy", "buy_price": current_price, "open_position": True})
-                    save_status(STATUS_FILE, status)
-
-                elif status["open_position"]:
-                    # Controleer winst of verlies
-                    profit_loss = (
-                        (current_price - status["buy_price"]) / status["buy_price"]) * 100
-                    if profit_loss > THRESHOLD_SELL and current_price - status["buy_price"] > minimum_profit:
-                        log_message(
-                            f":apple: Verkoopt {TRADE_AMOUNT} BTC (+{profit_loss:.2f}% winst).")
-                        place_order(SYMBOL, 'sell',
-                                    TRADE_AMOUNT, current_price)
-                        record_transaction('sell', TRADE_AMOUNT, current_price)
-                        status.update(
-                            {"last_action": "sell", "buy_price": None, "open_position": False})
-                        save_status(STATUS_FILE, status)
-
-                    elif profit_loss < STOP_LOSS:
-                        log_message(
-                            f":meat_on_bone: Verkoopt {TRADE_AMOUNT} BTC (stop-loss bereikt).")
-                        place_order(SYMBOL, 'sell',
-                                    TRADE_AMOUNT, current_price)
-                        record_transaction('sell', TRADE_AMOUNT, current_price)
-                        status.update(
-                            {"last_action": "sell", "buy_price": None, "open_position": False})
-                        save_status(STATUS_FILE, status)
-
-            # Controleer of een nieuwe dag is begonnen
-            if (datetime.now() - start_time).days >= 1:
-                generate_daily_report()
-                start_time = datetime.now()
-
-            time.sleep(CHECK_INTERVAL)
-
-    except KeyboardInterrupt:
-        log_message("[INFO] Trading bot gestopt door gebruiker.")
-        generate_daily_report()
+            if scheduler is None:
+                metrics.tick(bot.symbol)
+            else:
+                metrics.tick(bot.symbol, lag=await scheduler.wait_async())
+            try:
+                current_price = await fetch_price(client, bot, queue)
+            except (BitvavoAPIError, ValueError) as e:
+                # Eén mislukte prijs stopt de markt niet; alleen de eerste en elke tiende fout naar Slack
+                metrics.errors.labels(bot.symbol, "price_fetch").inc()
+                failures += 1
+                if failures == 1 or failures % 10 == 0:
+                    bot.log(f"[WARN] Prijs ophalen mislukt ({failures}x achter elkaar): {e}")
+                if scheduler is None:
+                    await asyncio.sleep(bot.check_interval)
+                continue
+            failures = 0
+            if recorder is not None:
+                recorder.ticker(bot.symbol, current_price)
+            if rest_book:
+                await refresh_book(client, bot)
+
+            with model_timer.time():
+                signal = bot.on_price(current_price)
+            if signal is not None:
+                side, message = signal
+                bot.log(message)
+                amount = bot.trade_amount if side == 'buy' else bot.position_amount()
+                execution = await place_order(client, bot, executor, side, amount, current_price)
+                if execution is not None:
+                    with journal_timer.time():
+                        bot.apply_execution(execution)
+
+            bot.report_if_new_day()
+            if bot.checkpointer is not None:
+                bot.checkpointer.maybe_save()
+
+    except asyncio.CancelledError:
+        raise
     except Exception as e:
-        log_message(f"Fout: {e}")
+        metrics.errors.labels(bot.symbol, "loop").inc()
+        bot.log(f"Fout: {e}")
+    finally:
+        if scheduler is not None:
+            print(f"[{bot.symbol}] {scheduler.format_stats()}")
+
+
+async def trading_bot(bots):
+    """Draai alle markten als asyncio-taken met één gedeelde, rate-limited REST-client."""
+    loop = asyncio.get_running_loop()
+    # Eén orderthread per markt: elke markt heeft hoogstens één order tegelijk open
+    client = AsyncBitvavo(bitvavo, RateLimiter(RATE_LIMIT_PER_MINUTE), max_workers=REST_WORKERS,
+                          market_data=market_data, order_workers=len(bots))
+    books = start_order_books(bots)
+    stream, queues = start_ticker_stream(bots, loop, books)
+    account_stream = start_account_stream(bots)
+    executors = {bot.symbol: OrderExecutor.from_config(
+        client.orders, bot.symbol, bot.config, stream=account_stream, fee_percentage=bot.trade_fee_percentage)
+        for bot in bots}
+    try:
+        await asyncio.gather(*(trade_market(client, bot, executors[bot.symbol], queues.get(bot.symbol),
+                                            rest_book=bot.book is not None and bot.symbol not in books)
+                               for bot in bots))
+    finally:
+        if stream is not None:
+            stream.stop()
+        if account_stream is not None:
+            account_stream.stop()
+        client.close()
 
 
 # Start de bot
 if __name__ == "__main__":
-    log_message(f"[INFO] Scalping bot {version} gestart")
-    log_message(f"Configuratie: {scalper_config}")
-    if status["open_position"]:
-        open_buy_price = status["buy_price"]
-        print(f"Reeds openstaande positie voor {SYMBOL} gekocht voor {open_buy_price}")
-    trading_bot()
+    load_runtime()
+    bots = [MarketScalper(market_config) for market_config in market_configs(scalper_config)]
+    for bot in bots:
+        bot.log(f"[INFO] Scalping bot {version} gestart")
+        bot.log(f"Configuratie: {bot.config}")
+        if bot.status["open_position"]:
+            open_buy_price = bot.status["buy_price"]
+            print(f"Reeds openstaande positie voor {bot.symbol} gekocht voor {open_buy_price}")
+    start_simulator(bots)
+    for bot in bots:
+        bot.warm_start(market_data)
+    start_metrics(bots)
+    try:
+        asyncio.run(trading_bot(bots))
+    except KeyboardInterrupt:
+        for bot in bots:
+            bot.log("[INFO] Trading bot gestopt door gebruiker.")
+            bot.generate_daily_report()
+    finally:
+        for bot in bots:
+            if bot.journal is not None:
+                bot.journal.save_checkpoint(bot.pnl)
+            if bot.checkpointer is not None:
+                bot.checkpointer.save()
+        if recorder is not None:
+            recorder.close()
+        notifier.close()
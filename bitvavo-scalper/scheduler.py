@@ -0,0 +1,103 @@
+"""Periodieke handelslus op vaste deadlines van een monotone klok.
+
+``time.sleep(interval)`` na het werk verschuift elke volgende ronde met de
+duur van het ophalen, rekenen en handelen. ``Scheduler`` rekent met
+absolute deadlines (vorige deadline + interval) op ``time.monotonic``, dus
+een ronde van 300 ms verschuift de volgende niet en een klokcorrectie van
+NTP laat de lus niet haperen. Met ``align=True`` liggen de deadlines na de
+eerste ronde op veelvouden van het interval in wall-clock-tijd, plus
+``offset`` seconden: op het sluiten van de candles, bijvoorbeeld elke
+minuut op :00 bij 60 s of om middernacht UTC bij 86400 s.
+
+Is een deadline al voorbij, dan begint de ronde meteen. Zijn er hele
+intervallen gemist (een trage API, een gepauzeerde container), dan worden
+die overgeslagen en geteld in ``missed`` in plaats van achter elkaar
+ingehaald. ``wait`` geeft de lag terug, hoeveel later dan de deadline de
+ronde begon; de bots sturen die naar ``bot_loop_lag_seconds``.
+"""
+import asyncio
+import math
+import time
+
+
+class Scheduler:
+    """Vuurt elke ``interval`` seconden op een absolute deadline; zie de moduledocumentatie."""
+
+    def __init__(self, interval, align=False, offset=0.0, clock=time.monotonic, wall=time.time, sleep=time.sleep):
+        if interval < 0:
+            raise ValueError("interval mag niet negatief zijn")
+        self.interval = float(interval)
+        self.align = bool(align) and self.interval > 0
+        self.offset = float(offset)
+        self.clock = clock
+        self.wall = wall
+        self.sleep = sleep
+        self.ticks = 0
+        self.missed = 0
+        self.lag = 0.0  # Lag van de laatste ronde
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self._deadline = None  # Volgende deadline op de monotone klok
+
+    @classmethod
+    def from_config(cls, bot_config, interval=None):
+        """Scheduler met CHECK_INTERVAL, ALIGN_INTERVAL (true/false) en ALIGN_OFFSET uit de botconfiguratie."""
+        return cls(bot_config["CHECK_INTERVAL"] if interval is None else interval,
+                   align=bot_config.get("ALIGN_INTERVAL", False), offset=bot_config.get("ALIGN_OFFSET", 0.0))
+
+    def _next_deadline(self, deadline):
+        if not self.align:
+            return deadline + self.interval
+        # Het raster ligt in wall-clock-tijd; het verschil met de monotone klok wordt elke keer opnieuw bepaald
+        shift = self.wall() - self.clock()
+        slot = math.floor((deadline + shift - self.offset) / self.interval) + 1
+        return slot * self.interval + self.offset - shift
+
+    def delay(self):
+        """Seconden tot de volgende deadline (0 als die voorbij is); gemiste intervallen worden overgeslagen."""
+        now = self.clock()
+        if self._deadline is None or not self.interval:
+            self._deadline = now  # De eerste ronde, of zonder interval elke ronde, begint meteen
+        elif now - self._deadline >= self.interval:
+            skipped = int((now - self._deadline) // self.interval)
+            self.missed += skipped
+            self._deadline += skipped * self.interval
+        return max(0.0, self._deadline - now)
+
+    def _fire(self):
+        lag = max(0.0, self.clock() - self._deadline)
+        self.ticks += 1
+        self.lag = lag
+        self.total_lag += lag
+        if lag > self.max_lag:
+            self.max_lag = lag
+        self._deadline = self._next_deadline(self._deadline)
+        return lag
+
+    def wait(self):
+        """Slaap tot de volgende deadline en geef de lag in seconden terug."""
+        delay = self.delay()
+        if delay > 0:
+            self.sleep(delay)
+        return self._fire()
+
+    async def wait_async(self):
+        """Als ``wait``, maar zonder de event loop te blokkeren."""
+        delay = self.delay()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return self._fire()
+
+    def stats(self):
+        return {
+            "ticks": self.ticks,
+            "missed": self.missed,
+            "last_lag": self.lag,
+            "mean_lag": self.total_lag / self.ticks if self.ticks else 0.0,
+            "max_lag": self.max_lag,
+        }
+
+    def format_stats(self):
+        stats = self.stats()
+        return (f"Scheduler: {stats['ticks']} rondes, {stats['missed']} overgeslagen, lag gemiddeld "
+                f"{stats['mean_lag'] * 1000:.1f} ms, max {stats['max_lag'] * 1000:.1f} ms")
@@ -0,0 +1,726 @@
+"""Gesimuleerde exchange voor DEMO_MODE en soak-tests.
+
+``SimulatedExchange`` heeft dezelfde methodes als ``BitvavoClient`` die de
+bots en ``OrderExecutor`` gebruiken (``tickerPrice``, ``book``, ``candles``,
+``placeOrder``, ``getOrder``, ``cancelOrder``, ``balance``) en antwoordt in
+hetzelfde formaat. Orders worden gematcht tegen het orderboek van een feed:
+
+* ``SyntheticFeed``: een random walk met spread en diepte, volledig bepaald
+  door de seed;
+* ``ReplayFeed``: opgenomen boeken of prijzen uit een JSONL-bestand;
+* ``LiveFeed``: het echte orderboek via ``BitvavoClient.book`` (paper trading).
+
+Een marketorder loopt het boek af en wordt deels gevuld als de diepte op
+is. Een limietorder die niet direct matcht blijft staan en wordt gevuld
+zodra het boek zijn prijs passeert. Een post-only-order die zou matchen
+wordt geannuleerd. Taker- en makerfees, saldi, een latency-model (de markt
+beweegt terwijl de order onderweg is) en een slippage-model maken de
+demo-resultaten vergelijkbaar met echt handelen. Gereserveerde saldi voor
+open orders worden niet bijgehouden; het saldo wordt bij plaatsen en bij
+elke fill gecontroleerd.
+
+De markt loopt op een eigen klok. Met ``realtime`` volgt die de wandklok:
+bij elke aanroep worden de ticks sinds de vorige aanroep ingehaald. Zonder
+``realtime`` is elke prijsopvraging één tick en schuift ``sleep`` van de
+executor de klok op zonder echt te wachten. Met dezelfde seed en dezelfde
+reeks aanroepen verloopt een simulatie dan exact hetzelfde, en haalt een
+soak-test duizenden ticks per seconde.
+
+Snelle meting:
+    python simulator.py bench --ticks 100000
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+
+from bitvavo_client import BitvavoAPIError
+from execution import DUST, format_number, round_price
+
+# Bitvavo-foutcodes die de simulator teruggeeft
+ERROR_INVALID_PARAMETER = 205
+ERROR_INSUFFICIENT_BALANCE = 216
+ERROR_ORDER_NOT_FOUND = 240
+# Candle-intervallen in milliseconden, zoals Bitvavo ze ondersteunt
+INTERVALS = {
+    "1m": 60_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000,
+    "8h": 28_800_000, "12h": 43_200_000, "1d": 86_400_000,
+}
+MINUTE = 60_000
+# Maximaal aantal candles per antwoord, zoals bij Bitvavo
+MAX_CANDLES = 1440
+# Langere achterstanden (realtime na een lange slaap) worden in één sprong ingehaald
+MAX_CATCH_UP_TICKS = 10_000
+
+
+def synthetic_book(mid, rng, spread_bps, depth, level_bps, level_size):
+    """Boek rond ``mid``: (bids, asks) als lijsten [prijs, hoeveelheid], beste prijs eerst."""
+    half = mid * spread_bps / 20_000
+    step = mid * level_bps / 10_000
+    bids = []
+    asks = []
+    for i in range(depth):
+        size = level_size * (1.0 + 0.5 * i)
+        bids.append([mid - half - i * step, size * rng.uniform(0.5, 1.5)])
+        asks.append([mid + half + i * step, size * rng.uniform(0.5, 1.5)])
+    return bids, asks
+
+
+class SyntheticFeed:
+    """Random walk (geometrisch) per markt met een boek van ``depth`` niveaus per kant.
+
+    ``volatility`` is de volatiliteit per dag; per tick van ``tick_interval``
+    seconden is dat ``volatility * sqrt(tick_interval / 86400)``, zodat het
+    koersverloop niet van de tickfrequentie afhangt. Onbekende markten
+    beginnen op ``default_price``. Prijspad en boek hebben
+    elk een eigen random-generator per markt, afgeleid van ``seed``, zodat
+    het prijspad niet afhangt van hoe vaak er een boek wordt opgevraagd.
+    """
+
+    def __init__(self, prices=None, seed=42, volatility=0.03, tick_interval=1.0, spread_bps=5.0, depth=10,
+                 level_bps=2.0, level_size=1.0, default_price=100.0):
+        self.prices = dict(prices or {})
+        self.seed = seed
+        self.volatility = volatility
+        self.tick_volatility = volatility * math.sqrt(tick_interval / 86_400)
+        self.spread_bps = spread_bps
+        self.depth = depth
+        self.level_bps = level_bps
+        self.level_size = level_size
+        self.default_price = default_price
+        self._price_rng = {}
+        self._book_rng = {}
+
+    def start(self, market):
+        """(tijdstempel of None, startprijs) van een markt."""
+        self._price_rng[market] = random.Random(f"{self.seed}:price:{market}")
+        self._book_rng[market] = random.Random(f"{self.seed}:book:{market}")
+        return None, float(self.prices.get(market, self.default_price))
+
+    def step(self, market, mid, ticks=1):
+        """(tijdstempel of None, nieuwe mid, volume) na ``ticks`` ticks."""
+        volatility = self.tick_volatility * math.sqrt(ticks)
+        ret = volatility * self._price_rng[market].gauss(0.0, 1.0)
+        volume = self.level_size * ticks * (1.0 + (abs(ret) / volatility if volatility else 0.0))
+        return None, mid * math.exp(ret), volume
+
+    def book(self, market, mid):
+        return synthetic_book(mid, self._book_rng[market], self.spread_bps, self.depth,
+                              self.level_bps, self.level_size)
+
+
+class ReplayFeed(SyntheticFeed):
+    """Opgenomen orderboeken of prijzen uit een JSONL-bestand, per markt in volgorde.
+
+    Elke regel is ``{"market", "timestamp", "bids": [[prijs, hoeveelheid], ...], "asks": [...]}``
+    of alleen ``{"market", "timestamp", "price"}`` (optioneel met ``volume``);
+    rond een losse prijs wordt een boek gezet zoals bij ``SyntheticFeed``.
+    Aan het eind van de opname begint hij opnieuw als ``loop`` aan staat en
+    blijft anders de laatste stand staan.
+    """
+
+    def __init__(self, path, loop=False, **book_options):
+        super().__init__(**book_options)
+        self.path = path
+        self.loop = loop
+        self.records = {}
+        with open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self.records.setdefault(record["market"], []).append(record)
+        self._position = {}
+
+    def start(self, market):
+        if market not in self.records:
+            raise BitvavoAPIError(f"Markt {market} niet in {self.path}", error_code=ERROR_INVALID_PARAMETER)
+        super().start(market)
+        self._position[market] = 0
+        record = self.records[market][0]
+        return record.get("timestamp"), self._mid(record)
+
+    @staticmethod
+    def _mid(record):
+        if "price" in record:
+            return float(record["price"])
+        return (float(record["bids"][0][0]) + float(record["asks"][0][0])) / 2
+
+    def step(self, market, mid, ticks=1):
+        records = self.records[market]
+        position = self._position[market] + ticks
+        if position >= len(records):
+            position = position % len(records) if self.loop else len(records) - 1
+        self._position[market] = position
+        record = records[position]
+        return record.get("timestamp"), self._mid(record), float(record.get("volume", 0.0))
+
+    def book(self, market, mid):
+        record = self.records[market][self._position[market]]
+        if "bids" not in record:
+            return super().book(market, mid)
+        return ([[float(p), float(a)] for p, a in record["bids"]],
+                [[float(p), float(a)] for p, a in record["asks"]])
+
+
+class LiveFeed:
+    """Het echte orderboek van Bitvavo: elke tick één ``book``-request (paper trading)."""
+
+    def __init__(self, client, depth=25):
+        self.client = client
+        self.depth = depth
+        self._books = {}
+
+    def start(self, market):
+        return self.step(market, None)[:2]
+
+    def step(self, market, mid, ticks=1):
+        book = self.client.book(market, {"depth": self.depth})
+        bids = [[float(p), float(a)] for p, a in book.get("bids", [])]
+        asks = [[float(p), float(a)] for p, a in book.get("asks", [])]
+        if not bids or not asks:
+            raise BitvavoAPIError(f"Leeg orderboek voor {market}", error_code=ERROR_INVALID_PARAMETER)
+        self._books[market] = (bids, asks)
+        return int(time.time() * 1000), (bids[0][0] + asks[0][0]) / 2, 0.0
+
+    def book(self, market, mid):
+        bids, asks = self._books[market]
+        return [list(level) for level in bids], [list(level) for level in asks]
+
+
+class LatencyModel:
+    """Tijd tussen versturen en aankomst van een order: vast deel plus exponentiële staart."""
+
+    def __init__(self, base_ms=50.0, jitter_ms=20.0, seed=42):
+        self.base = base_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.rng = random.Random(f"{seed}:latency")
+
+    def sample(self):
+        """Latency in seconden."""
+        if self.jitter <= 0:
+            return self.base
+        return self.base + self.rng.expovariate(1.0 / self.jitter)
+
+
+class SlippageModel:
+    """Extra prijsverslechtering op takerfills bovenop het aflopen van het boek, in basispunten."""
+
+    def __init__(self, fixed_bps=0.0, jitter_bps=0.0, seed=42):
+        self.fixed_bps = fixed_bps
+        self.jitter_bps = jitter_bps
+        self.rng = random.Random(f"{seed}:slippage")
+
+    def apply(self, side, price):
+        bps = self.fixed_bps
+        if self.jitter_bps:
+            bps += abs(self.rng.gauss(0.0, self.jitter_bps))
+        factor = bps / 10_000
+        return price * (1 + factor) if side == "buy" else price * (1 - factor)
+
+
+class _Market:
+    """Stand van één gesimuleerde markt."""
+
+    __slots__ = ("name", "base", "quote", "time", "start_time", "mid", "book", "orders", "minutes",
+                 "updated", "ticks")
+
+    def __init__(self, name, timestamp, mid, updated):
+        self.name = name
+        self.base, self.quote = name.split("-")
+        self.time = timestamp
+        self.start_time = timestamp
+        self.mid = mid
+        self.book = None  # (bids, asks) van de huidige tick, pas opgebouwd als het nodig is
+        self.orders = []  # Openstaande limietorders
+        self.minutes = {}  # minuut -> [open, high, low, close, volume]
+        self.updated = updated  # Wandklok van de laatste stap (realtime)
+        self.ticks = 0
+
+
+class SimulatedExchange:
+    """Lokale exchange met orderboek, fees, saldi, latency en slippage; zie de moduledocumentatie."""
+
+    simulated = True
+
+    def __init__(self, feed, tick_interval=1.0, realtime=False, latency=None, slippage=None,
+                 maker_fee=0.15, taker_fee=0.25, balances=None, seed=42, start_time=None):
+        self.feed = feed
+        self.tick_interval = tick_interval
+        self.tick_ms = max(1, int(tick_interval * 1000))
+        self.realtime = realtime
+        self.latency = latency or LatencyModel(seed=seed)
+        self.slippage = slippage or SlippageModel(seed=seed)
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.balances = {"EUR": 10_000.0} if balances is None else {k: float(v) for k, v in balances.items()}
+        self.seed = seed
+        self.start_time = int((time.time() if start_time is None else start_time) * 1000)
+        self.rng = random.Random(f"{seed}:ticks")
+
+        self.markets = {}
+        self.orders = {}
+        self.requests = 0
+        self.order_count = 0
+        self.fill_count = 0
+        self.fees_paid = 0.0
+        self._backfill = {}  # (markt, interval) -> slotkoersen vóór de start, nieuw naar oud
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Een simulator als config.json een ``SIMULATOR``-blok heeft, anders None."""
+        sim = config.get("SIMULATOR")
+        if not sim:
+            return None
+        seed = sim.get("SEED", 42)
+        source = sim.get("SOURCE", "synthetic")
+        book_options = dict(
+            seed=seed, volatility=sim.get("VOLATILITY", 0.03), tick_interval=sim.get("TICK_INTERVAL", 1.0),
+            spread_bps=sim.get("SPREAD_BPS", 5.0),
+            depth=sim.get("DEPTH", 10), level_bps=sim.get("LEVEL_BPS", 2.0), level_size=sim.get("LEVEL_SIZE", 1.0),
+            prices=sim.get("PRICES"), default_price=sim.get("DEFAULT_PRICE", 100.0))
+        if source == "synthetic":
+            feed = SyntheticFeed(**book_options)
+        elif source == "replay":
+            feed = ReplayFeed(sim["REPLAY_FILE"], loop=sim.get("LOOP", False), **book_options)
+        elif source == "live":
+            from bitvavo_client import BitvavoClient
+
+            feed = LiveFeed(BitvavoClient.from_config(config), depth=sim.get("DEPTH", 25))
+        else:
+            raise ValueError(f"Onbekende SIMULATOR-bron: {source}")
+        return cls(
+            feed,
+            tick_interval=sim.get("TICK_INTERVAL", 1.0),
+            realtime=sim.get("REALTIME", source == "live"),
+            latency=LatencyModel(sim.get("LATENCY_MS", 50.0), sim.get("LATENCY_JITTER_MS", 20.0), seed),
+            slippage=SlippageModel(sim.get("SLIPPAGE_BPS", 0.0), sim.get("SLIPPAGE_JITTER_BPS", 0.0), seed),
+            maker_fee=sim.get("MAKER_FEE", 0.15),
+            taker_fee=sim.get("TAKER_FEE", 0.25),
+            balances=sim.get("BALANCES"),
+            seed=seed,
+        )
+
+    # Klok
+
+    def clock_for(self, market):
+        """Klok (seconden) voor ``OrderExecutor``: de wandklok of de virtuele tijd van de markt."""
+        if self.realtime:
+            return time.time
+        return lambda: self._market(market).time / 1000
+
+    def sleep_for(self, market):
+        """Wachtfunctie voor ``OrderExecutor``: echt wachten of de markt virtueel opschuiven."""
+        if self.realtime:
+            return time.sleep
+
+        def sleep(seconds):
+            with self._lock:
+                self._advance(self._market(market), self._ticks(seconds))
+        return sleep
+
+    def executor_options(self, market):
+        return {"clock": self.clock_for(market), "sleep": self.sleep_for(market)}
+
+    def _ticks(self, seconds):
+        """Aantal ticks in ``seconds``; een restant telt met die kans als extra tick."""
+        ticks = seconds / self.tick_interval
+        whole = int(ticks)
+        return whole + (self.rng.random() < ticks - whole)
+
+    def _market(self, market):
+        state = self.markets.get(market)
+        if state is None:
+            if not isinstance(market, str) or market.count("-") != 1:
+                raise BitvavoAPIError(f"Ongeldige markt: {market}", error_code=ERROR_INVALID_PARAMETER)
+            timestamp, mid = self.feed.start(market)
+            state = self.markets[market] = _Market(
+                market, self.start_time if timestamp is None else int(timestamp), mid, time.monotonic())
+            self._record(state, 0.0)
+        return state
+
+    def _catch_up(self, state):
+        """Realtime: de ticks sinds de vorige stap inhalen; anders één tick per opvraging."""
+        if not self.realtime:
+            self._advance(state, 1)
+            return
+        now = time.monotonic()
+        ticks = int((now - state.updated) / self.tick_interval)
+        if ticks > 0 or isinstance(self.feed, LiveFeed):
+            state.updated = now
+            self._advance(state, max(ticks, 1))
+
+    def _advance(self, state, ticks):
+        """Schuif de markt ``ticks`` ticks op en match openstaande orders tegen elk nieuw boek."""
+        if ticks <= 0:
+            return
+        if ticks > MAX_CATCH_UP_TICKS and not isinstance(self.feed, LiveFeed):
+            self._step(state, ticks - MAX_CATCH_UP_TICKS)
+            ticks = MAX_CATCH_UP_TICKS
+        for _ in range(ticks):
+            self._step(state, 1)
+
+    def _step(self, state, ticks):
+        timestamp, state.mid, volume = self.feed.step(state.name, state.mid, ticks)
+        state.time = int(timestamp) if timestamp is not None else state.time + ticks * self.tick_ms
+        state.book = None
+        state.ticks += ticks
+        self._record(state, volume)
+        if state.orders:
+            self._match_resting(state)
+
+    def _record(self, state, volume):
+        minute = state.time - state.time % MINUTE
+        candle = state.minutes.get(minute)
+        mid = state.mid
+        if candle is None:
+            state.minutes[minute] = [mid, mid, mid, mid, volume]
+        else:
+            if mid > candle[1]:
+                candle[1] = mid
+            elif mid < candle[2]:
+                candle[2] = mid
+            candle[3] = mid
+            candle[4] += volume
+
+    def _book(self, state):
+        if state.book is None:
+            state.book = self.feed.book(state.name, state.mid)
+        return state.book
+
+    # Publieke endpoints
+
+    def time(self):
+        return {"time": int(time.time() * 1000) if self.realtime else self.start_time}
+
+    def tickerPrice(self, options=None):
+        market = (options or {}).get("market")
+        with self._lock:
+            self.requests += 1
+            if market is None:
+                return [{"market": name, "price": format_number(round_price(state.mid))}
+                        for name, state in self.markets.items()]
+            state = self._market(market)
+            self._catch_up(state)
+            return {"market": market, "price": format_number(round_price(state.mid))}
+
+    def tickerBook(self, options=None):
+        market = (options or {}).get("market")
+        with self._lock:
+            self.requests += 1
+            state = self._market(market)
+            self._catch_up(state)
+            bids, asks = self._book(state)
+            return {"market": market, "bid": format_number(bids[0][0]), "bidSize": format_number(bids[0][1]),
+                    "ask": format_number(asks[0][0]), "askSize": format_number(asks[0][1])}
+
+    def book(self, market, options=None):
+        depth = int((options or {}).get("depth", 1000))
+        with self._lock:
+            self.requests += 1
+            state = self._market(market)
+            self._catch_up(state)
+            bids, asks = self._book(state)
+            return {"market": market, "nonce": state.ticks,
+                    "bids": [[format_number(p), format_number(a)] for p, a in bids[:depth] if a > DUST],
+                    "asks": [[format_number(p), format_number(a)] for p, a in asks[:depth] if a > DUST]}
+
+    def candles(self, market, interval, options=None):
+        """Candles (nieuw naar oud) uit de gesimuleerde ticks, met een synthetische geschiedenis ervoor."""
+        if isinstance(self.feed, LiveFeed):
+            return self.feed.client.candles(market, interval, options)
+        if interval not in INTERVALS:
+            raise BitvavoAPIError(f"Ongeldig interval: {interval}", error_code=ERROR_INVALID_PARAMETER)
+        options = options or {}
+        step = INTERVALS[interval]
+        with self._lock:
+            self.requests += 1
+            state = self._market(market)
+            if self.realtime:
+                self._catch_up(state)
+            limit = min(int(options.get("limit", MAX_CANDLES)), MAX_CANDLES)
+            end = min(int(options.get("end", state.time)), state.time)
+            bucket = end - end % step
+            start = int(options["start"]) if "start" in options else bucket - (limit - 1) * step
+            candles = []
+            while bucket >= start and len(candles) < limit:
+                candle = self._candle(state, interval, step, bucket)
+                if candle is not None:
+                    candles.append([bucket, *(format_number(round_price(v)) for v in candle[:4]),
+                                    format_number(candle[4])])
+                bucket -= step
+            return candles
+
+    def _candle(self, state, interval, step, bucket):
+        first = state.start_time - state.start_time % step
+        if bucket < first:
+            # Vóór de start: een random walk die eindigt op de startprijs
+            index = (first - bucket) // step
+            closes = self._backfill_closes(state, interval, step, index + 1)
+            close, open_ = closes[index - 1], closes[index]
+            rng = random.Random(f"{self.seed}:candle:{state.name}:{interval}:{bucket}")
+            spread = abs(rng.gauss(0.0, self._step_volatility(step))) / 2
+            return (open_, max(open_, close) * (1 + spread), min(open_, close) * (1 - spread), close,
+                    self._backfill_volume(step))
+        minutes = [state.minutes[m] for m in range(bucket, bucket + step, MINUTE) if m in state.minutes]
+        if not minutes:
+            return None
+        return (minutes[0][0], max(c[1] for c in minutes), min(c[2] for c in minutes), minutes[-1][3],
+                sum(c[4] for c in minutes))
+
+    def _step_volatility(self, step):
+        # Dagvolatiliteit van de feed, geschaald naar de candlelengte
+        return getattr(self.feed, "volatility", 0.03) * math.sqrt(step / INTERVALS["1d"])
+
+    def _backfill_volume(self, step):
+        return getattr(self.feed, "level_size", 1.0) * step / self.tick_ms
+
+    def _backfill_closes(self, state, interval, step, count):
+        key = (state.name, interval)
+        closes = self._backfill.get(key)
+        if closes is None:
+            closes = self._backfill[key] = [self._start_mid(state)]
+        if len(closes) <= count:
+            rng = random.Random(f"{self.seed}:backfill:{state.name}:{interval}:{len(closes)}")
+            volatility = self._step_volatility(step)
+            while len(closes) <= count:
+                closes.append(closes[-1] * math.exp(-volatility * rng.gauss(0.0, 1.0)))
+        return closes
+
+    @staticmethod
+    def _start_mid(state):
+        minute = state.start_time - state.start_time % MINUTE
+        return state.minutes[minute][0]
+
+    # Private endpoints
+
+    def balance(self, options=None):
+        symbol = (options or {}).get("symbol")
+        with self._lock:
+            return [{"symbol": name, "available": format_number(amount), "inOrder": "0"}
+                    for name, amount in self.balances.items() if symbol in (None, name)]
+
+    def placeOrder(self, market, side, order_type, body):
+        if side not in ("buy", "sell") or order_type not in ("market", "limit"):
+            raise BitvavoAPIError(f"Ongeldige order: {side} {order_type}", error_code=ERROR_INVALID_PARAMETER)
+        try:
+            amount = float(body["amount"])
+            limit = float(body["price"]) if order_type == "limit" else None
+        except (KeyError, TypeError, ValueError) as e:
+            raise BitvavoAPIError(f"Ongeldige order: {e}", error_code=ERROR_INVALID_PARAMETER) from e
+        with self._lock:
+            self.requests += 1
+            state = self._market(market)
+            # De markt beweegt terwijl de order onderweg is
+            if self.realtime:
+                self._catch_up(state)
+            else:
+                self._advance(state, self._ticks(self.latency.sample()))
+            self._check_balance(state, side, amount, limit)
+
+            self.order_count += 1
+            order = {
+                "orderId": f"sim-{self.order_count:08d}", "market": market, "side": side,
+                "orderType": order_type, "amount": amount, "remaining": amount, "price": limit,
+                "postOnly": bool(body.get("postOnly")) and order_type == "limit",
+                "timeInForce": body.get("timeInForce", "GTC"), "status": "new",
+                "created": state.time, "updated": state.time, "fills": [],
+                "filled": 0.0, "filledQuote": 0.0, "fee": 0.0,
+            }
+            self.orders[order["orderId"]] = order
+            bids, asks = self._book(state)
+            best = asks[0][0] if side == "buy" else bids[0][0]
+            crosses = limit is None or (limit >= best if side == "buy" else limit <= best)
+            if order["postOnly"] and crosses:
+                order["status"] = "canceledPostOnly"
+            else:
+                if crosses:
+                    self._take(state, order, limit)
+                if order["remaining"] <= DUST:
+                    order["status"] = "filled"
+                elif limit is None:
+                    # Boek leeg of saldo op: het restant van een marketorder vervalt
+                    order["status"] = "filled" if order["filled"] > DUST else "canceled"
+                else:
+                    order["status"] = "partiallyFilled" if order["filled"] > DUST else "new"
+                    state.orders.append(order)
+            return self._view(order)
+
+    def getOrder(self, market, order_id):
+        with self._lock:
+            self.requests += 1
+            order = self.orders.get(order_id)
+            if order is None or order["market"] != market:
+                raise BitvavoAPIError(f"Order {order_id} niet gevonden", error_code=ERROR_ORDER_NOT_FOUND)
+            return self._view(order)
+
+    def cancelOrder(self, market, order_id):
+        with self._lock:
+            self.requests += 1
+            order = self.orders.get(order_id)
+            if order is None or order["market"] != market or order not in self._market(market).orders:
+                raise BitvavoAPIError(f"Order {order_id} niet gevonden", error_code=ERROR_ORDER_NOT_FOUND)
+            self._market(market).orders.remove(order)
+            order["status"] = "canceled"
+            order["updated"] = self._market(market).time
+            return {"orderId": order_id}
+
+    # Matching
+
+    def _check_balance(self, state, side, amount, limit):
+        if side == "sell":
+            if amount > self.balances.get(state.base, 0.0) + DUST:
+                raise BitvavoAPIError("Insufficient balance", error_code=ERROR_INSUFFICIENT_BALANCE)
+            return
+        price = limit if limit is not None else self._book(state)[1][0][0]
+        if amount * price * (1 + self.taker_fee / 100) > self.balances.get(state.quote, 0.0) + DUST:
+            raise BitvavoAPIError("Insufficient balance", error_code=ERROR_INSUFFICIENT_BALANCE)
+
+    def _take(self, state, order, limit):
+        """Vul als taker tegen het boek, niveau voor niveau, tot ``limit`` of tot het boek op is."""
+        side = order["side"]
+        levels = self._book(state)[1] if side == "buy" else self._book(state)[0]
+        for level in levels:
+            price, size = level
+            if limit is not None and (price > limit if side == "buy" else price < limit):
+                break
+            if size <= DUST:
+                continue
+            amount = self._fill(state, order, min(order["remaining"], size),
+                                self.slippage.apply(side, price), self.taker_fee, True)
+            level[1] -= amount
+            if amount <= DUST or order["remaining"] <= DUST:
+                break
+
+    def _match_resting(self, state):
+        """Vul openstaande limietorders als maker zodra het boek hun prijs passeert."""
+        bids, asks = self._book(state)
+        for order in list(state.orders):
+            buy = order["side"] == "buy"
+            for level in (asks if buy else bids):
+                price, size = level
+                if price > order["price"] if buy else price < order["price"]:
+                    break
+                if size <= DUST:
+                    continue
+                amount = self._fill(state, order, min(order["remaining"], size), order["price"],
+                                    self.maker_fee, False)
+                level[1] -= amount
+                if amount <= DUST or order["remaining"] <= DUST:
+                    break
+            if order["remaining"] <= DUST:
+                order["status"] = "filled"
+                state.orders.remove(order)
+            elif order["filled"] > DUST:
+                order["status"] = "partiallyFilled"
+
+    def _fill(self, state, order, amount, price, fee_percentage, taker):
+        """Boek een fill en werk saldi bij; bij te weinig saldo wordt er minder gevuld."""
+        rate = fee_percentage / 100
+        if order["side"] == "buy":
+            amount = min(amount, self.balances.get(state.quote, 0.0) / (price * (1 + rate)))
+        else:
+            amount = min(amount, self.balances.get(state.base, 0.0))
+        if amount <= DUST:
+            return 0.0
+        quote = amount * price
+        fee = quote * rate
+        if order["side"] == "buy":
+            self.balances[state.quote] = self.balances.get(state.quote, 0.0) - quote - fee
+            self.balances[state.base] = self.balances.get(state.base, 0.0) + amount
+        else:
+            self.balances[state.base] = self.balances.get(state.base, 0.0) - amount
+            self.balances[state.quote] = self.balances.get(state.quote, 0.0) + quote - fee
+        self.fill_count += 1
+        self.fees_paid += fee
+        order["remaining"] -= amount
+        order["filled"] += amount
+        order["filledQuote"] += quote
+        order["fee"] += fee
+        order["updated"] = state.time
+        order["fills"].append({
+            "id": f"{order['orderId']}-{len(order['fills']) + 1}", "timestamp": state.time,
+            "amount": format_number(amount), "price": format_number(price, 10), "taker": taker,
+            "fee": format_number(fee, 10), "feeCurrency": state.quote, "settled": True,
+        })
+        return amount
+
+    @staticmethod
+    def _view(order):
+        """Order in het formaat van de Bitvavo REST API."""
+        view = {
+            "orderId": order["orderId"], "market": order["market"], "created": order["created"],
+            "updated": order["updated"], "status": order["status"], "side": order["side"],
+            "orderType": order["orderType"], "amount": format_number(order["amount"]),
+            "amountRemaining": format_number(max(0.0, order["remaining"])),
+            "filledAmount": format_number(order["filled"]),
+            "filledAmountQuote": format_number(order["filledQuote"], 10),
+            "feePaid": format_number(order["fee"], 10), "feeCurrency": order["market"].split("-")[1],
+            "fills": [dict(fill) for fill in order["fills"]],
+        }
+        if order["price"] is not None:
+            view.update(price=format_number(order["price"], 10), postOnly=order["postOnly"],
+                        timeInForce=order["timeInForce"])
+        return view
+
+    # Metingen, net als bij BitvavoClient
+
+    def metrics(self):
+        return {"requests": self.requests, "errors": 0, "retries": 0, "throttled": 0, "throttled_seconds": 0.0,
+                "remaining": None, "limit": None, "reset_in": 0.0, "endpoints": {}}
+
+    def format_metrics(self):
+        balances = ", ".join(f"{name} {amount:.6f}" for name, amount in sorted(self.balances.items()))
+        return (f"SIM: {self.requests} requests, {self.order_count} orders, {self.fill_count} fills, "
+                f"fees {self.fees_paid:.4f} | saldi {balances}")
+
+    def close(self):
+        pass
+
+
+def bench(args):
+    """Doorvoer van de simulator: prijzen, boeken en orders per seconde."""
+    from execution import OrderExecutor
+
+    market = args.market
+    base, quote = market.split("-")
+    exchange = SimulatedExchange(SyntheticFeed(seed=args.seed), balances={base: 1e9, quote: 1e12})
+    started = time.perf_counter()
+    for _ in range(args.ticks):
+        exchange.tickerPrice({"market": market})
+    ticker_seconds = time.perf_counter() - started
+
+    executor = OrderExecutor(exchange, market, order_type="limit", post_only=True, limit_offset=0.05,
+                             fill_timeout=30, poll_interval=1.0, **exchange.executor_options(market))
+    orders = max(1, args.ticks // 100)
+    filled = 0
+    started = time.perf_counter()
+    for i in range(orders):
+        price = float(exchange.tickerPrice({"market": market})["price"])
+        execution = executor.execute("buy" if i % 2 == 0 else "sell", 0.5, price)
+        filled += execution.filled_amount > 0
+    order_seconds = time.perf_counter() - started
+
+    print(f"{args.ticks} prijzen in {ticker_seconds:.2f}s: {args.ticks / ticker_seconds:,.0f} ticks/s")
+    print(f"{orders} limietorders (met volgen tot fill of timeout) in {order_seconds:.2f}s: "
+          f"{orders / order_seconds:,.0f} orders/s, {filled} (deels) gevuld")
+    print(exchange.format_metrics())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gesimuleerde exchange voor DEMO_MODE en soak-tests.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    bench_parser = commands.add_parser("bench", help="Meet de doorvoer van de simulator")
+    bench_parser.add_argument("--ticks", type=int, default=100_000)
+    bench_parser.add_argument("--market", default="SOL-EUR")
+    bench_parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if args.command == "bench":
+        bench(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""OHLCV-candles voor meerdere intervallen tegelijk, opgebouwd uit losse ticks.
+
+``CandleAggregator`` krijgt elke prijs (met tijdstempel en eventueel
+volume) één keer en werkt per interval de lopende candle bij: een paar
+vergelijkingen, O(1) per tick en per interval. De candles liggen op
+UTC-grenzen zoals bij Bitvavo (``tijdstempel - tijdstempel % interval``): een
+tick precies op de grens hoort bij de nieuwe candle, een daggrens is
+middernacht UTC. Intervallen zonder ticks krijgen geen candle, net als in
+de candles van Bitvavo.
+
+Afgesloten candles staan per interval in een ringbuffer met vaste
+capaciteit, in hetzelfde (n, 6)-formaat als ``CandleStore.load``
+(timestamp in ms, open, high, low, close, volume). Elke rij wordt twee keer
+weggeschreven, zoals in ``PriceRing``, zodat de laatste N candles altijd
+als aaneengesloten view zonder kopie terugkomen.
+
+Late ticks (ouder dan de lopende candle, bijv. een trade-event dat na een
+reconnect binnenkomt) worden met ``late="drop"`` genegeerd en geteld. Met
+``late="amend"`` passen ze de laatst afgesloten candle nog aan als ze
+daarin vallen: high, low en volume, en de close alleen als de tick later is
+dan de tick die de close zette. Oudere ticks worden altijd genegeerd.
+"""
+import time
+
+import numpy as np
+
+from candle_store import CLOSE, HIGH, INTERVALS, LOW, VOLUME
+
+# Wat er met een tick gebeurt die ouder is dan de lopende candle
+LATE_POLICIES = ("drop", "amend")
+
+NAN = float("nan")
+
+
+class CandleSeries:
+    """Candles van één interval: de lopende candle plus een ringbuffer met afgesloten candles."""
+
+    def __init__(self, interval, capacity=1440, late="drop"):
+        if capacity < 1:
+            raise ValueError("capacity moet minimaal 1 zijn")
+        if late not in LATE_POLICIES:
+            raise ValueError(f"Onbekend late-beleid {late!r}, kies uit {LATE_POLICIES}")
+        self.interval = interval
+        self.step = INTERVALS[interval]
+        self.capacity = capacity
+        self.late = late
+        self.total = 0  # Aantal ooit afgesloten candles
+        self.late_ticks = 0  # Aantal genegeerde late ticks
+        self._rows = np.zeros((2 * capacity, 6), dtype=np.float64)
+        self._next = 0
+        self._count = 0
+        # Lopende candle; ``start`` None zolang er nog geen tick is geweest
+        self.start = None
+        self._newest = -1  # Begin (ms) van de nieuwste candle, lopend of afgesloten
+        self.open = self.high = self.low = self.close = NAN
+        self.volume = 0.0
+        self._last_tick = 0  # Tijdstempel (ms) van de tick die de close zette
+        self._closed_last_tick = 0  # Idem voor de laatst afgesloten candle
+
+    def __len__(self):
+        return self._count
+
+    def update(self, timestamp, price, volume=0.0):
+        """Verwerk een tick (``timestamp`` in ms); True als daarmee een candle afgesloten is."""
+        start = timestamp - timestamp % self.step
+        if start == self.start:
+            if price > self.high:
+                self.high = price
+            elif price < self.low:
+                self.low = price
+            if timestamp >= self._last_tick:
+                self.close = price
+                self._last_tick = timestamp
+            self.volume += volume
+            return False
+        if start > self._newest:
+            closed = self.start is not None
+            if closed:
+                self._push()
+            self._open(start, timestamp, price, volume)
+            return closed
+        self._late(start, timestamp, price, volume)
+        return False
+
+    def _open(self, start, timestamp, price, volume):
+        self.start = self._newest = start
+        self.open = self.high = self.low = self.close = price
+        self.volume = volume
+        self._last_tick = timestamp
+
+    def _push(self):
+        i = self._next
+        self._rows[i] = self._rows[i + self.capacity] = (
+            self.start, self.open, self.high, self.low, self.close, self.volume)
+        self._closed_last_tick = self._last_tick
+        self._next = (i + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+        self.total += 1
+
+    def _late(self, start, timestamp, price, volume):
+        last = self._next - 1 + self.capacity
+        if self.late != "amend" or not self._count or self._rows[last, 0] != start:
+            self.late_ticks += 1
+            return
+        row = self._rows[last]
+        row[HIGH] = max(row[HIGH], price)
+        row[LOW] = min(row[LOW], price)
+        row[VOLUME] += volume
+        if timestamp >= self._closed_last_tick:
+            row[CLOSE] = price
+            self._closed_last_tick = timestamp
+        self._rows[last - self.capacity] = row
+
+    def seed(self, candles, now=None):
+        """Vul de geschiedenis met candles in het Bitvavo- of ``CandleStore.load``-formaat.
+
+        Candles die om ``now`` (epoch-seconden) nog lopen, worden de lopende
+        candle; de rest gaat, oud naar nieuw, de ringbuffer in. Wat er al in
+        zat, wordt vervangen.
+        """
+        now_ms = (time.time() if now is None else now) * 1000
+        self._next = self._count = 0
+        self.start = None
+        self._newest = -1
+        for candle in sorted(candles, key=lambda candle: candle[0]):
+            start = int(candle[0])
+            self.start = self._newest = start
+            self.open, self.high, self.low, self.close, self.volume = (float(value) for value in candle[1:6])
+            self._last_tick = min(start + self.step, now_ms) - 1
+            if start + self.step <= now_ms:
+                self._push()
+                self.start = None
+
+    def candles(self, count=None, include_open=False):
+        """De laatste ``count`` candles als (n, 6)-array, oud naar nieuw (minder als er minder zijn).
+
+        Zonder ``include_open`` een read-only view op de afgesloten candles,
+        die meeverandert met nieuwe ticks; met ``include_open`` een kopie
+        waarvan de laatste rij de lopende candle is.
+        """
+        with_open = include_open and self.start is not None and count != 0
+        if count is None:
+            count = self._count + with_open
+        closed = min(self._count, count - with_open)
+        end = self._next + self.capacity
+        view = self._rows[end - closed:end]
+        if not with_open:
+            view.flags.writeable = False
+            return view
+        current = np.array([[self.start, self.open, self.high, self.low, self.close, self.volume]])
+        return np.concatenate((view, current))
+
+    def closes(self, count=None, include_open=False):
+        """De slotkoersen van ``candles(count, include_open)``."""
+        return self.candles(count, include_open)[:, CLOSE]
+
+    def last(self):
+        """De laatst afgesloten candle als rij, of None."""
+        if not self._count:
+            return None
+        return self._rows[self._next - 1 + self.capacity]
+
+
+class CandleAggregator:
+    """Bouwt candles voor meerdere intervallen tegelijk uit één tickstroom; zie de moduledocumentatie."""
+
+    def __init__(self, intervals=("1m",), capacity=1440, late="drop", clock=time.time):
+        self.series = {interval: CandleSeries(interval, capacity, late) for interval in intervals}
+        self._series = list(self.series.values())
+        self.clock = clock
+        self.ticks = 0
+
+    def __getitem__(self, interval):
+        return self.series[interval]
+
+    def update(self, price, timestamp=None, volume=0.0):
+        """Verwerk een tick (``timestamp`` in epoch-seconden, standaard ``clock()``).
+
+        Geeft de intervallen terug waarvan met deze tick een candle is
+        afgesloten, meestal een lege lijst.
+        """
+        timestamp = int((self.clock() if timestamp is None else timestamp) * 1000)
+        self.ticks += 1
+        return [series.interval for series in self._series if series.update(timestamp, price, volume)]
+
+    def late_ticks(self):
+        return sum(series.late_ticks for series in self._series)
+
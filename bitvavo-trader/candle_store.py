@@ -0,0 +1,210 @@
+"""Lokale candle-cache in SQLite met incrementeel ophalen.
+
+Candles worden per markt en interval bewaard. ``update`` haalt alleen
+candles op die nieuwer zijn dan de laatste in de cache (plus de nog lopende
+candle, waarvan de slotkoers verandert) en bladert automatisch door de
+limiet van Bitvavo van 1440 candles per request. Ontbreekt oudere
+geschiedenis, dan wordt die één keer bijgehaald. Slices komen terug als
+NumPy-arrays, zodat de bots, de backtest en andere analyses dezelfde data
+lezen.
+
+Vooraf vullen (publieke data, geen API-key nodig):
+    python candle_store.py fetch SOL-EUR 1m --days 365 --db data/candles.db
+"""
+import argparse
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+# Intervallen die Bitvavo ondersteunt, in milliseconden
+INTERVALS = {
+    "1m": 60_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000,
+    "8h": 28_800_000, "12h": 43_200_000, "1d": 86_400_000,
+}
+# Maximaal aantal candles dat Bitvavo per request teruggeeft
+MAX_CANDLES_PER_REQUEST = 1440
+
+# Kolommen van ``load``
+TIMESTAMP, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS candles (
+    market TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume REAL,
+    PRIMARY KEY (market, interval, timestamp)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sync_state (
+    market TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    first_requested INTEGER NOT NULL,
+    PRIMARY KEY (market, interval)
+);
+"""
+
+
+class CandleStore:
+    """Candles per markt en interval in één SQLite-bestand."""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self.requests = 0
+
+    def close(self):
+        self.db.close()
+
+    def last_timestamp(self, market, interval):
+        row = self.db.execute(
+            "SELECT MAX(timestamp) FROM candles WHERE market = ? AND interval = ?", (market, interval)).fetchone()
+        return row[0]
+
+    def first_timestamp(self, market, interval):
+        row = self.db.execute(
+            "SELECT MIN(timestamp) FROM candles WHERE market = ? AND interval = ?", (market, interval)).fetchone()
+        return row[0]
+
+    def insert(self, market, interval, candles):
+        """Sla candles in het Bitvavo-formaat op; bestaande tijdstempels worden overschreven."""
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                ((market, interval, int(c[0]), float(c[1]), float(c[2]), float(c[3]), float(c[4]), float(c[5]))
+                 for c in candles))
+
+    def _sync_state(self, market, interval):
+        return self.db.execute(
+            "SELECT fetched_at, first_requested FROM sync_state WHERE market = ? AND interval = ?",
+            (market, interval)).fetchone()
+
+    def is_fresh(self, market, interval, max_age, now=None):
+        """True als de cache minder dan ``max_age`` seconden geleden is bijgewerkt."""
+        state = self._sync_state(market, interval)
+        return state is not None and (now or time.time()) - state[0] < max_age
+
+    def update(self, client, market, interval, start, max_age=0, now=None):
+        """Werk de cache bij vanaf ``start`` (ms) tot nu; geeft het aantal opgehaalde candles terug.
+
+        Binnen ``max_age`` seconden na de vorige update en met de gevraagde
+        geschiedenis al in de cache wordt er niets opgehaald.
+        """
+        now = now or time.time()
+        end = int(now * 1000)
+        state = self._sync_state(market, interval)
+        first_requested = state[1] if state else None
+        need_history = first_requested is None or start < first_requested
+        if state is not None and not need_history and now - state[0] < max_age:
+            return 0
+
+        fetched = 0
+        last = self.last_timestamp(market, interval)
+        if last is None:
+            fetched += self._fetch_range(client, market, interval, start, end)
+        else:
+            first = self.first_timestamp(market, interval)
+            if need_history and start < first:
+                # Ontbrekende oudere geschiedenis één keer bijhalen
+                fetched += self._fetch_range(client, market, interval, start, first - 1)
+            # Vanaf de laatste (mogelijk nog lopende) candle
+            fetched += self._fetch_range(client, market, interval, last, end)
+
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?)",
+                (market, interval, now, min(start, first_requested) if first_requested is not None else start))
+        return fetched
+
+    def _fetch_range(self, client, market, interval, start, end):
+        """Haal [start, end] op, van nieuw naar oud, in pagina's van maximaal 1440 candles."""
+        fetched = 0
+        while end >= start:
+            candles = client.candles(market, interval, {
+                "start": start, "end": end, "limit": MAX_CANDLES_PER_REQUEST})
+            self.requests += 1
+            if not candles:
+                break
+            self.insert(market, interval, candles)
+            fetched += len(candles)
+            oldest = min(int(c[0]) for c in candles)
+            if len(candles) < MAX_CANDLES_PER_REQUEST:
+                break
+            end = oldest - 1
+        return fetched
+
+    def load(self, market, interval, start=None, end=None, limit=None):
+        """Candles als (n, 6)-array: timestamp (ms), open, high, low, close, volume; oud naar nieuw.
+
+        Met ``limit`` alleen de laatste ``limit`` candles binnen het bereik.
+        """
+        query = "SELECT timestamp, open, high, low, close, volume FROM candles WHERE market = ? AND interval = ?"
+        params = [market, interval]
+        if start is not None:
+            query += " AND timestamp >= ?"
+            params.append(int(start))
+        if end is not None:
+            query += " AND timestamp <= ?"
+            params.append(int(end))
+        if limit is not None:
+            query = f"SELECT * FROM ({query} ORDER BY timestamp DESC LIMIT ?) ORDER BY timestamp"
+            params.append(int(limit))
+        else:
+            query += " ORDER BY timestamp"
+        rows = self.db.execute(query, params).fetchall()
+        return np.array(rows, dtype=np.float64).reshape(-1, 6)
+
+    def closes(self, market, interval, count):
+        """De laatste ``count`` slotkoersen, oud naar nieuw."""
+        return self.load(market, interval, limit=count)[:, CLOSE]
+
+    def recent_closes(self, client, market, interval, count, max_age=0, now=None):
+        """Zorg dat de laatste ``count`` candles in de cache staan en geef hun slotkoersen."""
+        now = now or time.time()
+        step = INTERVALS[interval]
+        start = int(now * 1000) - count * step
+        self.update(client, market, interval, start, max_age=max_age, now=now)
+        return self.closes(market, interval, count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vul of bekijk de lokale candle-cache.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    fetch = commands.add_parser("fetch", help="Haal candles op tot nu")
+    fetch.add_argument("market")
+    fetch.add_argument("interval", choices=list(INTERVALS))
+    fetch.add_argument("--days", type=float, default=30, help="Aantal dagen geschiedenis")
+    fetch.add_argument("--db", default=os.path.join("data", "candles.db"))
+    fetch.add_argument("--resturl", default="https://api.bitvavo.com/v2")
+    info = commands.add_parser("info", help="Toon wat er in de cache staat")
+    info.add_argument("--db", default=os.path.join("data", "candles.db"))
+    args = parser.parse_args()
+
+    store = CandleStore(args.db)
+    if args.command == "fetch":
+        from bitvavo_client import BitvavoClient
+
+        client = BitvavoClient(rest_url=args.resturl)
+        start = int((time.time() - args.days * 86400) * 1000)
+        fetched = store.update(client, args.market, args.interval, start)
+        print(f"{fetched} candles opgehaald in {store.requests} requests naar {args.db}")
+    else:
+        for market, interval, count, first, last in store.db.execute(
+                "SELECT market, interval, COUNT(*), MIN(timestamp), MAX(timestamp) FROM candles "
+                "GROUP BY market, interval ORDER BY market, interval"):
+            print(f"{market} {interval}: {count} candles van "
+                  f"{time.strftime('%Y-%m-%d %H:%M', time.gmtime(first / 1000))} tot "
+                  f"{time.strftime('%Y-%m-%d %H:%M', time.gmtime(last / 1000))} (UTC)")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+import math
+from collections import deque
+
+import numpy as np
+
+
+class RollingRegression:
+    """Lineaire regressie van prijs tegen tijdsindex over een schuivend venster.
+
+    Houdt lopende sommen bij zodat een nieuwe prijs in O(1) verwerkt wordt.
+    De x-waarden zijn, net als bij ``LinearRegression`` op
+    ``np.arange(len(prices))``, de posities 0..n-1 binnen het venster; slope,
+    intercept en voorspelling zijn daardoor gelijk aan het sklearn-model.
+    """
+
+    # Na zoveel updates worden de sommen exact herberekend tegen afrondingsdrift
+    RESYNC_EVERY = 1024
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError("window moet minimaal 1 zijn")
+        self.window = window
+        self._values = deque(maxlen=window)
+        self._ref = 0.0
+        self._sum_y = 0.0
+        self._sum_xy = 0.0
+        self._since_resync = 0
+
+    @classmethod
+    def from_prices(cls, prices, window=None):
+        """Bouw een model in één keer op uit een reeks prijzen."""
+        prices = list(prices)
+        model = cls(window or max(len(prices), 1))
+        model.extend(prices)
+        return model
+
+    def __len__(self):
+        return len(self._values)
+
+    def is_full(self):
+        return len(self._values) == self.window
+
+    def extend(self, prices):
+        for price in prices:
+            self.update(price)
+
+    def update(self, price):
+        """Voeg een nieuwe prijs toe; de oudste valt eruit zodra het venster vol is."""
+        price = float(price)
+        n = len(self._values)
+        if n == 0:
+            self._ref = price
+        y = price - self._ref
+        if n == self.window:
+            oldest = self._values[0] - self._ref
+            # Alle overgebleven punten schuiven één positie naar links
+            self._sum_xy += (n - 1) * y - (self._sum_y - oldest)
+            self._sum_y += y - oldest
+        else:
+            self._sum_xy += n * y
+            self._sum_y += y
+        self._values.append(price)
+
+        self._since_resync += 1
+        if self._since_resync >= max(self.window, self.RESYNC_EVERY):
+            self._resync()
+
+    def _resync(self):
+        self._ref = self._values[0]
+        ys = [v - self._ref for v in self._values]
+        self._sum_y = math.fsum(ys)
+        self._sum_xy = math.fsum(i * y for i, y in enumerate(ys))
+        self._since_resync = 0
+
+    @property
+    def slope(self):
+        n = len(self._values)
+        if n < 2:
+            return 0.0
+        sum_x = n * (n - 1) / 2
+        denominator = n * n * (n * n - 1) / 12
+        return (n * self._sum_xy - sum_x * self._sum_y) / denominator
+
+    @property
+    def intercept(self):
+        n = len(self._values)
+        if n == 0:
+            return 0.0
+        sum_x = n * (n - 1) / 2
+        return self._ref + (self._sum_y - self.slope * sum_x) / n
+
+    def predict(self, x):
+        """Voorspel de prijs op positie ``x`` (0 is de oudste prijs in het venster)."""
+        return self.intercept + self.slope * x
+
+    def predict_next(self):
+        """Voorspel de prijs voor de eerstvolgende positie na het venster."""
+        return self.predict(len(self._values))
+
+
+class RollingLinearModel:
+    """Lineaire regressie met intercept op meerdere kenmerken over de laatste ``window`` samples.
+
+    In plaats van elke tick opnieuw te fitten houdt het model de
+    normaalvergelijkingen bij: de sommen van x, y, xxᵀ en xy, ten opzichte
+    van een referentiepunt tegen afrondingsverlies. Een nieuw sample wordt
+    er met een rang-1-update bij opgeteld en het sample dat uit het venster
+    valt weer afgetrokken, in vooraf gealloceerde buffers. Een update kost
+    O(p²) en een fit een p×p-stelsel, onafhankelijk van de venstergrootte.
+
+    Met ``alpha`` > 0 is het ridge-regressie (het intercept wordt niet
+    bestraft), gelijk aan sklearn's ``Ridge``; met ``alpha=0`` gelijk aan
+    ``LinearRegression``, bij een singuliere matrix met de
+    minimum-norm-oplossing. Samples met NaN tellen mee voor het venster maar
+    niet voor de fit.
+    """
+
+    # Na zoveel updates worden de sommen exact herberekend tegen afrondingsdrift
+    RESYNC_EVERY = 1024
+
+    def __init__(self, n_features, window, alpha=0.0):
+        if window < 1:
+            raise ValueError("window moet minimaal 1 zijn")
+        p = n_features
+        self.n_features = p
+        self.window = window
+        self.alpha = float(alpha)
+        self.count = 0  # Geldige samples in het venster
+
+        self._x = np.zeros((window, p))
+        self._y = np.zeros(window)
+        self._valid = [False] * window
+        self._pos = 0
+        self._filled = 0
+        self._since_resync = 0
+
+        self._ref_x = np.zeros(p)
+        self._ref_y = 0.0
+        self._sx = np.zeros(p)
+        self._sy = 0.0
+        self._sxx = np.zeros((p, p))
+        self._sxy = np.zeros(p)
+        self._dx = np.empty(p)
+        self._outer = np.empty((p, p))
+        self._a = np.empty((p, p))
+        self._b = np.empty(p)
+
+        self.coef_ = np.full(p, np.nan)
+        self.intercept_ = math.nan
+        self._fitted = False
+
+    def __len__(self):
+        return self.count
+
+    def update(self, features, target):
+        """Voeg een sample toe; het oudste sample valt eruit zodra het venster vol is."""
+        pos = self._pos
+        if self._filled == self.window:
+            if self._valid[pos]:
+                self._accumulate(self._x[pos], self._y[pos], -1.0)
+        else:
+            self._filled += 1
+        row = self._x[pos]
+        row[:] = features
+        target = float(target)
+        self._y[pos] = target
+        valid = math.isfinite(target) and math.isfinite(row.dot(row))
+        self._valid[pos] = valid
+        if valid:
+            if self.count == 0:
+                # Referentiepunt dicht bij de data, zodat de sommen klein blijven
+                self._ref_x[:] = row
+                self._ref_y = target
+                self._sx.fill(0.0)
+                self._sy = 0.0
+                self._sxx.fill(0.0)
+                self._sxy.fill(0.0)
+            self._accumulate(row, target, 1.0)
+        self._pos = (pos + 1) % self.window
+        self._fitted = False
+
+        self._since_resync += 1
+        if self._since_resync >= max(self.window, self.RESYNC_EVERY):
+            self._resync()
+
+    def _accumulate(self, x, y, sign):
+        dx = np.subtract(x, self._ref_x, out=self._dx)
+        dy = y - self._ref_y
+        np.multiply.outer(dx, dx, out=self._outer)
+        if sign > 0:
+            self._sxx += self._outer
+            self._sx += dx
+        else:
+            self._sxx -= self._outer
+            self._sx -= dx
+        self._sy += sign * dy
+        dx *= sign * dy
+        self._sxy += dx
+        self.count += 1 if sign > 0 else -1
+
+    def _resync(self):
+        """Sommen exact herberekenen rond het gemiddelde van het huidige venster."""
+        self._since_resync = 0
+        valid = np.array(self._valid[:self._filled])
+        if not valid.any():
+            return
+        x = self._x[:self._filled][valid]
+        y = self._y[:self._filled][valid]
+        self._ref_x[:] = x.mean(axis=0)
+        self._ref_y = float(y.mean())
+        dx = x - self._ref_x
+        dy = y - self._ref_y
+        self._sx[:] = dx.sum(axis=0)
+        self._sy = math.fsum(dy)
+        self._sxx[:] = dx.T @ dx
+        self._sxy[:] = dx.T @ dy
+        self._fitted = False
+
+    def fit(self):
+        """Los de (gecentreerde) normaalvergelijkingen op; geeft het model terug."""
+        n = self.count
+        if n == 0:
+            self.coef_.fill(np.nan)
+            self.intercept_ = math.nan
+            self._fitted = True
+            return self
+        a, b = self._a, self._b
+        # Centreren: XcᵀXc = Sxx - sx·sxᵀ/n en Xcᵀyc = Sxy - sx·sy/n
+        np.multiply.outer(self._sx, self._sx, out=a)
+        a *= -1.0 / n
+        a += self._sxx
+        np.multiply(self._sx, -self._sy / n, out=b)
+        b += self._sxy
+        if self.alpha:
+            a.flat[::self.n_features + 1] += self.alpha
+        try:
+            coef = np.linalg.solve(a, b)
+        except np.linalg.LinAlgError:
+            coef = np.linalg.lstsq(a, b, rcond=None)[0]
+        self.coef_[:] = coef
+        self.intercept_ = float(self._ref_y + (self._sy - self._sx @ coef) / n - self._ref_x @ coef)
+        self._fitted = True
+        return self
+
+    def predict_one(self, features):
+        """Voorspelling voor één rij kenmerken; fit zo nodig eerst."""
+        if not self._fitted:
+            self.fit()
+        return float(np.dot(features, self.coef_)) + self.intercept_
+
+    def predict(self, features):
+        """Voorspellingen voor een (n, p)-array, zoals ``predict`` van sklearn."""
+        if not self._fitted:
+            self.fit()
+        return np.asarray(features, dtype=np.float64) @ self.coef_ + self.intercept_
+
+
+class PredictionScore:
+    """Online kwaliteit van een prijsvoorspeller, bijgewerkt in O(1) per tick.
+
+    ``observe(price, prediction)`` scoort eerst de vorige voorspelling tegen
+    de nieuwe prijs en onthoudt dan de nieuwe. Per voorspelling tellen de
+    absolute fout, de fout van de naïeve voorspelling "prijs blijft gelijk"
+    en of de richting klopte (ticks zonder beweging tellen voor de richting
+    niet mee). Naast de totalen worden exponentieel gewogen waarden met een
+    halfwaardetijd van ``half_life`` voorspellingen bijgehouden, zodat
+    ``recent_direction_accuracy`` een model dat slechter wordt snel laat
+    zien. Dezelfde definities gebruikt ``backtest/evaluate.py``.
+    """
+
+    def __init__(self, half_life=500):
+        self.decay = 0.5 ** (1.0 / half_life)
+        self.count = 0
+        self.directional = 0
+        self.hits = 0
+        self.abs_error = 0.0
+        self.naive_error = 0.0
+        self._recent_error = 0.0
+        self._recent_naive = 0.0
+        self._recent_weight = 0.0
+        self._recent_hits = 0.0
+        self._recent_directional = 0.0
+        self._pending = None  # (prijs, voorspelling) van de vorige tick
+
+    def observe(self, price, prediction=None):
+        pending = self._pending
+        self._pending = (price, prediction) if prediction is not None else None
+        if pending is None:
+            return
+        base, predicted = pending
+        error = abs(predicted - price)
+        naive = abs(price - base)
+        decay = self.decay
+        self.count += 1
+        self.abs_error += error
+        self.naive_error += naive
+        self._recent_error = self._recent_error * decay + error
+        self._recent_naive = self._recent_naive * decay + naive
+        self._recent_weight = self._recent_weight * decay + 1.0
+        if price != base:
+            hit = (predicted > base) == (price > base)
+            self.directional += 1
+            self.hits += hit
+            self._recent_directional = self._recent_directional * decay + 1.0
+            self._recent_hits = self._recent_hits * decay + hit
+
+    @property
+    def mae(self):
+        return self.abs_error / self.count if self.count else float("nan")
+
+    @property
+    def recent_mae(self):
+        return self._recent_error / self._recent_weight if self._recent_weight else float("nan")
+
+    @property
+    def skill(self):
+        """1 - MAE / MAE van "prijs blijft gelijk"; onder 0 is het model slechter dan niets doen."""
+        return 1.0 - self.abs_error / self.naive_error if self.naive_error else float("nan")
+
+    @property
+    def recent_skill(self):
+        return 1.0 - self._recent_error / self._recent_naive if self._recent_naive else float("nan")
+
+    @property
+    def direction_accuracy(self):
+        return self.hits / self.directional if self.directional else float("nan")
+
+    @property
+    def recent_direction_accuracy(self):
+        return self._recent_hits / self._recent_directional if self._recent_directional else float("nan")
+
+    def state(self):
+        """JSON-serialiseerbare tellers voor een checkpoint; de openstaande voorspelling hoort er niet bij."""
+        return {
+            "decay": self.decay, "count": self.count, "directional": self.directional, "hits": self.hits,
+            "abs_error": self.abs_error, "naive_error": self.naive_error,
+            "recent": [self._recent_error, self._recent_naive, self._recent_weight,
+                       self._recent_hits, self._recent_directional],
+        }
+
+    def load_state(self, state):
+        """Herstel de tellers van een checkpoint; False als de halfwaardetijd anders is."""
+        if state.get("decay") != self.decay:
+            return False
+        self.count = state["count"]
+        self.directional = state["directional"]
+        self.hits = state["hits"]
+        self.abs_error = state["abs_error"]
+        self.naive_error = state["naive_error"]
+        (self._recent_error, self._recent_naive, self._recent_weight,
+         self._recent_hits, self._recent_directional) = state["recent"]
+        self._pending = None
+        return True
+
+    def format_summary(self):
+        return (f"Voorspellingen: {self.count}, MAE {self.mae:.4f} (recent {self.recent_mae:.4f}), "
+                f"richting goed {self.direction_accuracy:.1%} (recent {self.recent_direction_accuracy:.1%}), "
+                f"skill t.o.v. 'geen verandering' {self.skill:+.3f}")
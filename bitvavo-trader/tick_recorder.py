@@ -0,0 +1,319 @@
+"""Tick-recorder: live marktdata vastleggen in compacte, kolomvormige bestanden.
+
+Per markt, UTC-dag en soort event komt er één bestand (partitie):
+
+    <root>/<markt>/<YYYY-MM-DD>/<soort>.bin
+
+met records van vaste lengte zonder header (``TICKER_DTYPE``, ``BOOK_DTYPE``
+of ``TRADE_DTYPE``, little-endian). ``load`` opent zo'n bestand met
+``np.memmap``: een dag ticks teruglezen kopieert niets en kost nauwelijks
+geheugen. Afgesloten dagen kunnen met ``compact`` naar Parquet (zstd)
+worden omgezet als pyarrow geïnstalleerd is; ``load`` leest beide.
+
+``TickRecorder`` buffert per markt en soort ``buffer_size`` records in een
+vooraf gereserveerde numpy-array (begrensd geheugen) en schrijft ze in één
+keer weg als de buffer vol is of er ``flush_interval`` seconden verstreken
+zijn. Een record toevoegen kost ongeveer een microseconde. Een half
+geschreven laatste record (bijv. na een crash) wordt bij het lezen en bij
+het verder schrijven genegeerd.
+
+De soorten:
+
+* ``ticker``: de prijzen die een bot of de hub werkelijk gebruikte;
+* ``book``: beste bied- en laatprijs met hoeveelheden (WebSocket-tickerkanaal);
+* ``trade``: trades op de markt (WebSocket-tradeskanaal), ``side`` 1 = koop, -1 = verkoop.
+
+Standalone opnemen via de Bitvavo WebSocket (nodig: ``ticker_stream.py``):
+    python tick_recorder.py record SOL-EUR BTC-EUR --root data/ticks
+    python tick_recorder.py info --root data/ticks
+    python tick_recorder.py compact --root data/ticks
+"""
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+
+TICKER_DTYPE = np.dtype([("timestamp", "<i8"), ("price", "<f8")])
+BOOK_DTYPE = np.dtype([("timestamp", "<i8"), ("bid", "<f8"), ("bid_size", "<f8"),
+                       ("ask", "<f8"), ("ask_size", "<f8")])
+TRADE_DTYPE = np.dtype([("timestamp", "<i8"), ("price", "<f8"), ("amount", "<f8"), ("side", "i1")])
+DTYPES = {"ticker": TICKER_DTYPE, "book": BOOK_DTYPE, "trade": TRADE_DTYPE}
+SIDES = {"buy": 1, "sell": -1}
+DAY_MS = 86_400_000
+
+
+def day_of(timestamp):
+    """UTC-datum (``YYYY-MM-DD``) van een tijdstempel in milliseconden."""
+    return time.strftime("%Y-%m-%d", time.gmtime(timestamp // 1000))
+
+
+def partition_path(root, market, day, kind, suffix=".bin"):
+    return os.path.join(root, market, day, kind + suffix)
+
+
+class _Partition:
+    """Buffer en open bestand voor één markt en soort; wisselt om middernacht (UTC) van bestand."""
+
+    def __init__(self, root, market, kind, buffer_size):
+        self.root = root
+        self.market = market
+        self.kind = kind
+        self.buffer = np.zeros(buffer_size, DTYPES[kind])
+        self.count = 0
+        self.day_start = self.day_end = 0
+        self.file = None
+
+    def append(self, record):
+        """Voeg een record toe; True als de buffer vol is."""
+        timestamp = record[0]
+        if not self.day_start <= timestamp < self.day_end:
+            self.flush()
+            self._open(timestamp)
+        self.buffer[self.count] = record
+        self.count += 1
+        return self.count == len(self.buffer)
+
+    def _open(self, timestamp):
+        if self.file is not None:
+            self.file.close()
+        self.day_start = timestamp - timestamp % DAY_MS
+        self.day_end = self.day_start + DAY_MS
+        path = partition_path(self.root, self.market, day_of(timestamp), self.kind)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(path, "ab")
+        # Een half geschreven record van een eerdere run weghalen
+        size = self.file.tell()
+        itemsize = self.buffer.dtype.itemsize
+        if size % itemsize:
+            self.file.truncate(size - size % itemsize)
+
+    def flush(self):
+        if self.count:
+            self.file.write(self.buffer[:self.count].tobytes())
+            self.file.flush()
+            self.count = 0
+
+    def close(self):
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class TickRecorder:
+    """Neemt ticker-, boek- en trade-events op in dagpartities; zie de moduledocumentatie."""
+
+    def __init__(self, root, buffer_size=4096, flush_interval=5.0, clock=time.time):
+        self.root = root
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.records = 0
+        self._partitions = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Een recorder als ``RECORD_DIR`` in de configuratie staat, anders None."""
+        root = config.get("RECORD_DIR")
+        if not root:
+            return None
+        return cls(root, buffer_size=config.get("RECORD_BUFFER", 4096),
+                   flush_interval=config.get("RECORD_FLUSH_INTERVAL", 5.0))
+
+    def _now(self):
+        return int(self.clock() * 1000)
+
+    def ticker(self, market, price, timestamp=None):
+        self._append(market, "ticker", (timestamp if timestamp is not None else self._now(), price))
+
+    def book(self, market, bid, bid_size, ask, ask_size, timestamp=None):
+        self._append(market, "book", (timestamp if timestamp is not None else self._now(), bid, bid_size, ask, ask_size))
+
+    def trade(self, market, price, amount, side, timestamp=None):
+        self._append(market, "trade", (timestamp if timestamp is not None else self._now(), price, amount, SIDES.get(side, 0)))
+
+    def record_event(self, market, message):
+        """Boek- en trade-velden uit een ticker- of trade-event van de Bitvavo WebSocket."""
+        event = message.get("event")
+        try:
+            if event == "ticker" and "bestBid" in message and "bestAsk" in message:
+                self.book(market, float(message["bestBid"]), float(message.get("bestBidSize") or 0),
+                          float(message["bestAsk"]), float(message.get("bestAskSize") or 0))
+            elif event == "trade" and "price" in message:
+                timestamp = message.get("timestamp")
+                self.trade(market, float(message["price"]), float(message.get("amount") or 0),
+                           message.get("side"), int(timestamp) if timestamp is not None else None)
+        except (TypeError, ValueError):
+            pass
+
+    def _append(self, market, kind, record):
+        with self._lock:
+            partition = self._partitions.get((market, kind))
+            if partition is None:
+                partition = self._partitions[(market, kind)] = _Partition(
+                    self.root, market, kind, self.buffer_size)
+            if partition.append(record):
+                partition.flush()
+            self.records += 1
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def _flush(self):
+        for partition in self._partitions.values():
+            partition.flush()
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        """Schrijf alle buffers weg."""
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            for partition in self._partitions.values():
+                partition.close()
+            self._partitions.clear()
+
+
+def days(root, market):
+    """Datums (``YYYY-MM-DD``) waarvoor er opnames van ``market`` zijn, oud naar nieuw."""
+    directory = os.path.join(root, market)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name for name in os.listdir(directory) if os.path.isdir(os.path.join(directory, name)))
+
+
+def load(root, market, day, kind="ticker"):
+    """Records van één dag als structured array; een ``.bin``-bestand wordt zonder kopie gemapt."""
+    dtype = DTYPES[kind]
+    path = partition_path(root, market, day, kind)
+    if os.path.exists(path):
+        count = os.path.getsize(path) // dtype.itemsize
+        if not count:
+            return np.zeros(0, dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+    parquet = partition_path(root, market, day, kind, ".parquet")
+    if os.path.exists(parquet):
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(parquet)
+        records = np.empty(table.num_rows, dtype)
+        for name in dtype.names:
+            records[name] = table.column(name).to_numpy()
+        return records
+    return np.zeros(0, dtype)
+
+
+def load_range(root, market, kind="ticker", start=None, end=None):
+    """Records van ``market`` tussen ``start`` en ``end`` (ms, inclusief) over alle dagen.
+
+    Eén dag zonder grenzen blijft een view op het gemapte bestand; meerdere
+    dagen of een begrensd bereik geven een kopie.
+    """
+    first = day_of(start) if start is not None else None
+    last = day_of(end) if end is not None else None
+    parts = [load(root, market, day, kind) for day in days(root, market)
+             if (first is None or day >= first) and (last is None or day <= last)]
+    parts = [part for part in parts if len(part)]
+    if not parts:
+        return np.zeros(0, DTYPES[kind])
+    records = parts[0] if len(parts) == 1 else np.concatenate(parts)
+    if start is not None or end is not None:
+        stamps = records["timestamp"]
+        mask = np.ones(len(records), dtype=bool)
+        if start is not None:
+            mask &= stamps >= start
+        if end is not None:
+            mask &= stamps <= end
+        records = records[mask]
+    return records
+
+
+def compact(root, remove=True, today=None):
+    """Zet ``.bin``-partities van afgesloten dagen om naar Parquet (zstd); geeft de nieuwe paden terug."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    today = today or day_of(int(time.time() * 1000))
+    written = []
+    for market in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+        for day in days(root, market):
+            if day >= today:
+                continue
+            for kind in DTYPES:
+                path = partition_path(root, market, day, kind)
+                if not os.path.exists(path):
+                    continue
+                records = load(root, market, day, kind)
+                table = pa.table({name: np.asarray(records[name]) for name in records.dtype.names})
+                target = partition_path(root, market, day, kind, ".parquet")
+                pq.write_table(table, target, compression="zstd")
+                del records, table
+                if remove:
+                    os.remove(path)
+                written.append(target)
+    return written
+
+
+def record(args):
+    """Neem ticker, boek en trades van ``args.markets`` op tot Ctrl+C."""
+    from ticker_stream import TickerStream  # Alleen in de scalper- en hubmap
+
+    recorder = TickRecorder(args.root, flush_interval=args.flush_interval)
+    stream = TickerStream(args.ws_url, args.markets, on_price=recorder.ticker,
+                          on_event=recorder.record_event).start()
+    print(f"[REC] Opnemen van {', '.join(args.markets)} naar {args.root}")
+    try:
+        while True:
+            time.sleep(args.flush_interval)
+            recorder.flush()
+            print(f"[REC] {recorder.records} events opgenomen, verbonden: {stream.connected}")
+    except KeyboardInterrupt:
+        print("[REC] Gestopt door gebruiker.")
+    finally:
+        stream.stop()
+        recorder.close()
+
+
+def info(args):
+    """Aantal records en tijdsbereik per markt, dag en soort."""
+    markets = sorted(os.listdir(args.root)) if os.path.isdir(args.root) else []
+    for market in markets:
+        for day in days(args.root, market):
+            for kind in DTYPES:
+                records = load(args.root, market, day, kind)
+                if len(records):
+                    first, last = records["timestamp"][0], records["timestamp"][-1]
+                    print(f"{market} {day} {kind:>6}: {len(records):>9} records "
+                          f"{time.strftime('%H:%M:%S', time.gmtime(first // 1000))}-"
+                          f"{time.strftime('%H:%M:%S', time.gmtime(last // 1000))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live marktdata opnemen in dagpartities.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_parser = commands.add_parser("record", help="Neem op via de Bitvavo WebSocket")
+    record_parser.add_argument("markets", nargs="+")
+    record_parser.add_argument("--ws-url", default="wss://ws.bitvavo.com/v2/")
+    record_parser.add_argument("--flush-interval", type=float, default=5.0)
+    info_parser = commands.add_parser("info", help="Toon de opgenomen partities")
+    compact_parser = commands.add_parser("compact", help="Zet afgesloten dagen om naar Parquet")
+    compact_parser.add_argument("--keep", action="store_true", help="Bewaar de .bin-bestanden")
+    for sub in (record_parser, info_parser, compact_parser):
+        sub.add_argument("--root", default=os.path.join("data", "ticks"))
+    args = parser.parse_args()
+    if args.command == "record":
+        record(args)
+    elif args.command == "info":
+        info(args)
+    else:
+        for path in compact(args.root, remove=not args.keep):
+            print(f"[REC] {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,34 @@
 import time
 import json
+import os
+from collections import deque
 from datetime import datetime
-from python_bitvavo_api.bitvavo import Bitvavo
-import pandas as pd
+from bitvavo_client import BitvavoAPIError, BitvavoClient
+from candle_aggregator import CandleAggregator
+from candle_store import CLOSE, INTERVALS, TIMESTAMP, CandleStore
+from checkpoint import Checkpointer
+from execution import OrderExecutor
+from hub_client import HubClient
 import numpy as np
-from sklearn.linear_model import LinearRegression
-import requests
+import indicators
+from metrics import BotMetrics
+from notifier import SlackNotifier
+from regression import PredictionScore, RollingLinearModel
+from ringbuffer import PriceRing
+from scheduler import Scheduler
+from simulator import SimulatedExchange
+from tick_recorder import TickRecorder
+
+# Aantal prijzen waarover indicatoren en het AI-model berekend worden
+PRICE_WINDOW = 50
+# Kenmerken waarop het AI-model de volgende prijsverandering voorspelt
+FEATURES = ["price_change", "rsi", "macd", "macd_signal"]
+# Minimaal aantal geldige trainingsrijen voor een voorspelling (live én in de backtest)
+MIN_SAMPLES = len(FEATURES) + 1
+# Map voor de lokale candle-cache
+DATA_DIR = "data"
+# Latency per stap, loop-lag, fouten, orders en positie; alleen geserveerd met metrics_port
+metrics = BotMetrics("trader")
 
 # Configuratie laden
 
@@ -17,12 +40,26 @@ def load_config(file_path):
 # Slack-bericht sturen
 
 
+# Eén achtergrond-notifier per webhook
+notifiers = {}
+
+
+def get_notifier(webhook_url):
+    notifier = notifiers.get(webhook_url)
+    if notifier is None:
+        notifier = notifiers[webhook_url] = SlackNotifier(webhook_url)
+    return notifier
+
+
 def send_to_slack(message, webhook_url):
-    payload = {"text": message}
-    try:
-        requests.post(webhook_url, json=payload)
-    except Exception as e:
-        print(f"[ERROR] Kon bericht niet naar Slack sturen: {e}")
+    """Zet een bericht in de Slack-wachtrij; versturen gebeurt op de achtergrond."""
+    get_notifier(webhook_url).notify(message)
+
+
+def close_notifiers():
+    """Verstuur openstaande Slack-berichten en stop de notifiers."""
+    for notifier in notifiers.values():
+        notifier.close()
 
 # Logging
 
@@ -38,45 +75,175 @@ def log_message(message, webhook_url=None):
 
 
 def calculate_indicators(prices, trader_config):
-    slow_macd = trader_config["slow_macd"]
-    fast_macd = trader_config["fast_macd"]
-    signal_macd = trader_config["signal_macd"]
-    sma_period = trader_config["sma_period"]
-    ema_period = trader_config["ema_period"]
-
-    df = pd.DataFrame(prices, columns=["price"])
-    df["sma"] = df["price"].rolling(window=sma_period).mean()
-    df["ema"] = df["price"].ewm(span=ema_period, adjust=False).mean()
-    df["rsi"] = calculate_rsi(df["price"])
-    df["macd"], df["macd_signal"] = calculate_macd(
-        df["price"], slow_macd, fast_macd, signal_macd)
-    return df
-
-
-def calculate_rsi(prices, period=14):
-    delta = prices.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
-
-
-def calculate_macd(prices, slow=26, fast=12, signal=9):
-    fast_ema = prices.ewm(span=fast, adjust=False).mean()
-    slow_ema = prices.ewm(span=slow, adjust=False).mean()
-    macd = fast_ema - slow_ema
-    macd_signal = macd.ewm(span=signal, adjust=False).mean()
-    return macd, macd_signal
+    """Indicatoren voor een hele prijsreeks in één keer (opwarmen en backtests).
+
+    Geeft een dict met per kolom een NumPy-array, gelijk aan wat
+    ``TraderIndicators`` prijs voor prijs oplevert.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    macd, macd_signal = indicators.macd(
+        prices, trader_config["slow_macd"], trader_config["fast_macd"], trader_config["signal_macd"])
+    price_change = np.full(len(prices), np.nan)
+    price_change[1:] = prices[1:] / prices[:-1] - 1
+    return {
+        "price": prices,
+        "sma": indicators.sma(prices, trader_config["sma_period"]),
+        "ema": indicators.ema(prices, trader_config["ema_period"]),
+        "rsi": indicators.rsi(prices, 14),
+        "macd": macd,
+        "macd_signal": macd_signal,
+        "price_change": price_change,
+    }
+
+
+def training_rows(trader_config):
+    """Aantal rijen waarop het model traint: het prijsvenster minus de opwarmperiode van RSI/SMA."""
+    warmup = max(13, trader_config["sma_period"] - 1, 1)
+    return max(1, PRICE_WINDOW - 1 - warmup)
+
+
+class TraderIndicators:
+    """Indicatoren, kenmerkrijen en het AI-model van de trader, per prijs bijgewerkt.
+
+    Het model (``RollingLinearModel``) krijgt per prijs één sample erbij:
+    de kenmerken van de vorige rij met de prijsverandering van nu als doel.
+    """
+
+    def __init__(self, trader_config):
+        self.sma = indicators.SMA(trader_config["sma_period"])
+        self.ema = indicators.EMA(trader_config["ema_period"])
+        self.rsi = indicators.RSI(14)
+        self.macd = indicators.MACD(
+            trader_config["slow_macd"], trader_config["fast_macd"], trader_config["signal_macd"])
+        # Laatste trainingsrijen plus de huidige rij: (kenmerken..., sma)
+        self.rows = deque(maxlen=training_rows(trader_config) + 1)
+        self.model = RollingLinearModel(
+            len(FEATURES), training_rows(trader_config), alpha=trader_config.get("ridge_alpha", 0.0))
+        self.last_price = None
+
+    def update(self, price):
+        price_change = price / self.last_price - 1 if self.last_price else np.nan
+        self.last_price = price
+        sma = self.sma.update(price)
+        self.ema.update(price)
+        rsi = self.rsi.update(price)
+        macd, macd_signal = self.macd.update(price)
+        if self.rows:
+            previous = self.rows[-1]
+            # Alleen rijen met een geldige SMA tellen mee, net als in ``training_data``
+            self.model.update(previous[:len(FEATURES)], price_change if previous[-1] == previous[-1] else np.nan)
+        self.rows.append((price_change, rsi, macd, macd_signal, sma))
+
+    def training_data(self):
+        """(kenmerken, doelen, kenmerken van de huidige prijs) als arrays, voor het sklearn-model."""
+        rows = np.array(self.rows, dtype=np.float64).reshape(-1, len(FEATURES) + 1)
+        features = rows[:-1, :len(FEATURES)]
+        targets = rows[1:, 0]  # Prijsverandering van de volgende rij
+        valid = np.isfinite(features).all(axis=1) & np.isfinite(targets) & np.isfinite(rows[:-1, -1])
+        return features[valid], targets[valid], rows[-1:, :len(FEATURES)]
 
 # AI-model trainen
 
 
-def train_ai_model(data):
-    features = data[["price_change", "rsi", "macd", "macd_signal"]].dropna()
-    targets = data["future_price_change"].dropna()
-    model = LinearRegression()
-    model.fit(features, targets)
-    return model
+def train_ai_model(features, targets, model="linear", alpha=0.0):
+    """Train het AI-model in één keer; ``model`` is "linear" (NumPy) of "sklearn".
+
+    Met ``alpha`` > 0 is het ridge-regressie. scikit-learn wordt alleen
+    geïmporteerd als het geconfigureerd is: die import kost ruim een seconde
+    bij elke (her)start van de container.
+    """
+    if model == "sklearn":
+        from sklearn.linear_model import LinearRegression, Ridge
+
+        return (Ridge(alpha=alpha) if alpha else LinearRegression()).fit(features, targets)
+    if model != "linear":
+        raise ValueError(f"Onbekend model: {model}")
+    linear = RollingLinearModel(features.shape[1], max(1, len(targets)), alpha)
+    for row, target in zip(features, targets):
+        linear.update(row, target)
+    return linear.fit()
+
+# Voorspelling voor de laatste prijs
+
+
+def evaluate_signal(state, model="linear"):
+    """Geef (voorspelling, RSI) van de laatste prijs.
+
+    Het standaardmodel is het rollende model van ``state``, dat per prijs
+    alleen wordt bijgewerkt; met "sklearn" wordt elke prijs opnieuw getraind.
+    """
+    rsi = state.rsi.value
+    if model == "sklearn":
+        features, targets, latest = state.training_data()
+        if len(targets) < MIN_SAMPLES:
+            return np.nan, rsi
+        return train_ai_model(features, targets, model, state.model.alpha).predict(latest)[0], rsi
+    if model != "linear":
+        raise ValueError(f"Onbekend model: {model}")
+    if state.model.count < MIN_SAMPLES:
+        return np.nan, rsi
+    return state.model.predict_one(state.rows[-1][:len(FEATURES)]), rsi
+
+
+def live_signal(state, prices, model="linear"):
+    """Zoals ``evaluate_signal``, maar NaN zolang ``prices`` nog geen vol prijsvenster heeft.
+
+    Dit is de voorspelling waarop de live bot handelt; de backtest past dezelfde drempel toe.
+    """
+    if not prices.is_full():
+        return np.nan, state.rsi.value
+    return evaluate_signal(state, model)
+
+# Order plaatsen
+
+
+def place_order(executor, side, amount, price, webhook_url=None):
+    """Plaats een order via de executor en geef de ``Execution`` terug, of None bij een fout."""
+    if executor.demo:
+        log_message(f"[DEMO] {side.capitalize()} {amount:.6f} {executor.market.split('-')[0]} tegen {price:.2f} EUR.")
+    try:
+        with metrics.stage(executor.market, "order").time():
+            # Een verkoop sluit de positie (doelwinst of stop-loss) en gaat dus als exit-order
+            execution = executor.execute(side, amount, price, exit=side == "sell")
+    except BitvavoAPIError as e:
+        metrics.order(executor.market, side, None)
+        log_message(f"[ERROR] Fout bij het plaatsen van de order: {e}", webhook_url)
+        return None
+    metrics.order(executor.market, side, execution)
+    if not executor.demo:
+        log_message(f"[INFO] Order {execution.order_id}: {execution.describe()}")
+        if not execution.fully_filled:
+            log_message(f"[WARN] Order niet volledig gevuld: {execution.describe()}", webhook_url)
+    return execution
+
+# Prijsvenster vooraf vullen
+
+
+def warm_up_prices(bitvavo, symbol, interval, count=PRICE_WINDOW, max_age=300, path=None, since=None,
+                   aggregator=None):
+    """De laatste ``count`` slotkoersen uit de candle-cache als (tijdstempels, prijzen).
+
+    Zo hoeft de bot na het starten niet eerst PRICE_WINDOW rondes te wachten.
+    De tijdstempel is het einde van de candle; met ``since`` (epoch-seconden,
+    bijv. het laatste checkpoint) alleen de candles die daarna afsloten.
+    Met ``aggregator`` gaan de candles ook daarin; de nog lopende candle
+    wordt dan live afgemaakt en niet als slotkoers teruggegeven.
+    """
+    store = CandleStore(path or os.path.join(DATA_DIR, "candles.db"))
+    try:
+        store.recent_closes(bitvavo, symbol, interval, count, max_age=max_age)
+        candles = store.load(symbol, interval, limit=count)
+    finally:
+        store.close()
+    now = time.time()
+    ends = (candles[:, TIMESTAMP] + INTERVALS[interval]) / 1000
+    if aggregator is not None:
+        aggregator[interval].seed(candles, now=now)
+        closed = ends <= now
+        candles, ends = candles[closed], ends[closed]
+    ends = np.minimum(ends, now)
+    recent = ends > since if since is not None else np.ones(len(ends), dtype=bool)
+    return ends[recent], candles[recent, CLOSE]
 
 # Bot met AI, indicatoren, winstdoel en stop-loss
 
@@ -94,80 +261,212 @@ def midterm_bot(config_file, trader_file):
     rsi_threshold_buy = trader_config["rsi_threshold_buy"]
     rsi_threshold_sell = trader_config["rsi_threshold_sell"]
     prediction_threshold_buy = trader_config["prediction_threshold_buy"]
+    model = trader_config.get("model", "linear")
 
-    bitvavo = Bitvavo({
-        "APIKEY": config.get("API_KEY"),
-        "APISECRET": config.get("API_SECRET"),
-        "RESTURL": config.get("RESTURL", "https://api.bitvavo.com/v2"),
-        "WSURL": config.get("WSURL", "wss://ws.bitvavo.com/v2/"),
-        "ACCESSWINDOW": config.get("ACCESSWINDOW", 10000),
-        "DEBUGGING": config.get("DEBUGGING", False),
-    })
+    bitvavo = BitvavoClient.from_config(config)
+    # Prijzen en candles via de market-data hub als MARKET_HUB is ingesteld, anders rechtstreeks
+    market_data = HubClient.from_config(config, fallback=bitvavo) or bitvavo
     slack_webhook_url = config.get("SLACK_WEBHOOK_URL")
-
-    prices = pd.Series(dtype=float)
-    model = None
+    demo = trader_config.get("demo_mode", True)
+    # In demo-modus met SIMULATOR in config.json gaan prijzen, candles en orders naar de gesimuleerde exchange
+    simulator = SimulatedExchange.from_config(config) if demo else None
+    if simulator is not None:
+        bitvavo = market_data = simulator
+        log_message(f"[SIM] Handelen tegen de gesimuleerde exchange ({type(simulator.feed).__name__}).")
+    executor = OrderExecutor(
+        bitvavo, symbol,
+        order_type=trader_config.get("order_type", "market"),
+        exit_order_type=trader_config.get("exit_order_type", "market"),
+        post_only=trader_config.get("post_only", True),
+        limit_offset=trader_config.get("limit_offset", 0.0),
+        fill_timeout=trader_config.get("fill_timeout", 30),
+        demo=demo and simulator is None,
+        fee_percentage=trader_config.get("trade_fee_percentage", 0.25),
+        **(simulator.executor_options(symbol) if simulator is not None else {}))
+
+    # Tick-recorder voor backtests met de prijzen die de bot echt zag
+    recorder = TickRecorder(trader_config["record_dir"]) if trader_config.get("record_dir") else None
+
+    prices = PriceRing(PRICE_WINDOW)
+    state = TraderIndicators(trader_config)
+    # Met aggregate_candles rekenen indicatoren en model op afgesloten candle_interval-candles uit de eigen ticks
+    candle_interval = trader_config.get("candle_interval")
+    aggregator = None
+    sample_interval = check_interval  # Seconden tussen twee prijzen in het venster
+    if candle_interval and trader_config.get("aggregate_candles", False):
+        aggregator = CandleAggregator((candle_interval,), capacity=PRICE_WINDOW,
+                                      clock=simulator.clock_for(symbol) if simulator is not None else time.time)
+        sample_interval = INTERVALS[candle_interval] / 1000
     bought = False
     buy_price = 0
     amount_crypto = 0
+    realized = 0.0  # Gerealiseerde winst/verlies na fees, voor de metrics
+    # Live fout en richting van de voorspellingen; geen aankopen als het model recent slechter gokt dan toegestaan
+    score = PredictionScore()
+    min_direction_accuracy = trader_config.get("min_direction_accuracy")
+    min_predictions = trader_config.get("min_predictions", 500)
+
+    def checkpoint_state():
+        return ({"prices": prices.values(), "timestamps": prices.timestamps()},
+                {"symbol": symbol, "bought": bought, "buy_price": buy_price, "amount": amount_crypto,
+                 "realized": realized, "score": score.state()})
+
+    # Warme herstart: positie, prijsvenster en voorspeltellers uit het laatste checkpoint.
+    # De indicatoren en het model worden opnieuw opgebouwd uit de herstelde prijzen.
+    checkpointer = Checkpointer(os.path.join(DATA_DIR, f"checkpoint_{symbol}.npz"), checkpoint_state,
+                                trader_config.get("checkpoint_interval", 60))
+    since = None
+    saved, saved_state = checkpointer.load()
+    if saved is not None and saved_state.get("symbol") == symbol:
+        bought = saved_state["bought"]
+        buy_price = saved_state["buy_price"]
+        amount_crypto = saved_state["amount"]
+        realized = saved_state["realized"]
+        score.load_state(saved_state["score"])
+        # Prijzen die live al uit het venster zouden zijn gevallen tellen niet mee
+        recent = saved["timestamps"] > time.time() - PRICE_WINDOW * sample_interval
+        for price, timestamp in zip(saved["prices"][recent].tolist(), saved["timestamps"][recent].tolist()):
+            prices.append(price, timestamp)
+            state.update(price)
+        if len(prices):
+            since = prices.timestamps()[-1]
+        log_message(f"Checkpoint hersteld: {len(prices)} prijzen"
+                    + (f", open positie {amount_crypto:.6f} gekocht tegen {buy_price:.2f} EUR." if bought else "."))
+        if bought and simulator is not None:
+            # De open demo-positie krijgt zijn saldo in de simulator
+            simulator.balances.setdefault(symbol.split("-")[0], amount_crypto)
+
+    if candle_interval:
+        try:
+            # Gesimuleerde candles alleen in het geheugen, zodat ze de echte cache niet vervuilen
+            cache = ":memory:" if simulator is not None else None
+            timestamps, closes = warm_up_prices(market_data, symbol, candle_interval, path=cache, since=since,
+                                                aggregator=aggregator)
+            for price, timestamp in zip(closes.tolist(), timestamps.tolist()):
+                prices.append(price, timestamp)
+                state.update(price)
+            log_message(f"Prijsvenster aangevuld met {len(closes)} {candle_interval}-candles uit de cache.")
+        except BitvavoAPIError as e:
+            log_message(f"[WARN] Candles voor het prijsvenster ophalen mislukt: {e}")
+
+    metrics.watch_client(bitvavo)
+    metrics.watch_predictions(symbol, score)
+    if slack_webhook_url:
+        metrics.watch_notifier(get_notifier(slack_webhook_url))
+    metrics.serve(trader_config.get("metrics_port"))
+    position_gauge = metrics.position.labels(symbol)
+    realized_gauge = metrics.realized_pnl.labels(symbol)
+    position_gauge.set(amount_crypto if bought else 0.0)
+    realized_gauge.set(realized)
 
     log_message(
         f"Bot gestart voor {symbol}. Budget: {initial_budget:.2f} EUR, Doelwinst: {target_profit_percent}%, Stop-loss: {stop_loss_percent}%.", slack_webhook_url)
 
+    # Vaste deadlines op een monotone klok, met align_interval op candle-grenzen
+    scheduler = Scheduler(check_interval, align=trader_config.get("align_interval", False),
+                          offset=trader_config.get("align_offset", 0.0))
+    metrics.watch_scheduler(symbol, scheduler)
+
     try:
         while True:
-            # Huidige prijs ophalen
-            ticker = bitvavo.tickerPrice({"market": symbol})
-            current_price = float(ticker["price"])
-            prices = prices.append(
-                pd.Series([current_price]), ignore_index=True)
+            metrics.tick(symbol, lag=scheduler.wait())
+            # Huidige prijs ophalen; een mislukte poging slaat alleen deze ronde over
+            try:
+                with metrics.stage(symbol, "price_fetch").time():
+                    ticker = market_data.tickerPrice({"market": symbol})
+                    current_price = float(ticker["price"])
+            except (BitvavoAPIError, KeyError) as e:
+                metrics.errors.labels(symbol, "price_fetch").inc()
+                log_message(f"[WARN] Prijs ophalen mislukt: {e}", slack_webhook_url)
+                continue
+            if recorder is not None:
+                recorder.ticker(symbol, current_price)
+            if aggregator is None:
+                sample, sample_time = current_price, None
+            elif aggregator.update(current_price):
+                # Er is een candle afgesloten: de slotkoers gaat het prijsvenster in
+                candle = aggregator[candle_interval].last()
+                sample, sample_time = float(candle[CLOSE]), candle[TIMESTAMP] / 1000 + sample_interval
+            else:
+                sample = None  # Binnen de lopende candle alleen doelwinst en stop-loss controleren
 
             # Indicatoren en AI-model
-            if len(prices) > 50:
-                prices = prices[-50:]  # Behoud de laatste 50 prijzen
-                indicators = calculate_indicators(prices, trader_config)
-                indicators["price_change"] = prices.pct_change()
-                indicators["future_price_change"] = indicators["price_change"].shift(
-                    -1)
-                model = train_ai_model(indicators.dropna())
-
-                # Koopactie
-                if not bought:
-                    prediction = model.predict(
-                        indicators[["price_change", "rsi", "macd", "macd_signal"]].iloc[-1:].values)[0]
-                    rsi = indicators["rsi"].iloc[-1]
+            if sample is not None:
+                prices.append(sample, sample_time)
+                with metrics.stage(symbol, "indicators").time():
+                    state.update(sample)
+                with metrics.stage(symbol, "model").time():
+                    prediction, rsi = live_signal(state, prices, model)
+                # Het model voorspelt de relatieve verandering naar de volgende prijs
+                score.observe(sample, sample * (1 + prediction) if prediction == prediction else None)
+
+            if prices.is_full():
+                trusted = (min_direction_accuracy is None or score.directional < min_predictions
+                           or score.recent_direction_accuracy >= min_direction_accuracy)
+
+                # Koopactie, alleen op een nieuwe voorspelling
+                if not bought and trusted and sample is not None:
                     if prediction <= prediction_threshold_buy and rsi < rsi_threshold_buy:  # Oversold en voorspelling negatief
-                        amount_crypto = initial_budget / current_price
-                        place_order(bitvavo, symbol, "buy", amount_crypto)
-                        buy_price = current_price
-                        bought = True
-                        log_message(
-                            f"[INFO] Gekocht {amount_crypto:.6f} {symbol.split('-')[0]} tegen {buy_price:.2f} EUR.", slack_webhook_url)
+                        execution = place_order(executor, "buy", initial_budget / current_price, current_price, slack_webhook_url)
+                        if execution is not None and execution.filled_amount > 0:
+                            # Werkelijk gevulde hoeveelheid en gemiddelde fillprijs
+                            amount_crypto = execution.filled_amount
+                            buy_price = execution.price
+                            bought = True
+                            realized -= execution.fee
+                            position_gauge.set(amount_crypto)
+                            realized_gauge.set(realized)
+                            checkpointer.save()
+                            log_message(
+                                f"[INFO] Gekocht {amount_crypto:.6f} {symbol.split('-')[0]} tegen {buy_price:.2f} EUR.", slack_webhook_url)
 
                 # Verkoopactie
                 if bought:
-                    current_value = amount_crypto * current_price
-                    profit_percent = (
-                        (current_value - initial_budget) / initial_budget) * 100
-
-                    if profit_percent >= target_profit_percent:  # Doelwinst bereikt
-                        place_order(bitvavo, symbol, "sell", amount_crypto)
-                        log_message(
-                            f"[INFO] Doelwinst bereikt! Verkocht voor {current_value:.2f} EUR. Winst: {profit_percent:.2f}%.", slack_webhook_url)
-                        break
-
-                    if profit_percent <= stop_loss_percent:  # Stop-loss bereikt
-                        place_order(bitvavo, symbol, "sell", amount_crypto)
-                        log_message(
-                            f"[INFO] Stop-loss geactiveerd. Verkocht voor {current_value:.2f} EUR. Verlies: {profit_percent:.2f}%.", slack_webhook_url)
-                        break
-
-            time.sleep(check_interval)
+                    profit_percent = ((current_price - buy_price) / buy_price) * 100
+
+                    if profit_percent >= target_profit_percent or profit_percent <= stop_loss_percent:
+                        execution = place_order(executor, "sell", amount_crypto, current_price, slack_webhook_url)
+                        if execution is not None and execution.filled_amount > 0:
+                            sold_value = execution.filled_amount * execution.price - execution.fee
+                            realized += sold_value - execution.filled_amount * buy_price
+                            realized_gauge.set(realized)
+                            position_gauge.set(max(0.0, amount_crypto - execution.filled_amount))
+                            if not execution.fully_filled:
+                                # Restant blijft open en wordt de volgende ronde opnieuw aangeboden
+                                amount_crypto -= execution.filled_amount
+                                checkpointer.save()
+                                log_message(
+                                    f"[INFO] Deels verkocht voor {sold_value:.2f} EUR, nog {amount_crypto:.6f} open.", slack_webhook_url)
+                            elif profit_percent >= target_profit_percent:  # Doelwinst bereikt
+                                bought = False
+                                log_message(
+                                    f"[INFO] Doelwinst bereikt! Verkocht voor {sold_value:.2f} EUR. Winst: {profit_percent:.2f}%.", slack_webhook_url)
+                                break
+                            else:  # Stop-loss bereikt
+                                bought = False
+                                log_message(
+                                    f"[INFO] Stop-loss geactiveerd. Verkocht voor {sold_value:.2f} EUR. Verlies: {profit_percent:.2f}%.", slack_webhook_url)
+                                break
+
+            checkpointer.maybe_save()
 
     except KeyboardInterrupt:
         log_message("Bot gestopt door gebruiker.", slack_webhook_url)
     except Exception as e:
+        metrics.errors.labels(symbol, "loop").inc()
         log_message(f"[ERROR] Fout in bot: {e}", slack_webhook_url)
+    finally:
+        log_message(bitvavo.format_metrics())
+        log_message(score.format_summary())
+        log_message(scheduler.format_stats())
+        if aggregator is not None:
+            series = aggregator[candle_interval]
+            log_message(f"Candles: {series.total} {candle_interval}-candles afgesloten uit {aggregator.ticks} prijzen, "
+                        f"{series.late_ticks} late prijzen genegeerd.")
+        checkpointer.save()
+        if recorder is not None:
+            recorder.close()
+        close_notifiers()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,7 @@
+"""Gedeelde pytest-instellingen: de botmappen op het importpad, zoals in ``backtest.py``."""
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+for path in ("backtest", "bitvavo-hub", "bitvavo-scalper", "bitvavo-hodl", "bitvavo-trader"):
+    sys.path.insert(0, os.path.join(ROOT, path))
@@ -0,0 +1,81 @@
+"""Onderdelen van de backtest die los van een prijsbestand te testen zijn."""
+import numpy as np
+import pytest
+
+from backtest import fee_of, run_backtest, trader_signals
+from ringbuffer import PriceRing
+from trader import PRICE_WINDOW, TraderIndicators, live_signal
+
+TRADER_CONFIG = {"slow_macd": 26, "fast_macd": 12, "signal_macd": 9, "sma_period": 10, "ema_period": 10}
+
+
+@pytest.mark.parametrize("strategy, config, fee", [
+    ("scalper", {"TRADE_FEE_PERCENTAGE": 0.15}, 0.15),
+    ("trader", {"trade_fee_percentage": 0.1}, 0.1),
+    ("hodl", {"TRADE_FEE_PERCENTAGE": 0.0, "trade_fee_percentage": 0.1}, 0.0),
+    # Zonder instelling de standaard van de bot zelf
+    ("scalper", {}, 0.5),
+    ("hodl", {}, 0.25),
+    ("trader", {}, 0.25),
+])
+def test_fee_comes_from_either_config_style(strategy, config, fee):
+    assert fee_of(config, strategy) == fee
+
+
+def test_scalper_fee_default_matches_market_scalper():
+    from scalper import MarketScalper
+
+    assert fee_of({}, "scalper") == MarketScalper({"SYMBOL": "BTC-EUR"}, data_dir=None, verbose=False).trade_fee_percentage
+
+
+def test_trader_backtest_uses_trade_fee_percentage():
+    config = {
+        "initial_budget": 100, "target_profit_percent": 0.5, "stop_loss_percent": -0.5,
+        "rsi_threshold_buy": 100, "prediction_threshold_buy": 1e9, "trade_fee_percentage": 0.1, **TRADER_CONFIG,
+    }
+    prices = 100 + np.sin(np.arange(600) / 10)
+    ledger = run_backtest("trader", np.arange(600.0), prices, config)
+    assert ledger.fee_rate == pytest.approx(0.001)
+    assert ledger.trades and ledger.fees == pytest.approx(sum(trade[4] for trade in ledger.trades))
+
+
+@pytest.mark.parametrize("ridge_alpha", [0.0, 0.1])
+def test_trader_signals_match_the_live_model_from_the_first_prediction(ridge_alpha):
+    config = {**TRADER_CONFIG, "ridge_alpha": ridge_alpha}
+    prices = 100 * np.exp(np.cumsum(np.random.default_rng(1).normal(0, 0.002, 300)))
+    predictions, _ = trader_signals(prices, config)
+    state = TraderIndicators(config)
+    window = PriceRing(PRICE_WINDOW)
+    live = []
+    for price in prices:
+        window.append(price, 0.0)
+        state.update(price)
+        live.append(live_signal(state, window)[0])
+    # Zelfde drempel als de live bot: pas voorspellen met een vol prijsvenster
+    assert np.isnan(live[:PRICE_WINDOW - 1]).all() and not np.isnan(live[PRICE_WINDOW - 1])
+    np.testing.assert_array_equal(np.isnan(live), np.isnan(predictions))
+    np.testing.assert_allclose(live, predictions, rtol=1e-6, atol=1e-9)
+
+
+def test_trader_backtest_waits_for_a_full_price_window():
+    config = {**TRADER_CONFIG, "initial_budget": 100, "target_profit_percent": 0.5, "stop_loss_percent": -0.5,
+              "rsi_threshold_buy": 100, "prediction_threshold_buy": 1.0}
+    prices = 100 * np.exp(np.cumsum(np.random.default_rng(2).normal(0, 0.002, 200)))
+    ledger = run_backtest("trader", np.arange(len(prices), dtype=float), prices, config)
+    # Drempels die elke voorspelling doorlaten: de eerste aankoop valt op de eerste volle tick
+    assert ledger.trades[0][0] == PRICE_WINDOW - 1
+
+
+def test_sweep_rejects_grid_keys_the_strategy_does_not_read():
+    from sweep import check_grid
+
+    check_grid({"WINDOW_SIZE": [8, 16], "STOP_LOSS": [-1]}, "scalper", {})
+    # Niet door de backtest gelezen, maar wel in de basisconfiguratie: toegestaan
+    check_grid({"CUSTOM": [1]}, "scalper", {"CUSTOM": 0})
+    with pytest.raises(SystemExit, match="BUY_MARGIN"):
+        check_grid({"WINDOW_SIZE": [8], "BUY_MARGIN": [0.1]}, "scalper", {"WINDOW_SIZE": 8})
+    # Wel opgeslagen door MarketScalper, maar nergens gebruikt in on_price
+    with pytest.raises(SystemExit, match="THRESHOLD_BUY"):
+        check_grid({"THRESHOLD_BUY": [0.1, 0.2]}, "scalper", {})
+    with pytest.raises(SystemExit, match="SMA_PERIOD"):
+        check_grid({"SMA_PERIOD": [10]}, "trader", {})
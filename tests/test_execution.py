@@ -0,0 +1,150 @@
+"""``OrderExecutor`` tegen een gescripte exchange en tegen ``SimulatedExchange``."""
+import pytest
+
+from bitvavo_client import BitvavoAPIError
+from execution import OrderExecutor
+from simulator import SimulatedExchange, SyntheticFeed
+
+MARKET = "BTC-EUR"
+
+
+class VirtualTime:
+    def __init__(self):
+        self.now = 0.0
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class ScriptedExchange:
+    """Geeft bij elke ``getOrder`` de volgende stand uit ``script``; een exception wordt opgegooid."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.state = {"orderId": "1", "status": "new"}
+        self.canceled = False
+        self.calls = []
+
+    def placeOrder(self, market, side, order_type, body):
+        self.calls.append(("placeOrder", order_type, body))
+        return dict(self.state)
+
+    def getOrder(self, market, order_id):
+        self.calls.append(("getOrder",))
+        if self.script:
+            step = self.script.pop(0)
+            if isinstance(step, Exception):
+                raise step
+            self.state.update(step)
+        return dict(self.state)
+
+    def cancelOrder(self, market, order_id):
+        self.calls.append(("cancelOrder",))
+        self.canceled = True
+        self.state["status"] = "canceled"
+        return {"orderId": order_id}
+
+
+class FakeAccountStream:
+    """Levert per ``wait_events`` de volgende lijst events, zoals ``AccountStream``."""
+
+    connected = True
+
+    def __init__(self, batches):
+        self.batches = list(batches)
+        self.forgotten = []
+
+    def wait_events(self, order_id, timeout):
+        return self.batches.pop(0) if self.batches else []
+
+    def forget(self, order_id):
+        self.forgotten.append(order_id)
+
+
+def executor(client, time, **options):
+    options.setdefault("order_type", "limit")
+    return OrderExecutor(client, MARKET, fill_timeout=10, poll_interval=1, clock=time.clock, sleep=time.sleep,
+                         **options)
+
+
+def partial(filled, quote):
+    return {"status": "partiallyFilled", "filledAmount": str(filled), "filledAmountQuote": str(quote),
+            "feePaid": "0.01"}
+
+
+def test_partial_fill_is_cancelled_after_timeout():
+    time = VirtualTime()
+    exchange = ScriptedExchange([partial(0.25, 25), partial(0.4, 40.4)])
+    execution = executor(exchange, time).execute("buy", 1.0, 101)
+    assert exchange.canceled
+    assert time.now >= 10
+    assert execution.status == "canceled"
+    assert execution.filled_amount == pytest.approx(0.4)
+    assert execution.price == pytest.approx(101)
+    assert not execution.fully_filled
+
+
+def test_poll_errors_keep_following_and_return_the_partial_fill():
+    time = VirtualTime()
+    error = BitvavoAPIError("GET getOrder mislukt: timeout")
+    exchange = ScriptedExchange([error, partial(0.5, 50), error, error] + [error] * 20)
+    execution = executor(exchange, time).execute("buy", 1.0, 100)
+    # Na de fouten wordt doorgepold tot de deadline, en daarna toch geannuleerd
+    assert exchange.calls.count(("getOrder",)) >= 10
+    assert exchange.canceled
+    assert execution.filled_amount == pytest.approx(0.5)
+
+
+def test_reconcile_counts_fills_the_stream_missed():
+    time = VirtualTime()
+    exchange = ScriptedExchange([
+        {"status": "filled", "filledAmount": "1", "filledAmountQuote": "100.5", "feePaid": "0.25"}])
+    stream = FakeAccountStream([
+        [{"event": "fill", "orderId": "1", "fillId": "a", "amount": "0.3", "price": "100", "fee": "0.075"}],
+        [{"event": "order", "orderId": "1", "status": "filled"}],
+    ])
+    execution = executor(exchange, time, stream=stream).execute("buy", 1.0, 100)
+    assert not exchange.canceled
+    assert stream.forgotten == ["1"]
+    assert execution.fully_filled
+    assert execution.price == pytest.approx(100.5)
+    assert execution.fee == pytest.approx(0.25)
+
+
+def test_exits_go_out_as_market_orders():
+    exchange = ScriptedExchange([])
+    exchange.state = {"orderId": "1", "status": "filled"}
+    order_executor = executor(exchange, VirtualTime(), post_only=True)
+    order_executor.execute("buy", 1.0, 100)
+    order_executor.execute("sell", 1.0, 100, exit=True)
+    (_, entry_type, entry_body), (_, exit_type, exit_body) = [c for c in exchange.calls if c[0] == "placeOrder"]
+    assert (entry_type, entry_body["postOnly"]) == ("limit", True)
+    assert exit_type == "market" and "postOnly" not in exit_body
+
+
+@pytest.fixture
+def simulator():
+    return SimulatedExchange(SyntheticFeed(prices={MARKET: 100.0}, volatility=0.0),
+                             balances={"EUR": 1000.0, "BTC": 1.0}, start_time=1_700_000_000)
+
+
+def test_resting_order_is_cancelled_on_the_simulator(simulator):
+    order_executor = OrderExecutor(simulator, MARKET, order_type="limit", limit_offset=1.0, fill_timeout=5,
+                                   **simulator.executor_options(MARKET))
+    execution = order_executor.execute("buy", 0.5, 100)
+    assert execution.status == "canceled"
+    assert execution.filled_amount == 0
+    assert simulator.orders[execution.order_id]["status"] == "canceled"
+
+
+def test_exit_fills_where_a_post_only_sell_is_cancelled(simulator):
+    order_executor = OrderExecutor(simulator, MARKET, order_type="limit", post_only=True, limit_offset=-1.0,
+                                   **simulator.executor_options(MARKET))
+    # Een post-only verkoop onder de bid wordt door de exchange geannuleerd; als exit gaat hij als marketorder
+    assert order_executor.execute("sell", 0.5, 100).status == "canceledPostOnly"
+    execution = order_executor.execute("sell", 0.5, 100, exit=True)
+    assert execution.fully_filled
+    assert execution.order_type == "market"
@@ -0,0 +1,90 @@
+"""Incrementele en gevectoriseerde indicatoren tegen de pandas-formules die de bots eerst gebruikten."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+from hodl import calculate_rsi, calculate_sma
+
+
+@pytest.fixture
+def prices():
+    rng = np.random.default_rng(7)
+    walk = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 300)))
+    # Een stijgend stuk (geen verliezen) midden in de reeks
+    walk[150:170] = walk[149] + np.arange(1, 21)
+    return walk
+
+
+def pandas_rsi(series, period):
+    delta = series.diff()
+    gain = delta.where(delta > 0, 0.0).rolling(period).mean()
+    loss = (-delta.where(delta < 0, 0.0)).rolling(period).mean()
+    return 100 - 100 / (1 + gain / loss)
+
+
+def incremental(indicator, prices):
+    return np.array([indicator.update(price) for price in prices])
+
+
+def assert_same(actual, expected):
+    # Ook de NaN-posities (opwarmperiode) moeten overeenkomen
+    np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+    np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize("period", [1, 5, 20])
+def test_sma_matches_rolling_mean(prices, period):
+    expected = pd.Series(prices).rolling(period).mean().to_numpy()
+    assert_same(incremental(indicators.SMA(period), prices), expected)
+    assert_same(indicators.sma(prices, period), expected)
+
+
+@pytest.mark.parametrize("span", [5, 12, 26])
+def test_ema_matches_ewm_without_adjust(prices, span):
+    expected = pd.Series(prices).ewm(span=span, adjust=False).mean().to_numpy()
+    assert_same(incremental(indicators.EMA(span), prices), expected)
+    assert_same(indicators.ema(prices, span), expected)
+
+
+@pytest.mark.parametrize("period", [6, 14])
+def test_rsi_matches_rolling_gains_and_losses(prices, period):
+    expected = pandas_rsi(pd.Series(prices), period).to_numpy()
+    assert np.isnan(expected[:period - 1]).all() and (expected == 100).any()
+    assert_same(incremental(indicators.RSI(period), prices), expected)
+    assert_same(indicators.rsi(prices, period), expected)
+
+
+def test_rsi_without_any_movement_is_nan():
+    flat = np.full(20, 50.0)
+    assert np.isnan(incremental(indicators.RSI(14), flat)).all()
+    assert np.isnan(indicators.rsi(flat, 14)).all()
+
+
+def test_macd_matches_ewm(prices):
+    series = pd.Series(prices)
+    line = series.ewm(span=12, adjust=False).mean() - series.ewm(span=26, adjust=False).mean()
+    signal = line.ewm(span=9, adjust=False).mean()
+    macd = indicators.MACD(26, 12, 9)
+    updates = np.array([macd.update(price) for price in prices])
+    assert_same(updates[:, 0], line.to_numpy())
+    assert_same(updates[:, 1], signal.to_numpy())
+    batch_line, batch_signal = indicators.macd(prices, 26, 12, 9)
+    assert_same(batch_line, line.to_numpy())
+    assert_same(batch_signal, signal.to_numpy())
+
+
+def test_empty_series_gives_empty_batch_results():
+    for values in (indicators.sma([], 3), indicators.ema([], 3), indicators.rsi([], 3), *indicators.macd([])):
+        assert len(values) == 0
+
+
+def test_hodl_indicators_use_what_is_available_with_a_short_history(prices):
+    # Zoals voorheen met np.mean: met minder dan ``window`` prijzen het gemiddelde daarvan
+    assert calculate_sma(prices[:5], 20) == pytest.approx(np.mean(prices[:5]))
+    assert calculate_sma(prices, 20) == pytest.approx(np.mean(prices[-20:]))
+    assert np.isnan(calculate_sma([], 20))
+    short = pandas_rsi(pd.Series(prices[:8]), 7).iloc[-1]
+    assert calculate_rsi(prices[:8], 14) == pytest.approx(short)
+    assert calculate_rsi(prices, 14) == pytest.approx(pandas_rsi(pd.Series(prices), 14).iloc[-1])
+    assert np.isnan(calculate_rsi(prices[:1], 14))
@@ -0,0 +1,91 @@
+"""``SlackNotifier`` tegen een lokale webhook die posts vasthoudt tot de test ze vrijgeeft."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from notifier import SlackNotifier
+
+
+class FakeWebhook:
+    """Verzamelt de tekst van elke post; met ``hold`` blijft een post hangen tot ``release``."""
+
+    def __init__(self, status=200):
+        self.texts = []
+        self.status = status
+        self.started = threading.Event()
+        self.released = threading.Event()
+        self.released.set()
+        webhook = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                webhook.started.set()
+                webhook.released.wait(10)
+                webhook.texts.append(json.loads(body)["text"])
+                self.send_response(webhook.status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/hook"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def hold(self):
+        self.started.clear()
+        self.released.clear()
+
+    def release(self):
+        self.released.set()
+
+    def close(self):
+        self.released.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def webhook():
+    webhook = FakeWebhook()
+    yield webhook
+    webhook.close()
+
+
+def test_messages_are_batched_and_repeats_coalesced(webhook):
+    notifier = SlackNotifier(webhook.url, batch_interval=0.2, min_interval=0)
+    for message in ("koop", "koop", "koop", "verkoop"):
+        notifier.notify(message)
+    notifier.close()
+    assert webhook.texts == ["koop (x3)\nverkoop"]
+    assert notifier.stats() == {"queued": 4, "sent": 4, "posts": 1, "dropped": 0, "failed": 0, "pending": 0}
+
+
+def test_full_queue_drops_the_oldest_messages(webhook):
+    notifier = SlackNotifier(webhook.url, max_queue=3, batch_interval=0.05, min_interval=0)
+    webhook.hold()
+    notifier.notify("eerste")
+    assert webhook.started.wait(5)
+    # De eerste post hangt; wat nu binnenkomt, past maar voor drie berichten in de wachtrij
+    for i in range(5):
+        notifier.notify(f"bericht {i}")
+    assert notifier.dropped == 2
+    webhook.release()
+    notifier.close()
+    assert webhook.texts == ["eerste", "bericht 2\nbericht 3\nbericht 4"]
+    assert notifier.sent == 4
+
+
+def test_failed_posts_are_counted_without_blocking():
+    webhook = FakeWebhook(status=500)
+    try:
+        notifier = SlackNotifier(webhook.url, batch_interval=0.05, min_interval=0)
+        notifier.notify("fout")
+        notifier.close()
+        assert notifier.failed == 1 and notifier.sent == 0
+    finally:
+        webhook.close()
@@ -0,0 +1,95 @@
+"""``OrderBook``: snapshot plus gebufferde delta's, nonce-gaten, niveaus verwijderen en VWAP over de diepte."""
+import pytest
+
+from order_book import OrderBook
+
+MARKET = "BTC-EUR"
+
+SNAPSHOT = {
+    "nonce": 10,
+    "bids": [["99", "1"], ["98", "2"], ["97", "3"]],
+    "asks": [["101", "1"], ["102", "2"], ["103", "3"]],
+}
+
+
+@pytest.fixture
+def book():
+    book = OrderBook(MARKET)
+    assert book.load_snapshot(SNAPSHOT)
+    return book
+
+
+def test_deltas_before_the_snapshot_are_buffered_and_replayed():
+    book = OrderBook(MARKET)
+    # Ouder dan de snapshot: wordt overgeslagen
+    assert book.apply({"nonce": 9, "bids": [["50", "9"]]})
+    assert book.apply({"nonce": 11, "bids": [["100", "0.5"]]})
+    assert book.apply({"nonce": 12, "asks": [["101", "0"]]})
+    assert book.vwap("buy", 0.1) is None  # Nog geen snapshot
+
+    assert book.load_snapshot(SNAPSHOT)
+    assert book.synced and book.nonce == 12 and book.updates == 2
+    assert book.best_bid() == 100.0
+    assert book.best_ask() == 102.0
+    assert 50.0 not in dict(book.depth()["bids"])
+
+
+def test_a_gap_in_the_buffered_deltas_needs_another_snapshot():
+    book = OrderBook(MARKET)
+    book.apply({"nonce": 13, "bids": [["100", "1"]]})
+    assert not book.load_snapshot(SNAPSHOT)
+    assert not book.synced
+
+
+def test_a_nonce_gap_forces_a_resync(book):
+    assert book.apply({"nonce": 11, "bids": [["99", "1.5"]]})
+    assert not book.apply({"nonce": 13, "bids": [["100", "1"]]})
+    assert not book.synced and book.resyncs == 1
+    # Tot de nieuwe snapshot geen prijzen; de delta na het gat wordt erna afgespeeld
+    assert book.vwap("sell", 0.1) is None
+    assert book.apply({"nonce": 14, "asks": [["100.5", "1"]]})
+    assert book.load_snapshot({**SNAPSHOT, "nonce": 12})
+    assert book.nonce == 14
+    assert book.best_bid() == 100.0
+    assert book.best_ask() == 100.5
+
+
+def test_duplicate_deltas_are_ignored(book):
+    assert book.apply({"nonce": 11, "bids": [["99", "5"]]})
+    assert book.apply({"nonce": 11, "bids": [["99", "7"]]})
+    assert book.depth(1)["bids"] == [(99.0, 5.0)]
+    assert book.updates == 1
+
+
+def test_zero_size_removes_a_level(book):
+    assert book.apply({"nonce": 11, "bids": [["99", "0"]], "asks": [["101", "0"], ["105", "0"]]})
+    assert book.best_bid() == 98.0
+    assert book.best_ask() == 102.0
+    assert book.depth() == {"bids": [(98.0, 2.0), (97.0, 3.0)], "asks": [(102.0, 2.0), (103.0, 3.0)]}
+    assert book.spread() == pytest.approx(4.0)
+    assert book.mid() == pytest.approx(100.0)
+
+
+def test_vwap_walks_several_levels(book):
+    assert book.vwap("buy", 0.5) == pytest.approx(101.0)
+    # 1 @ 101 + 2 @ 102 + 1 @ 103
+    assert book.vwap("buy", 4) == pytest.approx((101 + 204 + 103) / 4)
+    # 1 @ 99 + 1.5 @ 98
+    assert book.vwap("sell", 2.5) == pytest.approx((99 + 147) / 2.5)
+    assert book.slippage("buy", 4) == pytest.approx(((101 + 204 + 103) / 4 - 101) / 101)
+    # Niet diep genoeg
+    assert book.vwap("buy", 6.5) is None
+
+
+def test_round_trip_cost_is_spread_plus_depth(book):
+    assert book.round_trip_cost(1) == pytest.approx(101 - 99)
+    buy = (101 + 102 * 2) / 3
+    sell = (99 + 98 * 2) / 3
+    assert book.round_trip_cost(3) == pytest.approx((buy - sell) * 3)
+    assert book.round_trip_cost(10) is None
+
+
+def test_reset_forgets_the_book(book):
+    book.reset()
+    assert book.best_bid() is None and book.spread() is None
+    assert not book.synced and book.nonce is None
@@ -0,0 +1,129 @@
+"""``PnlTracker``: FIFO- en gemiddelde-kostprijs-matching, dag/week-bakken en herstel via ``Journal``."""
+from datetime import datetime
+
+import pytest
+
+from journal import Journal
+from pnl import PnlTracker
+
+
+def txn(side, amount, price, timestamp="2026-01-05 12:00:00", fee=0.0):
+    return {"side": side, "amount": amount, "price": price, "timestamp": timestamp, "fee": fee}
+
+
+def test_fifo_sells_the_oldest_lots_first():
+    tracker = PnlTracker("fifo")
+    tracker.add(txn("buy", 1.0, 100.0))
+    tracker.add(txn("buy", 1.0, 110.0))
+    tracker.add(txn("buy", 1.0, 120.0))
+    assert tracker.add(txn("sell", 1.0, 130.0)) == pytest.approx(30.0)
+    assert tracker.add(txn("sell", 1.0, 130.0)) == pytest.approx(20.0)
+    assert list(tracker.lots) == [[1.0, 120.0]]
+    assert tracker.summary()["average_price"] == pytest.approx(120.0)
+
+
+def test_fifo_partial_sell_spans_several_lots():
+    tracker = PnlTracker("fifo")
+    tracker.add(txn("buy", 1.0, 100.0))
+    tracker.add(txn("buy", 2.0, 110.0))
+    # 1 tegen 100 en 0,5 tegen 110
+    assert tracker.add(txn("sell", 1.5, 120.0)) == pytest.approx(20.0 + 5.0)
+    assert list(tracker.lots) == [[1.5, 110.0]]
+    assert tracker.position == pytest.approx(1.5)
+    assert tracker.cost == pytest.approx(165.0)
+
+
+def test_average_cost_matches_against_the_mean_price():
+    tracker = PnlTracker("average")
+    tracker.add(txn("buy", 1.0, 100.0))
+    tracker.add(txn("buy", 1.0, 120.0))
+    assert tracker.add(txn("sell", 1.0, 130.0)) == pytest.approx(20.0)
+    assert not tracker.lots
+    assert tracker.summary()["average_price"] == pytest.approx(110.0)
+
+
+def test_fees_reduce_realized_pnl_on_both_sides():
+    tracker = PnlTracker("fifo")
+    assert tracker.add(txn("buy", 1.0, 100.0, fee=0.25)) == pytest.approx(-0.25)
+    assert tracker.add(txn("sell", 1.0, 110.0, fee=0.3)) == pytest.approx(9.7)
+    assert tracker.realized == pytest.approx(9.45)
+    assert tracker.fees == pytest.approx(0.55)
+    assert tracker.position == 0.0
+
+
+def test_selling_more_than_the_position_is_counted_as_unmatched():
+    tracker = PnlTracker("fifo")
+    tracker.add(txn("buy", 1.0, 100.0))
+    assert tracker.add(txn("sell", 1.5, 110.0)) == pytest.approx(10.0)
+    assert tracker.unmatched == pytest.approx(0.5)
+    assert tracker.position == 0.0 and not tracker.lots
+
+
+def test_daily_and_weekly_buckets_roll_over():
+    tracker = PnlTracker("fifo")
+    # Zondag 4 januari 2026 valt in ISO-week 1, maandag 5 januari in week 2
+    tracker.add(txn("buy", 2.0, 100.0, "2026-01-04 23:59:00"))
+    tracker.add(txn("sell", 1.0, 110.0, "2026-01-04 23:59:30"))
+    tracker.add(txn("sell", 1.0, 90.0, "2026-01-05 00:00:10"))
+    # Epoch-seconden (lokale tijd) komen in dezelfde bakken als het tekstformaat
+    tracker.add(txn("buy", 1.0, 100.0, datetime(2026, 1, 5, 9).timestamp()))
+    tracker.add(txn("sell", 1.0, 105.0, datetime(2026, 1, 5, 10).timestamp()))
+    assert tracker.daily == {"2026-01-04": [10.0, 2], "2026-01-05": [-5.0, 3]}
+    assert tracker.weekly == {"2026-W01": [10.0, 2], "2026-W02": [-5.0, 3]}
+    summary = tracker.summary(datetime(2026, 1, 5, 12))
+    assert (summary["day_pnl"], summary["day_trades"]) == (-5.0, 3)
+    assert (summary["week"], summary["week_pnl"]) == ("2026-W02", -5.0)
+    assert summary["total_pnl"] == pytest.approx(5.0)
+
+
+def test_old_days_are_pruned_after_keep_days():
+    tracker = PnlTracker("fifo", keep_days=2)
+    for day in range(1, 6):
+        tracker.add(txn("buy", 1.0, 100.0, f"2026-01-0{day} 12:00:00"))
+    assert sorted(tracker.daily) == ["2026-01-04", "2026-01-05"]
+    assert tracker.trades == 5
+
+
+@pytest.mark.parametrize("method", ["fifo", "average"])
+def test_state_round_trips_through_journal_restore(tmp_path, method):
+    records = [
+        txn("buy", 1.0, 100.0, "2026-01-04 10:00:00", fee=0.1),
+        txn("buy", 2.0, 110.0, "2026-01-04 11:00:00", fee=0.2),
+        txn("sell", 1.5, 120.0, "2026-01-05 10:00:00", fee=0.3),
+        txn("buy", 1.0, 90.0, "2026-01-05 11:00:00", fee=0.1),
+        txn("sell", 2.0, 115.0, "2026-01-06 10:00:00", fee=0.2),
+    ]
+    path = str(tmp_path / "transactions.jsonl")
+    journal = Journal(path, fsync=False)
+    expected = PnlTracker(method)
+    for record in records[:3]:
+        journal.append(record)
+        expected.add(record)
+    journal.save_checkpoint(expected)
+    for record in records[3:]:
+        journal.append(record)
+        expected.add(record)
+
+    # Het checkpoint dekt de eerste drie records; alleen de laatste twee worden afgespeeld
+    restored = PnlTracker(method)
+    replayed = []
+    add = restored.add
+    restored.add = lambda record: replayed.append(record) or add(record)
+    Journal(path, fsync=False).restore(restored)
+    assert replayed == records[3:]
+    for key in ("position", "cost", "realized", "fees", "unmatched"):
+        assert getattr(restored, key) == pytest.approx(getattr(expected, key))
+    assert restored.trades == expected.trades == len(records)
+    assert [list(lot) for lot in restored.lots] == [list(lot) for lot in expected.lots]
+    for buckets in ("daily", "weekly"):
+        restored_buckets, expected_buckets = getattr(restored, buckets), getattr(expected, buckets)
+        assert restored_buckets.keys() == expected_buckets.keys()
+        for key, (pnl, trades) in expected_buckets.items():
+            assert restored_buckets[key] == [pytest.approx(pnl), trades]
+
+
+def test_load_state_rejects_another_method():
+    tracker = PnlTracker("fifo")
+    tracker.add(txn("buy", 1.0, 100.0))
+    assert not PnlTracker("average").load_state(tracker.state())
+    assert PnlTracker("fifo").load_state(tracker.state())
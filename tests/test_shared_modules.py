@@ -0,0 +1,32 @@
+"""De gedeelde modules staan als kopie in elke botmap (elke Docker-image bouwt uit zijn eigen map).
+
+Een module die in meer dan één botmap staat, moet overal exact gelijk zijn;
+anders draait de ene bot met een fix of wijziging die de andere mist. Na
+een wijziging de module naar de andere mappen kopiëren.
+"""
+import filecmp
+import glob
+import os
+from collections import defaultdict
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def shared_modules():
+    """Modulenaam -> paden, voor elke module die in meer dan één botmap staat."""
+    copies = defaultdict(list)
+    for path in sorted(glob.glob(os.path.join(ROOT, "bitvavo-*", "*.py"))):
+        copies[os.path.basename(path)].append(path)
+    return {name: paths for name, paths in copies.items() if len(paths) > 1}
+
+
+def test_shared_modules_are_identical():
+    modules = shared_modules()
+    assert modules, "Geen gedeelde modules gevonden"
+    diverged = []
+    for name, paths in modules.items():
+        different = [path for path in paths[1:] if not filecmp.cmp(paths[0], path, shallow=False)]
+        if different:
+            bots = [os.path.basename(os.path.dirname(path)) for path in [paths[0]] + different]
+            diverged.append(f"{name}: {', '.join(bots)}")
+    assert not diverged, "Kopieën lopen uiteen:\n" + "\n".join(diverged)
@@ -0,0 +1,97 @@
+"""``TickRecorder``: dagpartities in UTC, een half geschreven record, ``load``/``load_range`` en WebSocket-events."""
+import calendar
+import os
+
+import pytest
+
+from tick_recorder import TICKER_DTYPE, TickRecorder, days, load, load_range, partition_path
+
+MARKET = "BTC-EUR"
+# Middernacht UTC tussen 4 en 5 januari 2026, in milliseconden
+MIDNIGHT = calendar.timegm((2026, 1, 5, 0, 0, 0)) * 1000
+NOW = MIDNIGHT + 3_600_000
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    recorder = TickRecorder(str(tmp_path), buffer_size=4, flush_interval=3600, clock=lambda: NOW / 1000)
+    yield recorder
+    recorder.close()
+
+
+def test_partitions_roll_over_at_utc_midnight(tmp_path, recorder):
+    for offset, price in ((-2, 1.0), (-1, 2.0), (0, 3.0), (1, 4.0)):
+        recorder.ticker(MARKET, price, MIDNIGHT + offset)
+    recorder.flush()
+    assert days(str(tmp_path), MARKET) == ["2026-01-04", "2026-01-05"]
+    assert load(str(tmp_path), MARKET, "2026-01-04")["price"].tolist() == [1.0, 2.0]
+    assert load(str(tmp_path), MARKET, "2026-01-05")["timestamp"].tolist() == [MIDNIGHT, MIDNIGHT + 1]
+
+
+def test_buffer_is_written_when_full(tmp_path, recorder):
+    for i in range(5):
+        recorder.ticker(MARKET, float(i), NOW + i)
+    # Buffer van 4: de eerste vier staan al op schijf, de vijfde pas na flush
+    assert len(load(str(tmp_path), MARKET, "2026-01-05")) == 4
+    recorder.flush()
+    assert len(load(str(tmp_path), MARKET, "2026-01-05")) == 5
+
+
+def test_a_torn_trailing_record_is_ignored_and_truncated_on_reopen(tmp_path, recorder):
+    recorder.ticker(MARKET, 1.0, NOW)
+    recorder.ticker(MARKET, 2.0, NOW + 1)
+    recorder.close()
+    path = partition_path(str(tmp_path), MARKET, "2026-01-05", "ticker")
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02\x03")  # Crash midden in een record
+    assert load(str(tmp_path), MARKET, "2026-01-05")["price"].tolist() == [1.0, 2.0]
+
+    again = TickRecorder(str(tmp_path), buffer_size=4, clock=lambda: NOW / 1000)
+    again.ticker(MARKET, 3.0, NOW + 2)
+    again.close()
+    assert os.path.getsize(path) == 3 * TICKER_DTYPE.itemsize
+    records = load(str(tmp_path), MARKET, "2026-01-05")
+    assert records["price"].tolist() == [1.0, 2.0, 3.0]
+    assert records["timestamp"].tolist() == [NOW, NOW + 1, NOW + 2]
+
+
+def test_load_range_bounds_are_inclusive_across_days(tmp_path, recorder):
+    stamps = [MIDNIGHT - 86_400_000, MIDNIGHT - 1, MIDNIGHT, MIDNIGHT + 1, MIDNIGHT + 86_400_000]
+    for i, stamp in enumerate(stamps):
+        recorder.ticker(MARKET, float(i), stamp)
+    recorder.close()
+    root = str(tmp_path)
+    assert load_range(root, MARKET)["timestamp"].tolist() == stamps
+    assert load_range(root, MARKET, start=MIDNIGHT - 1, end=MIDNIGHT)["timestamp"].tolist() == [MIDNIGHT - 1, MIDNIGHT]
+    assert load_range(root, MARKET, start=MIDNIGHT)["timestamp"].tolist() == stamps[2:]
+    assert load_range(root, MARKET, end=MIDNIGHT - 1)["timestamp"].tolist() == stamps[:2]
+    assert len(load_range(root, MARKET, start=MIDNIGHT + 2, end=MIDNIGHT + 3)) == 0
+    assert len(load_range(root, "ETH-EUR")) == 0
+    assert len(load(root, MARKET, "2026-01-10")) == 0
+
+
+def test_record_event_parses_ticker_and_trade_events(tmp_path, recorder):
+    recorder.record_event(MARKET, {"event": "ticker", "bestBid": "99.5", "bestBidSize": "2",
+                                   "bestAsk": "100.5", "bestAskSize": None})
+    recorder.record_event(MARKET, {"event": "trade", "price": "100", "amount": "0.5", "side": "sell",
+                                   "timestamp": NOW - 5})
+    recorder.record_event(MARKET, {"event": "trade", "price": "101", "amount": "0.1", "side": "buy"})
+    # Niet op te nemen: zonder laatprijs, een onleesbare prijs, een ander event
+    recorder.record_event(MARKET, {"event": "ticker", "bestBid": "99.5"})
+    recorder.record_event(MARKET, {"event": "trade", "price": "n/a"})
+    recorder.record_event(MARKET, {"event": "candle", "price": "100"})
+    recorder.close()
+
+    book = load(str(tmp_path), MARKET, "2026-01-05", "book")
+    assert book.tolist() == [(NOW, 99.5, 2.0, 100.5, 0.0)]
+    trades = load(str(tmp_path), MARKET, "2026-01-05", "trade")
+    assert trades.tolist() == [(NOW - 5, 100.0, 0.5, -1), (NOW, 101.0, 0.1, 1)]
+
+
+def test_a_zero_timestamp_is_kept(tmp_path, recorder):
+    recorder.ticker(MARKET, 1.0, 0)
+    recorder.record_event(MARKET, {"event": "trade", "price": "1", "amount": "1", "side": "buy", "timestamp": 0})
+    recorder.close()
+    assert days(str(tmp_path), MARKET) == ["1970-01-01"]
+    assert load(str(tmp_path), MARKET, "1970-01-01")["timestamp"].tolist() == [0]
+    assert load(str(tmp_path), MARKET, "1970-01-01", "trade")["timestamp"].tolist() == [0]
@@ -0,0 +1,82 @@
+"""``TickerStream`` tegen een lokale WebSocket-server die de verbinding verbreekt."""
+import json
+import threading
+import time
+
+import pytest
+
+from ticker_stream import TickerStream
+
+websockets_server = pytest.importorskip("websockets.sync.server")
+
+MARKET = "BTC-EUR"
+
+
+class FakeBitvavo:
+    """Stuurt na elke subscribe een paar tickers en verbreekt de eerste verbinding daarna."""
+
+    def __init__(self):
+        self.connections = 0
+        self.subscriptions = []
+        self.server = websockets_server.serve(self.handle, "127.0.0.1", 0, close_timeout=0.1)
+        self.url = f"ws://127.0.0.1:{self.server.socket.getsockname()[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def handle(self, ws):
+        self.connections += 1
+        connection = self.connections
+        self.subscriptions.append(json.loads(ws.recv()))
+        for i in range(3):
+            ws.send(json.dumps({"event": "ticker", "market": MARKET, "lastPrice": str(100 * connection + i)}))
+        if connection == 1:
+            return  # Verbinding wegvallen
+        for message in ws:
+            pass
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            pytest.fail("Timeout")
+        time.sleep(0.01)
+
+
+def test_reconnects_resubscribes_and_reports_the_gap():
+    gaps = []
+    prices = []
+    server = FakeBitvavo()
+    stream = TickerStream(server.url, [MARKET], gap_threshold=0.5,
+                          on_gap=gaps.append, on_price=lambda market, price: prices.append(price))
+    try:
+        with server:
+            stream.start()
+            wait_for(lambda: 202.0 in prices)
+            assert stream.next_price(1) == 202.0
+    finally:
+        # Na het sluiten van de server; dan hoeft de stream niet op de close-handshake te wachten
+        stream.stop()
+    assert server.connections == 2
+    assert stream.reconnects == 1
+    # Opnieuw geabonneerd op dezelfde kanalen na de reconnect
+    assert server.subscriptions[0] == server.subscriptions[1]
+    assert {"name": "ticker", "markets": [MARKET]} in server.subscriptions[1]["channels"]
+    # De reconnect duurt minimaal de eerste wachttijd van 1 seconde: dat is een gat boven de drempel
+    assert stream.gaps == 1 and gaps[0] >= 0.5
+    assert prices == [100.0, 101.0, 102.0, 200.0, 201.0, 202.0]
+
+
+def test_silence_on_an_open_connection_counts_as_a_gap():
+    stream = TickerStream("ws://unused", [MARKET], gap_threshold=0.05)
+    stream._on_message(None, json.dumps({"event": "ticker", "market": MARKET, "lastPrice": "1"}))
+    time.sleep(0.1)
+    stream._on_message(None, json.dumps({"event": "trade", "market": MARKET, "price": "2"}))
+    assert stream.gaps == 1
+    assert stream.last_prices[MARKET] == 2.0